@@ -0,0 +1,105 @@
+"""
+Ghi file an toàn khi crash / mất điện giữa chừng.
+
+atomic_write() ghi vào file tạm cùng thư mục, fsync rồi os.replace lên file đích: file đích luôn là
+bản cũ hoặc bản mới hoàn chỉnh, không bao giờ bị cắt cụt. Tuỳ chọn giữ backups bản trước đó
+(<file>.bak1 mới nhất ... <file>.bakN cũ nhất).
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from instrumentation import get_logger
+
+log = get_logger(__name__)
+
+BACKUP_SUFFIX = ".bak"
+
+
+def _read_umask():
+    # Đọc umask bắt buộc phải đặt tạm giá trị khác: chỉ làm một lần lúc import, trước khi có thread nào ghi file
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _read_umask()
+
+
+def backup_path(path, generation=1):
+    """File backup thứ generation (1 = bản ngay trước lần ghi gần nhất)"""
+    return f"{path}{BACKUP_SUFFIX}{generation}"
+
+
+def rotate_backups(path, backups):
+    """Đẩy các bản backup lùi một đời và giữ bản hiện tại của path làm .bak1 (hard link nếu được, không copy)"""
+    if backups <= 0 or not os.path.exists(path):
+        return
+    for generation in range(backups, 1, -1):
+        older = backup_path(path, generation - 1)
+        if os.path.exists(older):
+            os.replace(older, backup_path(path, generation))
+    newest = backup_path(path, 1)
+    if os.path.exists(newest):
+        os.remove(newest)
+    try:
+        os.link(path, newest)  # os.replace sau đó chỉ đổi tên file mới, file cũ còn nguyên dưới tên .bak1
+    except OSError:
+        shutil.copy2(path, newest)
+
+
+def _fsync_directory(directory):
+    """Ghi xuống đĩa cả mục thư mục (đổi tên mới bền sau mất điện); Windows không hỗ trợ, bỏ qua"""
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _copy_mode(path, tmp_path):
+    """mkstemp tạo file quyền 0600: giữ quyền của file cũ, hoặc quyền mặc định theo umask"""
+    try:
+        shutil.copymode(path, tmp_path)
+    except OSError:
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding="utf-8", newline=None, buffering=-1, backups=0, fsync=True):
+    """
+    `with atomic_write(path) as f: f.write(...)` - chỉ thay file đích khi khối with kết thúc bình thường;
+    lỗi hoặc exception (vd. Cancelled) thì xoá file tạm, file đích giữ nguyên.
+    backups: số bản cũ giữ lại (0 = không giữ). fsync=False bỏ ghi xuống đĩa (nhanh hơn, vẫn không cắt cụt
+    file khi chương trình crash, nhưng không bền khi mất điện).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        binary = "b" in mode
+        with os.fdopen(fd, mode, buffering=buffering, encoding=None if binary else encoding,
+                       newline=None if binary else newline) as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        _copy_mode(path, tmp_path)
+        rotate_backups(path, backups)
+        os.replace(tmp_path, path)
+        tmp_path = None
+        if fsync:
+            _fsync_directory(directory)
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                log.warning("Không xoá được file tạm %s", tmp_path)
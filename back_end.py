@@ -1,69 +1,177 @@
-import os
-import sys
-import json
-from PySide6.QtCore import QRect
-
-class EngineerUnderground:
-    def __init__(self):
-        self.main_ui = None
-        
-        # Lấy thư mục chứa file .exe hoặc script đang chạy
-        if getattr(sys, 'frozen', False):
-            # Nếu chạy từ file .exe (PyInstaller)
-            app_dir = os.path.dirname(sys.executable)
-        else:
-            # Nếu chạy từ script Python
-            app_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        self.config_path = os.path.join(app_dir, "config.json")
-
-    def save_config(self, rects, fields=None):
-        data = {
-            "rects": [],
-            "fields": fields if fields is not None else []
-        }
-        for rect, color, field in rects:
-            data["rects"].append({
-                "field": field,
-                "x": rect.x(),
-                "y": rect.y(),
-                "width": rect.width(),
-                "height": rect.height()
-            })
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-
-    def load_config(self):
-        try:
-            if not os.path.exists(self.config_path):
-                return [], []
-
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            rects = []
-            for item in data.get("rects", []):
-                rect = QRect(item["x"], item["y"], item["width"], item["height"])
-                field = item["field"]
-                rects.append((rect, field))
-
-            fields = data.get("fields", [])
-            return rects, fields
-
-        except Exception as e:
-            print("Lỗi khi đọc config:", e)
-            return [], []  # ✅ Luôn trả về đúng định dạng
-
-    def read_txt(self, file_path):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                first_line = f.readline()
-                field_names = [field.strip() for field in first_line.strip().split("\t") if field.strip()]
-                print("Danh sách trường từ file:", field_names)
-                return field_names
-        except Exception as e:
-            print("Lỗi khi đọc file TXT:", e)
-            return []
-# Khởi tạo sẵn để sử dụng trong các file khác
-eu = EngineerUnderground()
-
+import os
+import sys
+import json
+import time
+from PySide6.QtCore import QRect, QTimer
+from atomic_io import atomic_write
+from instrumentation import get_logger, span
+
+log = get_logger(__name__)
+
+CONFIG_BACKUPS = 1  # Giữ config.json.bak1 (bản trước lần lưu gần nhất)
+CONFIG_VERSION = 2
+SAVE_DELAY_MS = 500  # request_save(): gom các lần lưu liên tiếp, chỉ ghi lần cuối
+SNAPSHOT_DIR = "layouts"  # Thư mục (cạnh config.json) chứa các bản layout cũ để khôi phục
+MAX_SNAPSHOTS = 20
+
+
+def encode_layout(rects, fields=None):
+    """
+    Layout dạng gọn (v2): mỗi tên trường lưu một lần, vùng vẽ là [chỉ số trường, x, y, w, h].
+    Trường của vùng vẽ không có trong fields (vd. sau khi import TXT khác) nằm ở extra_fields,
+    chỉ số tiếp nối sau fields.
+    """
+    fields = list(fields) if fields is not None else []
+    positions = {}
+    for i, field in enumerate(fields):
+        positions.setdefault(field, i)
+    extra_fields = []
+    rect_rows = []
+    for rect, color, field in rects:
+        i = positions.get(field)
+        if i is None:
+            i = positions[field] = len(fields) + len(extra_fields)
+            extra_fields.append(field)
+        rect_rows.append([i, rect.x(), rect.y(), rect.width(), rect.height()])
+    data = {"version": CONFIG_VERSION, "fields": fields, "rects": rect_rows}
+    if extra_fields:
+        data["extra_fields"] = extra_fields
+    return data
+
+
+def decode_layout(data):
+    """dict config (v1 hoặc v2) → (list (QRect, field), fields)"""
+    fields = data.get("fields", [])
+    if data.get("version", 1) < 2:
+        # v1: mỗi vùng vẽ là dict kèm nguyên tên trường
+        rects = [(QRect(item["x"], item["y"], item["width"], item["height"]), item["field"])
+                 for item in data.get("rects", [])]
+        return rects, fields
+    names = fields + data.get("extra_fields", [])
+    rects = [(QRect(x, y, width, height), names[i]) for i, x, y, width, height in data.get("rects", [])]
+    return rects, fields
+
+class EngineerUnderground:
+    def __init__(self):
+        self.main_ui = None
+        
+        # Lấy thư mục chứa file .exe hoặc script đang chạy
+        if getattr(sys, 'frozen', False):
+            # Nếu chạy từ file .exe (PyInstaller)
+            app_dir = os.path.dirname(sys.executable)
+        else:
+            # Nếu chạy từ script Python
+            app_dir = os.path.dirname(os.path.abspath(__file__))
+        
+        self.config_path = os.path.join(app_dir, "config.json")
+        self._pending = None  # Layout (đã encode) chờ ghi bởi request_save
+        self._save_timer = None
+        self._last_snapshot_body = None
+
+    def save_config(self, rects, fields=None):
+        """Ghi config ngay (huỷ lần ghi đang chờ của request_save)"""
+        self._pending = None
+        if self._save_timer is not None:
+            self._save_timer.stop()
+        self._write(encode_layout(rects, fields))
+
+    def request_save(self, rects, fields=None):
+        """Ghi config sau SAVE_DELAY_MS; gọi nhiều lần liên tiếp chỉ ghi một lần với layout cuối cùng"""
+        self._pending = encode_layout(rects, fields)  # Encode ngay: canvas.rects còn thay đổi sau đó
+        if self._save_timer is None:
+            self._save_timer = QTimer()
+            self._save_timer.setSingleShot(True)
+            self._save_timer.setInterval(SAVE_DELAY_MS)
+            self._save_timer.timeout.connect(self.flush)
+        self._save_timer.start()
+
+    def flush(self):
+        """Ghi ngay layout đang chờ (gọi khi đóng ứng dụng)"""
+        if self._save_timer is not None:
+            self._save_timer.stop()
+        data, self._pending = self._pending, None
+        if data is None:
+            return
+        try:
+            self._write(data)
+        except OSError as e:
+            log.warning("Lỗi khi lưu config: %s", e)
+
+    def _write(self, data):
+        # Không indent: tên trường rất dài, file nhỏ hơn và parse nhanh hơn
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with span("config.save", rects=len(data["rects"]), bytes=len(body)):
+            with atomic_write(self.config_path, backups=CONFIG_BACKUPS) as f:
+                f.write(body)
+            try:
+                self._snapshot(body, data)
+            except OSError as e:
+                log.warning("Không lưu được bản layout: %s", e)
+
+    def load_config(self):
+        try:
+            if not os.path.exists(self.config_path):
+                return [], []
+
+            with span("config.load"), open(self.config_path, "r", encoding="utf-8") as f:
+                return decode_layout(json.load(f))
+
+        except Exception as e:
+            log.warning("Lỗi khi đọc config: %s", e)
+            return [], []  # ✅ Luôn trả về đúng định dạng
+
+    # ----- Các bản layout cũ (khôi phục từ nút Lịch sử ở tab Vẽ vùng) -----
+
+    def snapshot_dir(self):
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), SNAPSHOT_DIR)
+
+    def list_snapshots(self):
+        """Đường dẫn các bản layout đã lưu, mới nhất trước"""
+        directory = self.snapshot_dir()
+        try:
+            names = [name for name in os.listdir(directory)
+                     if name.startswith("layout-") and name.endswith(".json")]
+        except OSError:
+            return []
+        return [os.path.join(directory, name) for name in sorted(names, reverse=True)]
+
+    def load_snapshot(self, path):
+        """(list (QRect, field), fields) của một bản layout; raise OSError/ValueError nếu file hỏng"""
+        with open(path, "r", encoding="utf-8") as f:
+            return decode_layout(json.load(f))
+
+    def _snapshot(self, body, data):
+        """Lưu thêm một bản layout nếu khác bản gần nhất (bỏ qua layout rỗng, vd. sau Reset)"""
+        if not data["rects"]:
+            return
+        if self._last_snapshot_body is None:
+            snapshots = self.list_snapshots()
+            self._last_snapshot_body = ""
+            if snapshots:
+                with open(snapshots[0], "r", encoding="utf-8") as f:
+                    self._last_snapshot_body = f.read()
+        if body == self._last_snapshot_body:
+            return
+        directory = self.snapshot_dir()
+        os.makedirs(directory, exist_ok=True)
+        now = time.time()
+        name = time.strftime("layout-%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}.json"
+        with atomic_write(os.path.join(directory, name), fsync=False) as f:
+            f.write(body)
+        self._last_snapshot_body = body
+        for old in self.list_snapshots()[MAX_SNAPSHOTS:]:
+            os.remove(old)
+
+    def read_txt(self, file_path):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                first_line = f.readline()
+                field_names = [field.strip() for field in first_line.strip().split("\t") if field.strip()]
+                log.debug("Danh sách trường từ file: %s", field_names)
+                return field_names
+        except Exception as e:
+            log.warning("Lỗi khi đọc file TXT: %s", e)
+            return []
+# Khởi tạo sẵn để sử dụng trong các file khác
+eu = EngineerUnderground()
+
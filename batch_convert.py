@@ -0,0 +1,133 @@
+"""
+Chuyển hàng loạt file Excel sang TXT của MagicTool (không cần GUI/server).
+
+    python batch_convert.py D:/data                 # mọi .xlsx/.xls trong thư mục
+    python batch_convert.py "D:/data/*.xlsx" -o out  # glob, ghi TXT vào thư mục out
+    python batch_convert.py D:/data --jobs 8 --force
+
+File TXT có cùng layout với Import Excel trong DrawingTab (dòng index, header đã sanitize,
+các dòng dữ liệu + cột "Not Done"). Bỏ qua file có TXT mới hơn file Excel, trừ khi dùng --force.
+Với -o, file trong thư mục con (-r) giữ nguyên đường dẫn tương đối dưới thư mục output; nếu hai file
+Excel vẫn ra cùng một TXT (vd. x.xlsx và x.xls) thì báo lỗi và không chuyển file nào.
+"""
+import os
+import sys
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from converter import convert_excel, txt_name_for, write_txt
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+
+def collect_inputs(patterns, recursive=False):
+    """
+    Danh sách (file Excel, thư mục gốc) từ các thư mục/glob, bỏ file khoá tạm của Excel (~$...).
+    Thư mục gốc là thư mục đã truyền vào (với glob: thư mục chứa file), dùng để giữ đường dẫn
+    tương đối khi ghi ra --output-dir.
+    """
+    found = {}
+    for pattern in patterns:
+        root = None
+        if os.path.isdir(pattern):
+            root = os.path.abspath(pattern)
+            pattern = os.path.join(pattern, "**", "*") if recursive else os.path.join(pattern, "*")
+        for path in glob.glob(pattern, recursive=recursive):
+            name = os.path.basename(path)
+            if os.path.isfile(path) and name.lower().endswith(EXCEL_EXTENSIONS) and not name.startswith("~$"):
+                path = os.path.abspath(path)
+                found.setdefault(path, root or os.path.dirname(path))
+    return sorted(found.items())
+
+
+def output_path_for(excel_path, output_dir=None, root=None):
+    """TXT cạnh file Excel, hoặc dưới output_dir theo đường dẫn tương đối của file so với root"""
+    if not output_dir:
+        return os.path.join(os.path.dirname(excel_path), txt_name_for(excel_path))
+    relative_dir = os.path.relpath(os.path.dirname(excel_path), root) if root else os.curdir
+    return os.path.normpath(os.path.join(output_dir, relative_dir, txt_name_for(excel_path)))
+
+
+def plan_outputs(inputs, output_dir=None):
+    """
+    Ghép mỗi file Excel với file TXT đầu ra trước khi chạy.
+    Trả về (list (excel, txt), dict txt → các file Excel ghi trùng vào nó).
+    """
+    targets = {}
+    for excel_path, root in inputs:
+        txt_path = output_path_for(excel_path, output_dir, root)
+        targets.setdefault(os.path.normcase(os.path.abspath(txt_path)), []).append((excel_path, txt_path))
+    pairs = [entries[0] for entries in targets.values()]
+    collisions = {entries[0][1]: [excel_path for excel_path, _ in entries]
+                  for entries in targets.values() if len(entries) > 1}
+    return pairs, collisions
+
+
+def is_up_to_date(excel_path, txt_path):
+    """True nếu TXT đã tồn tại và mới hơn (hoặc bằng) file Excel"""
+    try:
+        return os.path.getmtime(txt_path) >= os.path.getmtime(excel_path)
+    except OSError:
+        return False
+
+
+def convert_one(excel_path, txt_path):
+    """Chạy trong process con: Excel → TXT, trả về số dòng đã ghi"""
+    result = convert_excel(excel_path)
+    write_txt(txt_path, result['fields_raw'], result['fields'], result['data'])
+    return len(result['data'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chuyển hàng loạt Excel sang TXT của MagicTool")
+    parser.add_argument("inputs", nargs="+", help="Thư mục hoặc glob các file Excel")
+    parser.add_argument("-o", "--output-dir", help="Thư mục ghi TXT (mặc định: cùng thư mục với file Excel)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Số process chạy song song")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Tìm cả trong thư mục con")
+    parser.add_argument("-f", "--force", action="store_true", help="Chuyển lại cả file đã có TXT mới hơn")
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.inputs, args.recursive)
+    if not inputs:
+        print("Không tìm thấy file Excel nào.", file=sys.stderr)
+        return 1
+    pairs, collisions = plan_outputs(inputs, args.output_dir)
+    if collisions:
+        for txt_path, excel_paths in collisions.items():
+            print(f"✗ Nhiều file Excel cùng ghi ra {txt_path}:", file=sys.stderr)
+            for excel_path in excel_paths:
+                print(f"    {excel_path}", file=sys.stderr)
+        print("Không chuyển file nào. Đổi tên file hoặc chuyển riêng từng thư mục.", file=sys.stderr)
+        return 2
+
+    jobs = []
+    skipped = 0
+    for excel_path, txt_path in pairs:
+        os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+        if not args.force and is_up_to_date(excel_path, txt_path):
+            skipped += 1
+            print(f"- Bỏ qua (đã mới nhất): {excel_path}")
+            continue
+        jobs.append((excel_path, txt_path))
+
+    failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(jobs)))) as pool:
+            futures = {pool.submit(convert_one, excel_path, txt_path): (excel_path, txt_path)
+                       for excel_path, txt_path in jobs}
+            for future in as_completed(futures):
+                excel_path, txt_path = futures[future]
+                try:
+                    rows = future.result()
+                    print(f"✓ {excel_path} → {txt_path} ({rows} dòng)")
+                except Exception as e:
+                    failed += 1
+                    print(f"✗ {excel_path}: {e}", file=sys.stderr)
+
+    print(f"\nĐã chuyển: {len(jobs) - failed}, bỏ qua: {skipped}, lỗi: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Benchmark GUI không cần màn hình (QT_QPA_PLATFORM=offscreen): GridCanvas và MainWindow.on_done.
+
+    python benchmarks/bench_gui.py
+    python benchmarks/bench_gui.py --rects 10 100 1000 --moves 300 -o gui.json
+
+Với mỗi layout 10/100/1000 rect:
+- canvas_paint:   thời gian repaint() (paintEvent) của GridCanvas
+- canvas_move:    thời gian xử lý mouseMoveEvent khi kéo/resize rect
+- canvas_frame:   move + repaint, tương đương một khung hình khi kéo chuột
+- on_done:        dựng lại Trang chính (đổi qua lại giữa các layout)
+Kết quả in theo percentile p50/p95/p99 (ms). config.json KHÔNG bị ghi đè (dùng file config tạm).
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PySide6.QtCore import Qt, QPoint, QPointF, QRect, QEvent, QTimer  # noqa: E402
+from PySide6.QtGui import QColor, QMouseEvent  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import datasets  # noqa: E402
+from run_benchmarks import git_commit  # noqa: E402
+
+
+def percentiles(samples):
+    """p50/p95/p99/max theo ms (nearest-rank)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {"count": len(ordered), "p50_ms": round(rank(50), 3), "p95_ms": round(rank(95), 3),
+            "p99_ms": round(rank(99), 3), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def make_layout(count, grid_size, columns):
+    """count rect 2×1 ô, cách nhau 1 ô, xếp từ hàng thứ 4 (dưới vùng đóng băng)"""
+    rects = []
+    for i in range(count):
+        row, col = divmod(i, columns)
+        rect = QRect((col * 3) * grid_size, (3 + row * 2) * grid_size, 2 * grid_size, grid_size)
+        rects.append((rect, QColor(0, 100, 255), f"Field {i + 1}"))
+    return rects
+
+
+def mouse_event(kind, pos, button=Qt.LeftButton):
+    buttons = Qt.NoButton if kind == QEvent.MouseButtonRelease else Qt.LeftButton
+    if kind == QEvent.MouseMove:
+        button = Qt.NoButton
+    point = QPointF(pos)
+    return QMouseEvent(kind, point, point, button, buttons, Qt.NoModifier)
+
+
+def drag_script(rect, grid_size, moves):
+    """Các cặp (điểm nhấn, danh sách điểm di chuyển): kéo rect đi vòng và resize góc dưới-phải"""
+    center = rect.center()
+    path = []
+    for step in range(moves):
+        phase = step % 40
+        offset = phase if phase < 20 else 40 - phase
+        path.append(center + QPoint(offset * grid_size // 4, (offset % 7) * grid_size // 4))
+    corner = rect.bottomRight()
+    resize_path = []
+    for step in range(moves):
+        phase = step % 30
+        offset = phase if phase < 15 else 30 - phase
+        resize_path.append(corner + QPoint(offset * grid_size // 3, offset * grid_size // 5))
+    return [(center, path), (corner, resize_path)]
+
+
+def bench_canvas(app, count, moves):
+    from grid_canvas import GridCanvas
+    canvas = GridCanvas([], lambda *args, **kwargs: None)
+    grid_size = canvas.grid_size
+    columns = 20
+    rows = (count + columns - 1) // columns
+    canvas.resize(columns * 3 * grid_size, (3 + rows * 2 + 6) * grid_size)
+    canvas.show()
+    app.processEvents()
+
+    layout = make_layout(count, grid_size, columns)
+    canvas.set_fields([field for _, _, field in layout])
+    canvas.rects = list(layout)
+    canvas.occupied_cells = set()
+    for rect, _, _ in layout:
+        canvas.occupied_cells |= canvas.get_cells_in_rect(rect)
+    canvas.used_fields = {field for _, _, field in layout}
+
+    paint, move, frame = [], [], []
+    for _ in range(20):  # Khởi động cache nhãn/pen
+        canvas.repaint()
+    for _ in range(moves):
+        start = time.perf_counter()
+        canvas.repaint()
+        paint.append(time.perf_counter() - start)
+
+    # Kéo rect cuối (nằm sát vùng trống bên dưới) để vừa có bước hợp lệ vừa có bước bị chặn
+    target = layout[-1][0]
+    for press_pos, path in drag_script(target, grid_size, moves):
+        app.sendEvent(canvas, mouse_event(QEvent.MouseButtonPress, press_pos))
+        for pos in path:
+            start = time.perf_counter()
+            app.sendEvent(canvas, mouse_event(QEvent.MouseMove, pos))
+            moved = time.perf_counter()
+            canvas.repaint()
+            done = time.perf_counter()
+            move.append(moved - start)
+            frame.append(done - start)
+        app.sendEvent(canvas, mouse_event(QEvent.MouseButtonRelease, path[-1]))
+        target = canvas.rects[-1][0]
+
+    canvas.close()
+    canvas.deleteLater()
+    app.processEvents()
+    return {"canvas_paint": percentiles(paint), "canvas_move": percentiles(move), "canvas_frame": percentiles(frame)}
+
+
+def bench_on_done(app, count, rebuilds, workdir):
+    from back_end import eu
+    eu.config_path = os.path.join(workdir, "config.json")  # Không đụng vào config.json thật
+
+    from main import MainWindow
+    txt_path = os.path.join(workdir, f"gui_{count}.txt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        window = MainWindow()
+        window.resize(1400, 900)
+        window.show()
+        app.processEvents()
+        grid_size = int(window.logicalDpiX() // 2.54)
+
+        fields = datasets.write_txt(txt_path, 200, count, 120)
+        window.current_file_path = txt_path
+        window.sm.load_from_txt(txt_path)
+
+        columns = 20
+        full = [(rect, color, fields[i]) for i, (rect, color, _) in enumerate(make_layout(count, grid_size, columns))]
+        shifted = [(rect.translated(grid_size, 0), color, field) for rect, color, field in full]
+        half = full[: max(1, count // 2)]
+        layouts = [full, shifted, half]
+
+        window.on_done(full, stay_on_current_tab=True)  # Lần dựng đầu tiên (tạo toàn bộ widget)
+        samples = []
+        for i in range(rebuilds):
+            rects = layouts[i % len(layouts)]
+            start = time.perf_counter()
+            window.on_done(rects, stay_on_current_tab=True)
+            app.processEvents()
+            samples.append(time.perf_counter() - start)
+
+        window.prefetcher.shutdown()
+        window.hide()
+        window.deleteLater()
+        app.processEvents()
+    return {"on_done": percentiles(samples)}
+
+
+def print_results(results):
+    print(f"{'case':<14} {'rects':>6} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for result in results:
+        print(f"{result['name']:<14} {result['rects']:>6} {result['count']:>6} {result['p50_ms']:>9.3f} "
+              f"{result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} {result['max_ms']:>9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GridCanvas và on_done trên nền offscreen")
+    parser.add_argument("--rects", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--moves", type=int, default=200, help="Số sự kiện chuột mỗi thao tác kéo/resize")
+    parser.add_argument("--rebuilds", type=int, default=30, help="Số lần gọi on_done mỗi layout")
+    parser.add_argument("--skip-window", action="store_true", help="Chỉ đo GridCanvas")
+    parser.add_argument("-o", "--output", help="Ghi kết quả ra file JSON")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+
+    def run():
+        try:
+            with tempfile.TemporaryDirectory(prefix="magictool-gui-bench-") as workdir:
+                for count in args.rects:
+                    cases = bench_canvas(app, count, args.moves)
+                    if not args.skip_window:
+                        cases.update(bench_on_done(app, count, args.rebuilds, workdir))
+                    for name, stats in cases.items():
+                        results.append({"name": name, "rects": count, **stats})
+        finally:
+            app.quit()
+
+    # Chạy trong event loop thật để các thread/timer của MainWindow hoạt động như khi dùng thật
+    QTimer.singleShot(0, run)
+    app.exec()
+
+    print_results(results)
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qt_platform": os.environ.get("QT_QPA_PLATFORM"),
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nĐã ghi kết quả: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Sinh dữ liệu tổng hợp cho benchmark: TXT của MagicTool và file Excel đầu vào"""
+import random
+
+WORDS = (
+    "môi trường khí hậu nước biển đất rừng năng lượng tài nguyên ô nhiễm bền vững "
+    "climate water soil energy pollution ecosystem carbon green urban waste review"
+).split()
+
+
+def make_fields(n_fields, multiline_header=True):
+    """Tên cột dài, nhiều dòng (3==D) giống keyword.txt.txt"""
+    fields = []
+    for i in range(n_fields):
+        name = f"{i + 1}. Field {i + 1} ({' '.join(WORDS[i % len(WORDS):][:3])})"
+        if multiline_header:
+            name += "**3==D3==D* " + "3==D* ".join(WORDS[(i + k) % len(WORDS)] for k in range(4))
+        fields.append(name)
+    return fields
+
+
+def make_cell(rng, cell_len, multiline_ratio):
+    """Một ô dữ liệu dài ~cell_len ký tự, một phần có xuống dòng mã hoá 3==D"""
+    words = []
+    length = 0
+    while length < cell_len:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    if words and rng.random() < multiline_ratio:
+        for _ in range(max(1, len(words) // 12)):
+            words[rng.randrange(len(words))] += "3==D"
+    return " ".join(words)[:cell_len]
+
+
+def iter_rows(rows, n_fields, cell_len, multiline_ratio=0.3, seed=0):
+    rng = random.Random(seed)
+    for _ in range(rows):
+        yield [make_cell(rng, cell_len, multiline_ratio) for _ in range(n_fields)]
+
+
+def write_txt(path, rows, n_fields, cell_len, multiline_ratio=0.3, done_ratio=0.4, seed=0):
+    """Ghi TXT đúng layout của MagicTool: index, header, dữ liệu + cột status"""
+    fields = make_fields(n_fields)
+    rng = random.Random(seed + 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("0\n")
+        f.write("\t".join(fields) + "\n")
+        for values in iter_rows(rows, n_fields, cell_len, multiline_ratio, seed):
+            status = "Done" if rng.random() < done_ratio else "Not Done"
+            f.write("\t".join(values) + "\t" + status + "\n")
+    return fields
+
+
+def write_excel(path, rows, n_fields, cell_len, multiline_ratio=0.3, seed=0):
+    """Ghi file Excel đầu vào (xuống dòng thật trong ô và header) cho benchmark server"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([field.replace("3==D", "\n") for field in make_fields(n_fields)])
+    for values in iter_rows(rows, n_fields, cell_len, multiline_ratio, seed):
+        sheet.append([value.replace("3==D", "\n") for value in values])
+    workbook.save(path)
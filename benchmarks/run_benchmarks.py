@@ -0,0 +1,243 @@
+"""
+Benchmark load/save/filter/import/export trên dữ liệu tổng hợp.
+
+    python benchmarks/run_benchmarks.py --size small
+    python benchmarks/run_benchmarks.py --rows 50000 --fields 20 --cell-len 300 -o before.json
+    python benchmarks/run_benchmarks.py --size medium -o after.json --compare before.json
+
+Mỗi case đo thời gian (lặp --repeat lần, lấy min/median) và bộ nhớ đỉnh (tracemalloc, chạy riêng 1 lần).
+Kết quả ghi ra JSON kèm commit hiện tại để so sánh giữa các commit.
+"""
+import os
+import sys
+import io
+import gc
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datasets  # noqa: E402
+from sentence_manager import SentenceManager  # noqa: E402
+from converter import write_txt  # noqa: E402
+from atomic_io import atomic_write  # noqa: E402
+from sentence_filter import CONTAINS, NOT_EMPTY, Condition, RowFilter  # noqa: E402
+
+SIZES = {
+    # rows, fields, cell_len
+    "small": (1000, 10, 80),
+    "medium": (20000, 20, 200),
+    "large": (100000, 30, 300),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def measure(fn, setup=None, repeat=3):
+    """Trả về (danh sách thời gian, bộ nhớ đỉnh MB). setup() tạo đối số mới cho mỗi lần chạy."""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(arg)
+        times.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak / (1024 * 1024)
+
+
+def loaded_manager(txt_path):
+    sm = SentenceManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sm.load_from_txt(txt_path)
+    return sm
+
+
+def run_cases(workdir, rows, fields, cell_len, repeat, only=None):
+    txt_path = os.path.join(workdir, "data.txt")
+    datasets.write_txt(txt_path, rows, fields, cell_len)
+    base = loaded_manager(txt_path)
+
+    def fresh():
+        return SentenceManager()
+
+    def load(sm):
+        sm.load_from_txt(txt_path, force=True)
+
+    def save(sm):
+        sm.save_to_txt(os.path.join(workdir, "saved.txt"))
+
+    # Cách ghi cũ (mở file đích bằng "w", ghi đè tại chỗ) để so với save_to_txt ghi nguyên tử
+    def save_inplace(sm):
+        with open(os.path.join(workdir, "saved_inplace.txt"), "w", encoding="utf-8") as f:
+            f.writelines(sm.iter_txt_lines())
+
+    def save_atomic_nofsync(sm):
+        with atomic_write(os.path.join(workdir, "saved_nofsync.txt"), fsync=False) as f:
+            f.writelines(sm.iter_txt_lines())
+
+    def filter_cycle(sm):
+        for filter_type in ("Done", "Not Done", "All"):
+            sm.apply_filter(filter_type)
+
+    # Filter theo điều kiện trên nội dung, đo cả lần đầu (cache trống) và lần lặp lại (trúng cache)
+    content_filter = RowFilter([Condition(NOT_EMPTY, base.fields[0]),
+                                Condition(CONTAINS, base.fields[-1], "a")])
+
+    def filter_content(sm):
+        sm.apply_filter(content_filter)
+        sm.apply_filter("All")
+
+    def cold_cache():
+        base.filter_cache.clear()
+        return base
+
+    cases = [
+        ("load_from_txt", load, fresh),
+        ("save_to_txt", save, lambda: base),
+        ("save_txt_inplace", save_inplace, lambda: base),
+        ("save_txt_atomic_nofsync", save_atomic_nofsync, lambda: base),
+        ("apply_filter", filter_cycle, lambda: base),
+        ("filter_content_cold", filter_content, cold_cache),
+        ("filter_content_cached", filter_content, lambda: base),
+    ]
+
+    # Bước ghi TXT + dựng SentenceManager sau khi server trả kết quả (ImportWorker)
+    header_fields = datasets.make_fields(fields)
+    fields_raw = [field.replace("3==D", "\n") for field in header_fields]
+    records = [{raw: value.replace("3==D", "\n") for raw, value in zip(fields_raw, values)}
+               for values in datasets.iter_rows(rows, fields, cell_len)]
+
+    def import_write_load(sm):
+        import_path = os.path.join(workdir, "import.txt")
+        sm.load_from_rows(header_fields, write_txt(import_path, fields_raw, header_fields, records), import_path)
+    cases.append(("import_write_load", import_write_load, fresh))
+
+    # Lưu/đọc config.json với layout một vùng vẽ cho mỗi trường (tên trường dài như keyword.txt.txt)
+    from back_end import EngineerUnderground
+    from PySide6.QtCore import QRect
+    store = EngineerUnderground()
+    store.config_path = os.path.join(workdir, "config.json")
+    layout_rects = [(QRect(0, row * 40, 200, 80), None, field)
+                    for row, field in enumerate(header_fields)]
+
+    def config_save(_):
+        store.save_config(layout_rects, header_fields)
+
+    def config_load(_):
+        store.load_config()
+    cases.append(("config_save", config_save, None))
+    cases.append(("config_load", config_load, None))
+
+    import exporters
+    for fmt in exporters.available_formats():
+        def export(sm, fmt=fmt):
+            sm.export_to(os.path.join(workdir, f"export.{fmt}"), fmt, sentences=sm.all_sentences)
+        cases.append((f"export_{fmt}", export, lambda: base))
+
+    try:
+        from server import app, cache
+        excel_path = os.path.join(workdir, "input.xlsx")
+        datasets.write_excel(excel_path, rows, fields, cell_len)
+        client = app.test_client()
+
+        def upload(_):
+            with open(excel_path, "rb") as f:
+                response = client.post("/upload_excel", data={"file": (f, "input.xlsx")})
+            if response.status_code != 200:
+                raise RuntimeError(response.get_json().get("error"))
+        # Xoá cache chuyển đổi trước mỗi lần đo để luôn đo đủ parse/sanitize/serialize
+        cases.append(("server_upload_excel", upload, cache.clear))
+    except ImportError as e:
+        print(f"  (bỏ qua server_upload_excel: {e})")
+
+    results = []
+    for name, fn, setup in cases:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        times, peak_mb = measure(fn, setup, repeat)
+        result = {
+            "name": name, "rows": rows, "fields": fields, "cell_len": cell_len,
+            "times_s": [round(t, 6) for t in times],
+            "min_s": round(min(times), 6),
+            "median_s": round(statistics.median(times), 6),
+            "peak_mb": round(peak_mb, 2),
+        }
+        results.append(result)
+        print(f"  {name:<22} median {result['median_s']:9.4f}s   min {result['min_s']:9.4f}s   peak {peak_mb:9.1f} MB")
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["name"], r["rows"], r["fields"], r["cell_len"]): r for r in json.load(f)["results"]}
+    print(f"\nSo sánh với {baseline_path} (median, >1 là chậm hơn):")
+    for result in results:
+        old = baseline.get((result["name"], result["rows"], result["fields"], result["cell_len"]))
+        if old is None or not old["median_s"]:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        print(f"  {result['name']:<22} x{ratio:5.2f}   peak {old['peak_mb']:.1f} → {result['peak_mb']:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SentenceManager, server và exporters")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--fields", type=int)
+    parser.add_argument("--cell-len", type=int)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="Chỉ chạy case có tên chứa chuỗi này (lặp lại được)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="File JSON kết quả cũ để so sánh")
+    args = parser.parse_args(argv)
+
+    rows, fields, cell_len = SIZES[args.size]
+    rows = args.rows or rows
+    fields = args.fields or fields
+    cell_len = args.cell_len or cell_len
+
+    print(f"Dataset: {rows} dòng × {fields} trường × {cell_len} ký tự/ô")
+    with tempfile.TemporaryDirectory(prefix="magictool-bench-") as workdir:
+        results = run_cases(workdir, rows, fields, cell_len, args.repeat, args.only)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nĐã ghi kết quả: {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Chuyển Excel sang dữ liệu/TXT của MagicTool.
+Dùng chung cho server.py (/upload_excel), DrawingTab (ghi TXT sau khi import) và batch_convert.py.
+"""
+import os
+import time
+from operator import itemgetter
+
+from atomic_io import atomic_write
+
+CANCEL_CHECK_ROWS = 1000  # Số dòng giữa hai lần kiểm tra yêu cầu huỷ khi ghi TXT
+
+
+class Cancelled(Exception):
+    """Người dùng đã huỷ thao tác (import/ghi TXT) đang chạy"""
+
+
+def sanitize_field(col):
+    """Header hiển thị/ghi TXT: thay thế ký tự đặc biệt, KHÔNG strip"""
+    col = str(col)
+    return col.replace('\t', '3==D').replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D')
+
+
+def process_data_cell(value):
+    """Dữ liệu trong ô: thay thế ký tự đặc biệt, KHÔNG đổi key"""
+    if isinstance(value, str):
+        return value.strip().replace('\t', '3==D').replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D')
+    return str(value)
+
+
+def convert_excel(file_path, timings=None):
+    """
+    Đọc file Excel (đường dẫn hoặc file-like), trả về dict giống response của server:
+    {'fields_raw': tên cột gốc, 'fields': header đã sanitize, 'data': list các dòng dạng dict}
+    timings: nếu truyền dict, ghi thời gian (giây) của từng bước 'parse', 'sanitize', 'serialize'
+    """
+    import pandas as pd
+
+    # Đọc dữ liệu bằng pandas
+    started = time.perf_counter()
+    df = pd.read_excel(file_path).fillna("")
+    parsed = time.perf_counter()
+
+    # Lưu nguyên tên cột (không strip) để mapping
+    fields_raw = [str(col) for col in df.columns]
+    fields_header = [sanitize_field(col) for col in df.columns]
+
+    # DataFrame.applymap đã bị bỏ ở pandas mới, thay bằng DataFrame.map
+    map_cells = getattr(df, "map", None) or df.applymap
+    df_processed = map_cells(process_data_cell)
+    sanitized = time.perf_counter()
+
+    data = df_processed.to_dict(orient='records')
+    if timings is not None:
+        timings['parse'] = parsed - started
+        timings['sanitize'] = sanitized - parsed
+        timings['serialize'] = time.perf_counter() - sanitized
+    return {'fields_raw': fields_raw, 'fields': fields_header, 'data': data}
+
+
+def txt_name_for(excel_path):
+    """Tên file TXT tương ứng với file Excel (giống khi Import Excel trong DrawingTab)"""
+    file_name = os.path.basename(excel_path).replace(".xlsx", "").replace(".xls", "")
+    return f"{file_name}.txt"
+
+
+def txt_value(val):
+    """Giá trị một ô khi ghi TXT: strip, xuống dòng/tab → 3==D"""
+    if not isinstance(val, str):
+        return str(val)
+    return val.strip().replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D').replace('\t', '3==D')
+
+
+def _cell_getter(fields_raw):
+    """Hàm lấy tuple giá trị các cột theo thứ tự fields_raw từ một dòng dict (KeyError nếu thiếu cột)"""
+    if len(fields_raw) == 1:
+        key = fields_raw[0]
+        return lambda row: (row[key],)
+    return itemgetter(*fields_raw) if fields_raw else (lambda row: ())
+
+
+def txt_rows(data, fields_raw):
+    """
+    Sinh (giá trị từng ô, dòng đã nối bằng tab) khi ghi TXT, kết quả như txt_value cho từng ô.
+    Strip từng ô rồi replace xuống dòng một lần trên cả dòng thay vì từng ô.
+    """
+    pick = _cell_getter(fields_raw)
+    expected_tabs = len(fields_raw) - 1
+    for row in data:
+        try:
+            cells = pick(row)
+        except KeyError:
+            cells = [row.get(raw, "") for raw in fields_raw]
+        values = [val.strip() if isinstance(val, str) else str(val) for val in cells]
+        line = "\t".join(values)
+        if line.count("\t") != expected_tabs:
+            # Có tab trong ô: xử lý từng ô để không lẫn với tab phân cách cột
+            values = [txt_value(val) for val in values]
+            line = "\t".join(values)
+        elif "\n" in line or "\r" in line:
+            line = line.replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D')
+            values = line.split("\t")
+        yield values, line
+
+
+def write_txt(txt_path, fields_raw, header_fields, data, cancelled=None, backups=0):
+    """
+    Ghi file TXT theo đúng thứ tự cột gốc:
+    dòng 1 là index (0), dòng 2 là header, sau đó từng dòng dữ liệu + cột status "Not Done"
+    Ghi nguyên tử (atomic_write): file cũ chỉ bị thay khi đã ghi xong; backups: số bản cũ giữ lại.
+    cancelled: hàm trả về True nếu cần dừng (raise Cancelled, file đích giữ nguyên)
+    Trả về list giá trị từng dòng (không có status) đúng như đã ghi, để dựng SentenceManager
+    mà không phải đọc lại file (SentenceManager.load_from_rows).
+    """
+    if cancelled is not None and cancelled():
+        raise Cancelled()
+    rows = []
+    # Ghi theo khối CANCEL_CHECK_ROWS dòng thay vì từng f.write nhỏ
+    with atomic_write(txt_path, buffering=1 << 20, backups=backups) as f:
+        f.write("0\n")  # Dòng đầu tiên là index mặc định
+        f.write("\t".join(header_fields) + "\n")
+        lines = []
+        for values, line in txt_rows(data, fields_raw):
+            rows.append(values)
+            # Thêm status "Not Done" vào cột cuối
+            lines.append(line + "\tNot Done\n")
+            if len(lines) == CANCEL_CHECK_ROWS:
+                f.write("".join(lines))
+                lines = []
+                if cancelled is not None and cancelled():
+                    raise Cancelled()
+        f.write("".join(lines))
+        if cancelled is not None and cancelled():
+            raise Cancelled()
+    return rows
@@ -0,0 +1,195 @@
+"""Bảng debug ẩn (Ctrl+Shift+D): thống kê span, span gần nhất và log trong bộ nhớ; bảng độ trễ review (F9)"""
+import logging
+import time
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QTableWidget, QTableWidgetItem,
+    QPlainTextEdit, QCheckBox, QComboBox, QPushButton, QLabel, QHeaderView, QFileDialog, QMessageBox
+)
+from PySide6.QtCore import Qt, QTimer
+
+import instrumentation
+from instrumentation import tracer, log_buffer, latency
+
+LOG_LEVELS = ["WARNING", "INFO", "DEBUG"]
+RECENT_SPANS = 200  # Số span gần nhất hiển thị
+
+
+class DebugPanel(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Debug")
+        self.resize(760, 480)
+
+        layout = QVBoxLayout(self)
+        controls = QHBoxLayout()
+        self.trace_checkbox = QCheckBox("Ghi span thời gian")
+        self.trace_checkbox.setChecked(tracer.enabled)
+        self.trace_checkbox.toggled.connect(self.set_tracing)
+        controls.addWidget(self.trace_checkbox)
+
+        controls.addWidget(QLabel("Mức log:"))
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(LOG_LEVELS)
+        current_level = logging.getLevelName(instrumentation.logger.getEffectiveLevel())
+        if current_level in LOG_LEVELS:
+            self.level_combo.setCurrentText(current_level)
+        self.level_combo.currentTextChanged.connect(instrumentation.set_log_level)
+        controls.addWidget(self.level_combo)
+        controls.addStretch()
+
+        refresh_btn = QPushButton("Làm mới")
+        refresh_btn.clicked.connect(self.refresh)
+        clear_btn = QPushButton("Xoá")
+        clear_btn.clicked.connect(self.clear)
+        controls.addWidget(refresh_btn)
+        controls.addWidget(clear_btn)
+        layout.addLayout(controls)
+
+        self.tabs = QTabWidget()
+        self.summary_table = self.create_table(["Span", "Số lần", "p50 ms", "p95 ms", "Max ms", "Lần cuối ms", "Tổng ms"])
+        self.recent_table = self.create_table(["Thời điểm", "Span", "ms", "Thread", "Thông tin"])
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(instrumentation.MAX_LOG_RECORDS)
+        self.tabs.addTab(self.summary_table, "Tổng hợp")
+        self.tabs.addTab(self.recent_table, "Span gần nhất")
+        self.tabs.addTab(self.log_view, "Log")
+        layout.addWidget(self.tabs)
+
+        # Chỉ làm mới khi bảng đang mở
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    @staticmethod
+    def create_table(headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def set_tracing(self, enabled):
+        tracer.enabled = enabled
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def clear(self):
+        tracer.clear()
+        log_buffer.records.clear()
+        self.refresh()
+
+    def refresh(self):
+        summary = sorted(tracer.summary().items(), key=lambda item: -item[1]["total_ms"])
+        self.summary_table.setRowCount(len(summary))
+        for row, (name, stats) in enumerate(summary):
+            values = [name, str(stats["count"])] + [
+                f"{stats[key]:.2f}" for key in ("p50_ms", "p95_ms", "max_ms", "last_ms", "total_ms")
+            ]
+            self.fill_row(self.summary_table, row, values)
+
+        recent = tracer.snapshot()[-RECENT_SPANS:][::-1]
+        self.recent_table.setRowCount(len(recent))
+        for row, (name, ended_at, duration, attrs, thread_name) in enumerate(recent):
+            info = ", ".join(f"{key}={value}" for key, value in attrs.items())
+            values = [time.strftime("%H:%M:%S", time.localtime(ended_at)), name,
+                      f"{duration * 1000:.2f}", thread_name, info]
+            self.fill_row(self.recent_table, row, values)
+
+        lines = log_buffer.lines()
+        text = "\n".join(lines)
+        if self.log_view.toPlainText() != text:
+            self.log_view.setPlainText(text)
+            self.log_view.verticalScrollBar().setValue(self.log_view.verticalScrollBar().maximum())
+
+    @staticmethod
+    def fill_row(table, row, values):
+        for column, value in enumerate(values):
+            item = table.item(row, column)
+            if item is None:
+                item = QTableWidgetItem()
+                if column > 0 and table.horizontalHeaderItem(column).text().endswith(("ms", "lần")):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, column, item)
+            item.setText(value)
+
+
+def format_bytes(value):
+    if value is None:
+        return ""
+    for unit in ("B", "KB", "MB"):
+        if value < 1024 or unit == "MB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class LatencyPanel(QDialog):
+    """Độ trễ cuộn của các thao tác review (lưu câu, ghi TXT, cập nhật ô, chuyển câu)"""
+    COLUMNS = ["Thao tác", "Số lần", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Lần cuối ms", "Byte lần cuối", "Byte TB"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Độ trễ thao tác (F9)")
+        self.resize(720, 260)
+
+        layout = QVBoxLayout(self)
+        self.table = DebugPanel.create_table(self.COLUMNS)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.info_label = QLabel(f"{latency.window} lần đo gần nhất mỗi thao tác")
+        buttons.addWidget(self.info_label)
+        buttons.addStretch()
+        export_btn = QPushButton("Xuất JSON...")
+        export_btn.clicked.connect(self.export_json)
+        clear_btn = QPushButton("Xoá")
+        clear_btn.clicked.connect(self.clear)
+        buttons.addWidget(export_btn)
+        buttons.addWidget(clear_btn)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def clear(self):
+        latency.clear()
+        self.refresh()
+
+    def refresh(self):
+        stats = sorted(latency.stats().items())
+        self.table.setRowCount(len(stats))
+        for row, (name, values) in enumerate(stats):
+            DebugPanel.fill_row(self.table, row, [name, str(values["count"])] + [
+                f"{values[key]:.2f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms", "last_ms")
+            ] + [format_bytes(values.get("last_bytes")), format_bytes(values.get("avg_bytes"))])
+
+    def export_json(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Xuất số liệu độ trễ", time.strftime("latency_%Y%m%d_%H%M%S.json"), "JSON Files (*.json)"
+        )
+        if not file_path:
+            return
+        try:
+            latency.export_json(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Lỗi", f"Không ghi được file:\n{e}")
@@ -1,16 +1,22 @@
 import os
 import sys
+import math
+import time
 import threading
 
 from PySide6.QtWidgets import (
-    QWidget, QHBoxLayout, QPushButton, QVBoxLayout, QListWidget,
-    QListWidgetItem, QMenu, QFrame, QScrollArea, QFileDialog, QMessageBox, QLineEdit, QLabel, QSizePolicy
+    QWidget, QHBoxLayout, QPushButton, QVBoxLayout, QListView, QMenu, QFrame, QScrollArea, QFileDialog, QMessageBox, QLineEdit, QLabel, QSizePolicy,
+    QDialog, QDialogButtonBox, QListWidget, QListWidgetItem
 )
-import requests
-from PySide6.QtGui import QColor
+from PySide6.QtGui import QColor, QFont, QFontMetricsF
 from PySide6.QtCore import Qt, QPoint, QThread, Signal, QRect, QTimer
 from back_end import eu
 from grid_canvas import GridCanvas  # nếu bạn để GridCanvas ở file khác
+from field_list_model import FieldListModel
+from converter import Cancelled, txt_name_for, write_txt
+from instrumentation import get_logger, span
+
+log = get_logger(__name__)
 
 
 class NotificationWidget(QLabel):
@@ -58,34 +64,179 @@ class NotificationWidget(QLabel):
         self.hide()
 
 class ImportWorker(QThread):
-    """Worker thread để import Excel không block UI"""
-    finished = Signal(dict)  # Signal khi thành công, trả về result
+    """
+    Worker thread import Excel không block UI, chạy theo từng bước có thể huỷ:
+    upload (server chuyển đổi) → write: ghi TXT nguyên tử (atomic_write: file tạm + fsync + os.replace,
+    bản TXT cũ giữ lại làm <txt>.bak1) → load SentenceManager từ các dòng vừa ghi.
+    Huỷ ở bước upload/write: file tạm bị xoá, file TXT cũ giữ nguyên. Huỷ ở bước load (đã replace):
+    không rollback, TXT mới nằm trên đĩa, bản cũ ở <txt>.bak1; chỉ bỏ qua kết quả.
+    Chỉ phần dựng widget chạy trên UI thread (on_import_success).
+    """
+    finished = Signal(dict)  # Signal khi thành công: {'fields', 'sm', 'txt_path'}
     error = Signal(str)      # Signal khi có lỗi, trả về error message
+    cancelled = Signal()     # Signal khi đã dừng theo yêu cầu huỷ (xem docstring: TXT cũ hay mới còn trên đĩa)
+    progress = Signal(str, int, int)  # ("upload"/"download", số byte đã xong, tổng byte; 0 nếu không biết)
+    stage = Signal(str)      # Bước đang chạy: "upload", "write", "load"
     
-    def __init__(self, file_path, ip):
+    def __init__(self, file_path, ip, txt_path):
         super().__init__()
         self.file_path = file_path
         self.ip = ip
+        self.txt_path = txt_path
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Yêu cầu dừng; worker dừng ở lần kiểm tra kế tiếp (giữa các khối gửi/nhận, mỗi 1000 dòng ghi)"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise Cancelled()
     
     def run(self):
         """Chạy trong thread riêng"""
         try:
-            # Gửi file Excel lên server
+            # Import khi cần: không làm chậm lúc khởi động ứng dụng
+            from http_client import upload_file
+            from sentence_manager import TXT_BACKUPS, SentenceManager
+
+            # 1. Gửi file Excel lên server (session dùng chung, có timeout và thử lại)
+            self.stage.emit("upload")
             url = f"http://{self.ip}:5000/upload_excel"
-            with open(self.file_path, 'rb') as f:
-                response = requests.post(url, files={'file': f})
-            
-            if response.status_code != 200:
-                raise Exception(response.json().get('error', 'Unknown error'))
-            
-            result = response.json()
-            self.finished.emit(result)  # Emit signal với kết quả
+            with span("import.upload", path=self.file_path):
+                result = upload_file(url, self.file_path, progress=self.progress.emit, cancelled=self.is_cancelled)
+            self.check_cancelled()
+
+            # 2. Ghi TXT nguyên tử (file tạm + fsync + đổi tên), giữ bản TXT cũ làm .bak1
+            self.stage.emit("write")
+            fields_raw = result['fields_raw']  # Thứ tự và tên cột gốc từ Excel (không strip)
+            header_fields = result['fields']   # Header đã sanitize (3==D thay cho xuống dòng/tab)
+            data = result['data']
+            log.info("Excel import: %d fields, %d rows", len(fields_raw), len(data))
+            log.debug("Fields raw: %s", fields_raw)
+            with span("import.write_txt", rows=len(data)):
+                rows = write_txt(self.txt_path, fields_raw, header_fields, data,
+                                 cancelled=self.is_cancelled, backups=TXT_BACKUPS)
+            del result, data  # Không giữ 2 bản dữ liệu trong bộ nhớ
+
+            # 3. Dựng SentenceManager từ các dòng vừa ghi, không đọc lại file
+            #    (file đã hoàn chỉnh, huỷ từ đây chỉ bỏ qua kết quả)
+            self.stage.emit("load")
+            sm = SentenceManager()
+            sm.load_from_rows(header_fields, rows, self.txt_path)
+            self.check_cancelled()
+
+            self.finished.emit({'fields': header_fields, 'sm': sm, 'txt_path': self.txt_path})
             
+        except Cancelled:
+            log.info("Import %s cancelled", self.file_path)
+            self.cancelled.emit()
         except Exception as e:
             self.error.emit(str(e))  # Emit signal lỗi
 
 
+class LayoutHistoryDialog(QDialog):
+    """Danh sách các bản layout đã lưu (mới nhất trước) để chọn khôi phục"""
+
+    def __init__(self, snapshots, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Lịch sử layout")
+        self.setMinimumSize(420, 320)
+        layout = QVBoxLayout(self)
+        self.list_widget = QListWidget()
+        for path in snapshots:
+            item = QListWidgetItem(self.describe(path))
+            item.setData(Qt.UserRole, path)
+            self.list_widget.addItem(item)
+        self.list_widget.setCurrentRow(0)
+        self.list_widget.itemDoubleClicked.connect(self.accept)
+        layout.addWidget(self.list_widget)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("Khôi phục")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    @staticmethod
+    def describe(path):
+        try:
+            rects, fields = eu.load_snapshot(path)
+            saved_at = time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(os.path.getmtime(path)))
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            return f"{os.path.basename(path)} (không đọc được)"
+        return f"{saved_at}  -  {len(rects)} vùng, {len(fields)} trường"
+
+    def selected_path(self):
+        item = self.list_widget.currentItem()
+        return item.data(Qt.UserRole) if item is not None else None
+
+
+# Cache font metrics dùng chung giữa các lần đo: (family, size) -> (QFontMetricsF, {dòng: độ rộng px})
+_font_metrics_cache = {}
+_font_metrics_lock = threading.Lock()
+
+
+def cached_font_metrics(family, point_size):
+    """Trả về (metrics, cache độ rộng từng dòng) cho font, tạo mới nếu chưa có"""
+    key = (family, point_size)
+    with _font_metrics_lock:
+        entry = _font_metrics_cache.get(key)
+        if entry is None:
+            font = QFont(family)
+            font.setPointSize(point_size)
+            entry = (QFontMetricsF(font), {})
+            _font_metrics_cache[key] = entry
+        return entry
+
+
+class LayoutMeasureWorker(QThread):
+    """Worker thread đo kích thước chữ của từng trường trên dữ liệu mẫu (không block UI)"""
+    finished = Signal(dict)  # {field: (độ rộng px, chiều cao px)} trung bình cần để hiển thị
+
+    def __init__(self, fields, samples, font_family, point_size, max_line_width):
+        super().__init__()
+        self.fields = fields
+        self.samples = samples  # Danh sách Sentence mẫu
+        self.font_family = font_family
+        self.point_size = point_size
+        self.max_line_width = max(1, max_line_width)
+
+    def run(self):
+        """Chạy trong thread riêng"""
+        metrics, width_cache = cached_font_metrics(self.font_family, self.point_size)
+        line_height = metrics.lineSpacing()
+        demand = {}
+        for field in self.fields:
+            total_width = 0.0
+            total_height = 0.0
+            for sentence in self.samples:
+                value = sentence.get(field) or ""
+                widest = 0.0
+                line_count = 0
+                for line in value.split("3==D"):
+                    width = width_cache.get(line)
+                    if width is None:
+                        width = metrics.horizontalAdvance(line)
+                        width_cache[line] = width
+                    widest = max(widest, min(width, self.max_line_width))
+                    # Dòng dài sẽ được wrap theo độ rộng tối đa của khung
+                    line_count += max(1, math.ceil(width / self.max_line_width))
+                total_width += widest
+                total_height += line_count * line_height
+            count = max(1, len(self.samples))
+            demand[field] = (total_width / count, total_height / count)
+        self.finished.emit(demand)
+
+
 class DrawingTab(QWidget):
+    # Số dòng dữ liệu lấy mẫu để ước lượng kích thước khung khi tự động vẽ
+    AUTO_LAYOUT_SAMPLE_ROWS = 50
+
+
     def __init__(self, fields, main_window):
         super().__init__()
         self.main_window = main_window
@@ -94,6 +245,8 @@ class DrawingTab(QWidget):
         self.main_layout.setContentsMargins(0, 0, 0, 0)
         self.txt_path = ""
         self.import_worker = None  # Worker thread cho import
+        self.cancelled_imports = []  # Worker đã huỷ nhưng thread chưa kết thúc
+        self.measure_worker = None  # Worker thread đo chữ cho auto layout
 
         # Canvas vẽ
         self.canvas = GridCanvas(fields, self.mark_field_used)
@@ -138,6 +291,12 @@ class DrawingTab(QWidget):
         self.import_excel_button.setFixedSize(95, 28)
         self.import_excel_button.clicked.connect(self.import_excel_file)
         
+        # Nút Huỷ import - chỉ hiện khi đang import
+        self.cancel_import_button = QPushButton("Huỷ")
+        self.cancel_import_button.setFixedSize(50, 28)
+        self.cancel_import_button.clicked.connect(self.cancel_import)
+        self.cancel_import_button.hide()
+        
         self.import_txt_button = QPushButton("Import TXT")
         self.import_txt_button.setFixedSize(95, 28)
         self.import_txt_button.clicked.connect(self.import_txt_file)
@@ -153,6 +312,7 @@ class DrawingTab(QWidget):
         left_layout.addWidget(self.ip_label)
         left_layout.addWidget(self.ip_input)
         left_layout.addWidget(self.import_excel_button)
+        left_layout.addWidget(self.cancel_import_button)
         left_layout.addWidget(self.import_txt_button)
         left_layout.addWidget(self.preview_button, 1)  # stretch factor = 1 để kéo dài
         left_layout.addStretch()
@@ -208,6 +368,12 @@ class DrawingTab(QWidget):
         self.done_button.clicked.connect(self.handle_done_clicked)
         right_layout.addWidget(self.done_button)
         
+        self.history_button = QPushButton("Lịch sử")
+        self.history_button.setFixedSize(70, 28)
+        self.history_button.setToolTip("Khôi phục layout đã lưu trước đó")
+        self.history_button.clicked.connect(self.show_layout_history)
+        right_layout.addWidget(self.history_button)
+
         self.reset_button = QPushButton("Reset")
         self.reset_button.setFixedSize(70, 28)
         self.reset_button.clicked.connect(self.reset_all)
@@ -229,7 +395,8 @@ class DrawingTab(QWidget):
             "QPushButton:hover { background-color: #1f7ae0; }"
             "QPushButton:pressed { background-color: #1667bf; }"
         )
-        for btn in [self.toggle_button, self.import_excel_button, self.import_txt_button, self.preview_button, self.done_button]:
+        for btn in [self.toggle_button, self.import_excel_button, self.import_txt_button, self.preview_button,
+                    self.done_button, self.history_button]:
             btn.setStyleSheet(rounded_button_style)
         
         # Style riêng cho nút Reset (màu đỏ)
@@ -252,6 +419,7 @@ class DrawingTab(QWidget):
             "QPushButton:pressed { background-color: #bb1111; }"
         )
         self.reset_button.setStyleSheet(reset_button_style)
+        self.cancel_import_button.setStyleSheet(reset_button_style)
 
         # Popup danh sách trường (ẩn/hiện bên dưới nút)
         self.popup = QFrame(self)
@@ -262,19 +430,25 @@ class DrawingTab(QWidget):
         popup_layout = QVBoxLayout(self.popup)
         popup_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.list_widget = QListWidget()
-        # Thêm items với 3==D được replace thành dấu cách
-        for field in fields:
-            display_name = field.replace("3==D", " ").strip()
-            item = QListWidgetItem(display_name)
-            item.setData(Qt.UserRole, field)  # Lưu tên gốc để sử dụng
-            self.list_widget.addItem(item)
-        self.list_widget.itemDoubleClicked.connect(self.on_item_double_clicked)
-        self.list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.list_widget.customContextMenuRequested.connect(self.show_context_menu)
-        self.list_widget.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        # Model dùng chung tập used_fields với canvas: màu nền luôn khớp, không phải duyệt lại list
+        self.field_model = FieldListModel(fields, self.canvas.used_fields, self)
+        self.field_search = QLineEdit()
+        self.field_search.setPlaceholderText("Tìm trường...")
+        self.field_search.setClearButtonEnabled(True)
+        self.field_search.setStyleSheet("QLineEdit { padding: 4px; border: none; border-bottom: 1px solid #aaa; font-size: 9pt; }")
+        self.field_search.textChanged.connect(self.field_model.set_filter)
+        self.field_search.returnPressed.connect(self.select_first_search_hit)
+        self.list_view = QListView()
+        self.list_view.setModel(self.field_model)
+        self.list_view.setUniformItemSizes(True)  # Không đo từng dòng khi có hàng nghìn trường
+        self.list_view.setEditTriggers(QListView.NoEditTriggers)
+        self.list_view.doubleClicked.connect(self.on_item_double_clicked)
+        self.list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self.show_context_menu)
+        self.list_view.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
 
-        popup_layout.addWidget(self.list_widget)
+        popup_layout.addWidget(self.field_search)
+        popup_layout.addWidget(self.list_view)
         self.popup.setLayout(popup_layout)
         
         # Tạo notification widget
@@ -300,47 +474,52 @@ class DrawingTab(QWidget):
             button_pos = self.toggle_button.mapToGlobal(QPoint(0, self.toggle_button.height()))
             self.popup.move(button_pos)
             self.popup.show()
+            self.field_search.setFocus()
+            self.field_search.selectAll()
 
     def update_list_colors(self):
-        """Cập nhật màu nền cho các item trong list dựa trên used_fields"""
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            field = item.data(Qt.UserRole)
-            if field in self.canvas.used_fields:
-                item.setBackground(QColor(144, 238, 144))  # Xanh lá nhạt
-            else:
-                item.setBackground(QColor("white"))
+        """Vẽ lại màu nền theo used_fields (model đọc trực tiếp từ canvas, chỉ cần báo thay đổi)"""
+        self.field_model.refresh_all()
 
-    def on_item_double_clicked(self, item):
-        field = item.data(Qt.UserRole)  # Lấy tên gốc thay vì tên hiển thị
-        if field not in self.canvas.used_fields:
+    def load_fields_to_list(self):
+        """Nạp self.fields vào canvas và popup danh sách trường"""
+        self.canvas.set_fields(self.fields)
+        self.field_model.set_fields(self.fields)
+        self.field_search.clear()
+
+    def on_item_double_clicked(self, index):
+        field = self.field_model.field_at(index)  # Lấy tên gốc thay vì tên hiển thị
+        if field is not None and field not in self.canvas.used_fields:
             self.canvas.set_active_field(field)
             self.popup.hide()  # Ẩn popup sau khi chọn
 
+    def select_first_search_hit(self):
+        """Enter trong ô tìm kiếm: chọn trường đầu tiên chưa vẽ trong kết quả"""
+        for row in range(self.field_model.rowCount()):
+            index = self.field_model.index(row)
+            if self.field_model.field_at(index) not in self.canvas.used_fields:
+                self.on_item_double_clicked(index)
+                return
+
     def mark_field_used(self, field, remove=False):
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            if item.data(Qt.UserRole) == field:  # So sánh với tên gốc
-                if remove:
-                    item.setBackground(QColor("white"))
-                else:
-                    item.setBackground(QColor(144, 238, 144))
+        """Callback của canvas khi một trường được vẽ/xoá (used_fields đã cập nhật): vẽ lại đúng dòng đó"""
+        self.field_model.refresh_field(field)
 
     def show_context_menu(self, pos):
-        item = self.list_widget.itemAt(pos)
-        if item:
+        index = self.list_view.indexAt(pos)
+        if index.isValid():
             menu = QMenu(self)
             delete_action = menu.addAction("❌ Xoá vùng vẽ")
-            action = menu.exec(self.list_widget.mapToGlobal(pos))
+            action = menu.exec(self.list_view.mapToGlobal(pos))
             if action == delete_action:
-                field = item.data(Qt.UserRole)  # Lấy tên gốc
+                field = self.field_model.field_at(index)  # Lấy tên gốc
                 self.canvas.clear_rect_by_field(field)
                 self.mark_field_used(field, remove=True)
                 self.popup.hide()  # 🔺 Thêm dòng này để ẩn popup sau khi xóa
 
     def handle_done_clicked(self):
         rects = self.canvas.rects  # (QRect, QColor, field_name)
-        eu.save_config(rects, fields=self.fields)  # ✅ Luôn lưu cả fields
+        eu.request_save(rects, fields=self.fields)  # ✅ Luôn lưu cả fields
         
         # Đảm bảo Trang chính biết đường dẫn TXT hiện tại và đã load dữ liệu
         if getattr(self, 'txt_path', None):
@@ -353,7 +532,7 @@ class DrawingTab(QWidget):
                         self.main_window.sm = SentenceManager()
                     self.main_window.sm.load_from_txt(self.txt_path)
             except Exception as e:
-                print(f"DEBUG: handle_done_clicked load_from_txt error: {e}")
+                log.warning("handle_done_clicked load_from_txt error: %s", e)
 
         self.popup.hide()
         self.main_window.on_done(rects)  # Gọi lên MainWindow xử lý
@@ -391,6 +570,77 @@ class DrawingTab(QWidget):
         if reply == QMessageBox.No:
             return
         
+        samples = self.sample_sentences()
+        if not samples:
+            # Chưa có dữ liệu → dùng kích thước mặc định
+            self.place_auto_fields(undrawn_fields, {})
+            return
+        
+        # Đo chữ trên dữ liệu mẫu trong thread riêng để canvas vẫn phản hồi
+        grid_size = int(self.canvas.logicalDpiX() // 2.54)
+        font_size = getattr(self.main_window, 'text_font_point_size', 11)
+        self.auto_draw_button.setEnabled(False)
+        self.auto_draw_button.setText("Đang đo chữ...")
+        self.measure_worker = LayoutMeasureWorker(
+            undrawn_fields, samples, "Times New Roman", font_size, grid_size * 10
+        )
+        self.measure_worker.finished.connect(self.on_measure_finished)
+        self.measure_worker.start()
+
+    def sample_sentences(self):
+        """Lấy tối đa AUTO_LAYOUT_SAMPLE_ROWS câu trải đều trong dữ liệu đã load"""
+        sm = getattr(self.main_window, 'sm', None)
+        source = (getattr(sm, 'all_sentences', None) or getattr(sm, 'sentences', None)) if sm else None
+        if not source:
+            return []
+        step = max(1, len(source) // self.AUTO_LAYOUT_SAMPLE_ROWS)
+        return source[::step][:self.AUTO_LAYOUT_SAMPLE_ROWS]
+
+    def on_measure_finished(self, demand):
+        """Callback khi đo chữ xong: tính kích thước khung rồi vẽ"""
+        self.auto_draw_button.setEnabled(True)
+        self.auto_draw_button.setText("Tạo tất cả các trường")
+        
+        # Người dùng có thể đã vẽ thêm trường trong lúc đo
+        undrawn_fields = [field for field in self.fields if field not in self.canvas.used_fields]
+        if not undrawn_fields:
+            return
+        grid_size = int(self.canvas.logicalDpiX() // 2.54)
+        self.place_auto_fields(undrawn_fields, self.compute_auto_sizes(undrawn_fields, demand, grid_size))
+
+    def compute_auto_sizes(self, fields, demand, grid_size):
+        """Phân bổ diện tích khung theo tỷ lệ lượng chữ, trả về {field: (width, height)} theo bội số lưới"""
+        min_w, max_w = 3, 10  # Số ô lưới (1 ô = 1cm)
+        min_h, max_h = 2, 8
+        padding = 12  # Padding + viền của ô nhập ở Trang chính (px)
+        
+        # Ngân sách diện tích: khoảng một nửa vùng trống dưới header (chừa chỗ cho margin giữa các khung)
+        cols = max(1, self.canvas.width() // grid_size)
+        rows = max(1, (self.canvas.height() - 100) // grid_size)
+        used = sum((rect.width() // grid_size) * (rect.height() // grid_size) for rect, _, _ in self.canvas.rects)
+        budget = max(len(fields) * min_w * min_h, (cols * rows) // 2 - used)
+        
+        wanted = {}
+        for field in fields:
+            width_px, height_px = demand.get(field, (0, 0))
+            width = min(max_w, max(min_w, math.ceil((width_px + padding) / grid_size)))
+            height = min(max_h, max(min_h, math.ceil((height_px + padding) / grid_size)))
+            wanted[field] = (width, width * height)
+        
+        # Nếu tổng nhu cầu vượt ngân sách thì co tất cả theo cùng một tỷ lệ
+        total = sum(area for _, area in wanted.values())
+        scale = min(1.0, budget / total) if total else 1.0
+        
+        sizes = {}
+        for field, (width, area) in wanted.items():
+            area = max(min_w * min_h, area * scale)
+            width = min(width, max(min_w, int(area // min_h)))
+            height = min(max_h, max(min_h, round(area / width)))
+            sizes[field] = (width * grid_size, height * grid_size)
+        return sizes
+
+    def place_auto_fields(self, undrawn_fields, sizes):
+        """Xếp các trường vào vị trí trống; sizes: {field: (width, height)} ưu tiên thử trước"""
         # Tham số để vẽ tự động
         grid_size = int(self.canvas.logicalDpiX() // 2.54)  # Kích thước 1 ô lưới (1cm)
         default_width = int(grid_size * 8)   # Chiều rộng mặc định: 8cm (đã là bội số)
@@ -467,8 +717,9 @@ class DrawingTab(QWidget):
         for field in undrawn_fields:
             rect = None
             
-            # Thử các kích thước khác nhau để tìm vị trí phù hợp
-            for width, height in size_options:
+            # Thử kích thước đã đo trước, sau đó các kích thước mặc định
+            candidates = ([sizes[field]] if field in sizes else []) + size_options
+            for width, height in candidates:
                 rect = find_empty_position(width, height)
                 if rect:
                     break
@@ -528,7 +779,6 @@ class DrawingTab(QWidget):
         
         # Lưu file_path để dùng sau
         self.current_import_file = file_path
-        self.user_chose_overwrite = False  # Flag để tránh hỏi 2 lần
         
         # ✅ Kiểm tra xem file txt đã tồn tại chưa
         if getattr(sys, 'frozen', False):
@@ -536,15 +786,14 @@ class DrawingTab(QWidget):
         else:
             app_dir = os.path.dirname(os.path.abspath(__file__))
         
-        file_name = os.path.basename(file_path).replace(".xlsx", "").replace(".xls", "")
-        txt_path = os.path.join(app_dir, f"{file_name}.txt")
-        txt_file_name = f"{file_name}.txt"
+        txt_file_name = txt_name_for(file_path)
+        txt_path = os.path.join(app_dir, txt_file_name)
         
-        # Nếu file txt đã tồn tại → hỏi người dùng
+        # Nếu file txt đã tồn tại → hỏi người dùng (chỉ hỏi ở đây, pipeline chạy xong không hỏi lại)
         if os.path.exists(txt_path):
             reply = QMessageBox.question(
                 self, "File đã tồn tại",
-                f"File {txt_file_name} đã tồn tại trong thư mục chương trình.\n\nBạn có muốn sử dụng file cũ không?\n\n• Yes: Sử dụng file cũ (giữ nguyên dữ liệu)\n• No: Gọi server để tạo file mới từ Excel",
+                f"File {txt_file_name} đã tồn tại trong thư mục chương trình.\n\nBạn có muốn sử dụng file cũ không?\n\n• Yes: Sử dụng file cũ (giữ nguyên dữ liệu)\n• No: Gọi server để tạo file mới từ Excel (ghi đè khi import xong)",
                 QMessageBox.Yes | QMessageBox.No
             )
             
@@ -556,20 +805,15 @@ class DrawingTab(QWidget):
                 self.main_window.sm.load_from_txt(self.txt_path)
                 self.main_window.current_file_path = self.txt_path
                 
-                # Load fields từ file txt
-                with open(self.txt_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if len(lines) > 1:
-                        self.fields = lines[1].strip().split('\t')
-                        self.load_fields_to_list()
+                # Lấy fields từ dữ liệu vừa load (không đọc lại file)
+                if self.main_window.sm.fields:
+                    self.fields = list(self.main_window.sm.fields)
+                    self.load_fields_to_list()
                 
                 # Hiển thị nút Preview
                 self.preview_button.setText(f"Preview {txt_file_name}")
                 self.preview_button.show()
                 return
-            else:
-                # Người dùng chọn No → đánh dấu đã chọn ghi đè
-                self.user_chose_overwrite = True
         
         # Nếu chưa có file hoặc người dùng chọn No → gọi server
         # Disable nút Import và đổi text
@@ -581,105 +825,76 @@ class DrawingTab(QWidget):
             " border-radius: 6px; padding: 4px 10px; font-size: 9pt;"
             "}"
         )
+        self.cancel_import_button.show()
         
         # Tạo và chạy worker thread
         ip = self.ip_input.text().strip() or "107.98.33.94"
-        self.import_worker = ImportWorker(file_path, ip)
+        self.import_worker = ImportWorker(file_path, ip, txt_path)
         self.import_worker.finished.connect(self.on_import_success)
         self.import_worker.error.connect(self.on_import_error)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.stage.connect(self.on_import_stage)
         self.import_worker.start()
 
+    def cancel_import(self):
+        """
+        Huỷ import đang chạy và trả lại giao diện ngay. Worker tự dừng ở lần kiểm tra kế tiếp và xoá file ghi dở;
+        nếu đang chờ server xử lý thì dừng khi server trả lời (hoặc hết timeout đọc).
+        """
+        worker = self.import_worker
+        if worker is None or not worker.isRunning():
+            return
+        worker.cancel()
+        for signal in (worker.finished, worker.error, worker.progress, worker.stage):
+            signal.disconnect()
+        # Giữ tham chiếu tới khi thread kết thúc (QThread bị huỷ khi đang chạy sẽ làm crash app)
+        self.cancelled_imports.append(worker)
+        for signal in (worker.finished, worker.error, worker.cancelled):
+            signal.connect(lambda *args, worker=worker: self.release_cancelled_import(worker))
+        self.import_worker = None
+        self.on_import_cancelled()
+
+    def release_cancelled_import(self, worker):
+        worker.wait()
+        if worker in self.cancelled_imports:
+            self.cancelled_imports.remove(worker)
+
+    def on_import_stage(self, stage):
+        """Hiển thị bước đang chạy trên nút Import"""
+        labels = {"upload": "Đang gửi...", "write": "Đang ghi TXT...", "load": "Đang nạp dữ liệu..."}
+        self.import_excel_button.setText(labels.get(stage, "Đang Import..."))
+
+    def on_import_progress(self, stage, done, total):
+        """Hiển thị tiến độ gửi/nhận trên nút Import"""
+        label = "Đang gửi" if stage == "upload" else "Đang nhận"
+        if stage == "upload" and total and done >= total:
+            self.import_excel_button.setText("Server đang xử lý...")
+        elif total:
+            self.import_excel_button.setText(f"{label} {done * 100 // total}%")
+        else:
+            self.import_excel_button.setText(f"{label} {done / (1024 * 1024):.1f} MB")
+
     def on_import_success(self, result):
-        """Callback khi import thành công"""
+        """Callback khi import thành công: dữ liệu đã ghi/load xong ở worker, chỉ còn cập nhật giao diện"""
         try:
-            file_path = self.current_import_file
-            fields_raw = result['fields_raw']          # Thứ tự và tên cột gốc từ Excel (không strip)
-            header_fields = result['fields']           # Header đã sanitize (3==D thay cho xuống dòng/tab)
-            data = result['data']
+            header_fields = result['fields']
+            self.txt_path = result['txt_path']
+            txt_file_name = os.path.basename(self.txt_path)
             
             # Reset canvas và các trường cũ trước khi import file mới
             self.canvas.rects.clear()
             self.canvas.occupied_cells.clear()
             self.canvas.used_fields.clear()
             self.canvas.update()
-            
-            # In ra terminal để kiểm tra
-            print("=== EXCEL IMPORT DEBUG ===")
-            print(f"Fields raw ({len(fields_raw)}): {fields_raw}")
-            print(f"Header fields ({len(header_fields)}): {header_fields}")
-            print(f"Data rows: {len(data)}")
-            if data:
-                print("First 3 rows of data:")
-                for i, row in enumerate(data[:3]):
-                    print(f"Row {i+1}: {row}")
-            print("==========================")
-
-            # ✅ Chuẩn bị file txt - Lấy thư mục chứa file .exe hoặc script đang chạy
-            if getattr(sys, 'frozen', False):
-                # Nếu chạy từ file .exe (PyInstaller)
-                app_dir = os.path.dirname(sys.executable)
-            else:
-                # Nếu chạy từ script Python
-                app_dir = os.path.dirname(os.path.abspath(__file__))
-            
-            file_name = os.path.basename(file_path).replace(".xlsx", "").replace(".xls", "")
-            self.txt_path = os.path.join(app_dir, f"{file_name}.txt")
-            txt_file_name = f"{file_name}.txt"
 
-            use_existing = False
-            # Chỉ hỏi nếu file tồn tại VÀ người dùng chưa chọn ghi đè trước đó
-            if os.path.exists(self.txt_path) and not getattr(self, 'user_chose_overwrite', False):
-                reply = QMessageBox.question(
-                    self, "File đã tồn tại",
-                    f"File {txt_file_name} đã tồn tại trong thư mục chương trình.\n\nBạn có muốn sử dụng file cũ không?\n\n• Yes: Sử dụng file cũ (giữ nguyên dữ liệu)\n• No: Ghi đè bằng dữ liệu mới từ Excel",
-                    QMessageBox.Yes | QMessageBox.No
-                )
-                if reply == QMessageBox.Yes:
-                    use_existing = True
-
-            if use_existing:
-                from sentence_manager import SentenceManager
-                self.main_window.sm = SentenceManager()
-                self.main_window.sm.load_from_txt(self.txt_path)
-                self.main_window.current_file_path = self.txt_path  # Lưu đường dẫn
-            else:
-                # ✅ Ghi file .txt mới theo đúng thứ tự cột gốc
-                with open(self.txt_path, "w", encoding="utf-8") as f:
-                    f.write("0\n")  # Dòng đầu tiên là index mặc định
-                    f.write("\t".join(header_fields) + "\n")
-                    for row in data:
-                        values = []
-                        for raw in fields_raw:
-                            val = row.get(raw, "")
-                            if isinstance(val, str):
-                                val = val.strip().replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D')
-                            values.append(val)
-                        # Thêm status "Not Done" vào cột cuối
-                        values.append("Not Done")
-                        f.write("\t".join(values) + "\n")
-                
-                # Load dữ liệu mới vào main_window.sm
-                from sentence_manager import SentenceManager
-                self.main_window.sm = SentenceManager()
-                self.main_window.sm.load_from_txt(self.txt_path)
-                self.main_window.current_file_path = self.txt_path  # Lưu đường dẫn
+            self.main_window.sm = result['sm']
+            self.main_window.current_file_path = self.txt_path  # Lưu đường dẫn
 
             # ✅ Cập nhật canvas & popup field theo header_fields để hiển thị đúng
             self.fields = header_fields
-            self.canvas.fields = self.fields
-            self.list_widget.clear()
-            # Thêm items với 3==D được replace thành dấu cách
-            for field in self.fields:
-                display_name = field.replace("3==D", " ").strip()
-                item = QListWidgetItem(display_name)
-                # Lưu tên gốc mapping theo header (vì SentenceManager dùng header làm key)
-                item.setData(Qt.UserRole, field)
-                self.list_widget.addItem(item)
+            self.load_fields_to_list()
 
-            eu.save_config(self.canvas.rects, fields=self.fields)
-
-            for field in self.canvas.used_fields:
-                self.mark_field_used(field)
+            eu.request_save(self.canvas.rects, fields=self.fields)
 
             self.canvas.update()
 
@@ -702,8 +917,14 @@ class DrawingTab(QWidget):
         QMessageBox.critical(self, "Lỗi", f"Lỗi khi tải file Excel:\n{error_message}")
         self.restore_import_button()
 
+    def on_import_cancelled(self):
+        """Trả lại giao diện sau khi huỷ import"""
+        self.restore_import_button()
+        self.notification.show_message("Đã huỷ import Excel")
+
     def restore_import_button(self):
         """Khôi phục trạng thái nút Import Excel"""
+        self.cancel_import_button.hide()
         self.import_excel_button.setEnabled(True)
         self.import_excel_button.setText("Import Excel")
         self.import_excel_button.setStyleSheet(
@@ -761,21 +982,10 @@ class DrawingTab(QWidget):
             
             # Cập nhật fields và UI
             self.fields = header_fields
-            self.canvas.fields = self.fields
-            self.list_widget.clear()
-            
-            for field in self.fields:
-                display_name = field.replace("3==D", " ").strip()
-                item = QListWidgetItem(display_name)
-                item.setData(Qt.UserRole, field)
-                self.list_widget.addItem(item)
+            self.load_fields_to_list()
             
             # Lưu config
-            eu.save_config(self.canvas.rects, fields=self.fields)
-            
-            # Update màu cho các field đã vẽ
-            for field in self.canvas.used_fields:
-                self.mark_field_used(field)
+            eu.request_save(self.canvas.rects, fields=self.fields)
             
             self.canvas.update()
             
@@ -797,6 +1007,35 @@ class DrawingTab(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Lỗi", f"Lỗi khi import file TXT:\n{e}")
 
+    def show_layout_history(self):
+        """Chọn một bản layout đã lưu (thư mục layouts cạnh config.json) để khôi phục"""
+        eu.flush()  # Bản đang chờ ghi cũng có trong danh sách
+        snapshots = eu.list_snapshots()
+        if not snapshots:
+            self.notification.show_message("Chưa có bản layout nào được lưu")
+            return
+        dialog = LayoutHistoryDialog(snapshots, self)
+        if dialog.exec() != QDialog.Accepted or dialog.selected_path() is None:
+            return
+        try:
+            rects, fields = eu.load_snapshot(dialog.selected_path())
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            QMessageBox.warning(self, "Lỗi", f"Không đọc được bản layout:\n{e}")
+            return
+        self.apply_layout(rects, fields)
+        self.notification.show_message(f"Đã khôi phục layout: {len(rects)} vùng")
+
+    def apply_layout(self, rects, fields):
+        """Thay toàn bộ layout (danh sách trường + vùng vẽ) và cập nhật Trang chính"""
+        self.canvas.rects.clear()
+        self.canvas.occupied_cells.clear()
+        self.canvas.used_fields.clear()
+        self.fields = list(fields)
+        self.load_fields_to_list()
+        self.load_saved_rects(rects)
+        eu.save_config(self.canvas.rects, fields=self.fields)
+        self.main_window.on_done(self.canvas.rects, stay_on_current_tab=True)
+
     def preview_txt_file(self):
         """Mở file txt cho người dùng xem"""
         if not self.txt_path or not os.path.exists(self.txt_path):
@@ -818,7 +1057,7 @@ class DrawingTab(QWidget):
         """Reset toàn bộ: xóa list, các vùng vẽ"""
         reply = QMessageBox.question(
             self, "Xác nhận Reset",
-            "Bạn có chắc chắn muốn xóa toàn bộ:\n\n• Danh sách các trường\n• Tất cả các vùng đã vẽ\n• Cấu hình đã lưu\n\nHành động này không thể hoàn tác!",
+            "Bạn có chắc chắn muốn xóa toàn bộ:\n\n• Danh sách các trường\n• Tất cả các vùng đã vẽ\n• Cấu hình đã lưu\n\nLayout hiện tại vẫn khôi phục được từ nút Lịch sử.",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
@@ -830,12 +1069,9 @@ class DrawingTab(QWidget):
             self.canvas.used_fields.clear()
             self.canvas.update()
             
-            # Xóa list widget
-            self.list_widget.clear()
-            
-            # Reset fields
+            # Reset fields và danh sách trường
             self.fields = []
-            self.canvas.fields = []
+            self.load_fields_to_list()
             
             # Reset đường dẫn file txt
             self.txt_path = ""
@@ -844,7 +1080,7 @@ class DrawingTab(QWidget):
             self.preview_button.hide()
             
             # Xóa config đã lưu
-            eu.save_config([], fields=[])
+            eu.request_save([], fields=[])
             
             # Ẩn popup nếu đang hiển thị
             self.popup.hide()
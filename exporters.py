@@ -0,0 +1,191 @@
+"""
+Các bộ xuất dữ liệu dạng stream từ SentenceManager: xlsx, csv, tsv, jsonl, parquet.
+Dùng chung cho GUI (ExportWorker) và dòng lệnh:
+
+    python exporters.py data.txt data.csv
+    python exporters.py data.txt data.parquet --no-status
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+import importlib.util
+
+STATUS_COLUMN = "Status"
+PARQUET_BATCH_ROWS = 10000  # Số dòng mỗi record batch khi ghi Parquet
+PROGRESS_EVERY = 500  # Báo tiến độ sau mỗi bấy nhiêu dòng
+
+
+class ExportCancelled(Exception):
+    """Người dùng huỷ xuất file"""
+
+
+def to_export_value(value):
+    """Giá trị ghi ra file: 3==D → xuống dòng như khi hiển thị"""
+    return value.replace("3==D", "\n") if isinstance(value, str) else value
+
+
+def _stream(rows, progress, should_cancel):
+    """Duyệt rows, kiểm tra huỷ và báo tiến độ định kỳ"""
+    done = 0
+    for values in rows:
+        if should_cancel is not None and should_cancel():
+            raise ExportCancelled()
+        yield values
+        done += 1
+        if progress is not None and done % PROGRESS_EVERY == 0:
+            progress(done)
+    if progress is not None:
+        progress(done)
+
+
+def export_xlsx(path, columns, rows, progress=None, should_cancel=None):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for values in _stream(rows, progress, should_cancel):
+        sheet.append(values)
+    workbook.save(path)
+
+
+def export_csv(path, columns, rows, progress=None, should_cancel=None, delimiter=","):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(columns)
+        for values in _stream(rows, progress, should_cancel):
+            writer.writerow(values)
+
+
+def export_tsv(path, columns, rows, progress=None, should_cancel=None):
+    export_csv(path, columns, rows, progress, should_cancel, delimiter="\t")
+
+
+def export_jsonl(path, columns, rows, progress=None, should_cancel=None):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for values in _stream(rows, progress, should_cancel):
+            f.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+            f.write("\n")
+
+
+def export_parquet(path, columns, rows, progress=None, should_cancel=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    batch = [[] for _ in columns]
+    with pq.ParquetWriter(path, schema) as writer:
+        for values in _stream(rows, progress, should_cancel):
+            for column_values, value in zip(batch, values):
+                column_values.append(value if value is None or isinstance(value, str) else str(value))
+            if len(batch[0]) >= PARQUET_BATCH_ROWS:
+                writer.write_batch(pa.record_batch(batch, schema=schema))
+                batch = [[] for _ in columns]
+        if batch[0]:
+            writer.write_batch(pa.record_batch(batch, schema=schema))
+
+
+# Định dạng -> (hàm xuất, thư viện cần có, bộ lọc cho hộp thoại lưu file)
+EXPORTERS = {
+    "xlsx": (export_xlsx, "openpyxl", "Excel Files (*.xlsx)"),
+    "csv": (export_csv, None, "CSV Files (*.csv)"),
+    "tsv": (export_tsv, None, "TSV Files (*.tsv)"),
+    "jsonl": (export_jsonl, None, "JSON Lines (*.jsonl)"),
+    "parquet": (export_parquet, "pyarrow", "Parquet Files (*.parquet)"),
+}
+
+
+def available_formats():
+    """Các định dạng dùng được với thư viện đang cài"""
+    return [fmt for fmt, (_, module, _) in EXPORTERS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+
+def file_filter(fmt):
+    return EXPORTERS[fmt][2]
+
+
+def format_from_path(path):
+    """Suy ra định dạng từ đuôi file, None nếu không hỗ trợ"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in EXPORTERS else None
+
+
+def ensure_format(fmt):
+    """Import sẵn thư viện của định dạng (gọi ở UI thread trước khi chạy worker).
+    Raise ValueError nếu định dạng không hỗ trợ, ImportError nếu thiếu thư viện."""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+    module = EXPORTERS[fmt][1]
+    if module is not None:
+        try:
+            __import__(module)
+        except ImportError:
+            raise ImportError(f"Thiếu {module} để xuất {fmt}. Vui lòng cài đặt:\n\npy -m pip install {module}") from None
+
+
+def write_export(path, fmt, columns, rows, progress=None, should_cancel=None):
+    """Ghi qua file .part rồi đổi tên, không để lại file dở dang khi lỗi/huỷ"""
+    ensure_format(fmt)
+    part_path = path + ".part"
+    try:
+        EXPORTERS[fmt][0](part_path, columns, rows, progress, should_cancel)
+        os.replace(part_path, path)
+    except BaseException:
+        try:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        except OSError:
+            pass
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Xuất file TXT của MagicTool sang xlsx/csv/tsv/jsonl/parquet")
+    parser.add_argument("input", help="File TXT (dòng 1: index, dòng 2: header)")
+    parser.add_argument("output", help="File kết quả")
+    parser.add_argument("--format", choices=sorted(EXPORTERS), help="Mặc định suy ra từ đuôi file output")
+    parser.add_argument("--no-status", action="store_true", help="Không thêm cột Status")
+    parser.add_argument("--status", action="append", choices=["Done", "Not Done"],
+                        help="Chỉ xuất các dòng có trạng thái này (có thể lặp lại)")
+    parser.add_argument("--rows", metavar="FROM-TO",
+                        help="Chỉ xuất khoảng dòng, đánh số từ 1 và gồm cả hai đầu (vd: 10000-20000, 500-)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or format_from_path(args.output)
+    if fmt is None:
+        parser.error("Không suy ra được định dạng từ đuôi file, hãy dùng --format")
+
+    start = stop = None
+    if args.rows:
+        try:
+            first, _, last = args.rows.partition("-")
+            start = int(first) - 1 if first else None
+            stop = int(last) if last else None
+        except ValueError:
+            parser.error("--rows phải có dạng FROM-TO, ví dụ 10000-20000")
+
+    from sentence_manager import SentenceManager
+    sm = SentenceManager()
+    sm.load_from_txt(args.input)
+    total = sm.count_sentences(args.status, start, stop)
+    written = 0
+
+    def report(done):
+        nonlocal written
+        written = done
+        print(f"\r{done}/{total}", end="", file=sys.stderr, flush=True)
+
+    try:
+        sm.export_to(args.output, fmt, include_status=not args.no_status,
+                     sentences=sm.all_sentences, status=args.status, start=start, stop=stop,
+                     progress=report)
+    except (ImportError, ValueError) as e:
+        print(f"\n{e}", file=sys.stderr)
+        return 1
+    print(f"\nĐã xuất {written} dòng ra {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
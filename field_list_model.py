@@ -0,0 +1,94 @@
+"""Model danh sách trường cho popup của DrawingTab (QListView), chịu được sheet hàng nghìn cột"""
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from text_search import FieldSearch
+
+USED_COLOR = QColor(144, 238, 144)  # Xanh lá nhạt: trường đã vẽ
+
+
+class FieldListModel(QAbstractListModel):
+    """
+    Mỗi dòng là một field (tên gốc ở Qt.UserRole, tên hiển thị 3==D → dấu cách).
+    Màu nền đọc trực tiếp từ tập used_fields dùng chung với GridCanvas, nên đánh dấu một trường
+    chỉ cần báo dataChanged cho đúng dòng đó (tra field → dòng bằng dict, O(1)).
+    set_filter() chỉ hiện các trường khớp từ khoá (không phân biệt hoa/thường, dấu, 3==D).
+    """
+
+    def __init__(self, fields=(), used_fields=None, parent=None):
+        super().__init__(parent)
+        self.used_fields = used_fields if used_fields is not None else set()
+        self.fields = []
+        self.display_names = []
+        self.rows = {}  # field → dòng
+        self.search = FieldSearch()
+        self.query = ""
+        self.visible = None    # Dòng gốc đang hiện khi có filter, None = tất cả
+        self.positions = None  # Dòng gốc → vị trí trong view khi có filter
+        self.set_fields(fields)
+
+    def set_fields(self, fields):
+        self.beginResetModel()
+        self.fields = list(fields)
+        self.display_names = [field.replace("3==D", " ").strip() for field in self.fields]
+        self.rows = {}
+        for row, field in enumerate(self.fields):
+            self.rows.setdefault(field, row)
+        self.search.set_fields(self.fields)
+        self.query = ""
+        self.visible = self.positions = None
+        self.endResetModel()
+
+    def set_filter(self, query):
+        """Lọc theo từ khoá; chuỗi rỗng = hiện tất cả"""
+        if query == self.query:
+            return
+        self.query = query
+        hits = self.search.search(query)
+        self.beginResetModel()
+        self.visible = hits
+        self.positions = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.fields) if self.visible is None else len(self.visible)
+
+    def source_row(self, index):
+        return index.row() if self.visible is None else self.visible[index.row()]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.source_row(index)
+        if role == Qt.DisplayRole:
+            return self.display_names[row]
+        if role == Qt.UserRole:
+            return self.fields[row]
+        if role == Qt.BackgroundRole:
+            return USED_COLOR if self.fields[row] in self.used_fields else None
+        return None
+
+    def field_at(self, index):
+        """Tên gốc của field tại index, None nếu index không hợp lệ"""
+        return self.fields[self.source_row(index)] if index.isValid() else None
+
+    def row_of(self, field):
+        return self.rows.get(field, -1)
+
+    def refresh_field(self, field):
+        """Vẽ lại dòng của field sau khi tập used_fields thay đổi"""
+        row = self.rows.get(field)
+        if row is not None and self.visible is not None:
+            if self.positions is None:
+                self.positions = {source: position for position, source in enumerate(self.visible)}
+            row = self.positions.get(row)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.BackgroundRole])
+
+    def refresh_all(self):
+        count = self.rowCount()
+        if count:
+            self.dataChanged.emit(self.index(0), self.index(count - 1), [Qt.BackgroundRole])
@@ -1,6 +1,7 @@
 from PySide6.QtCore import QPoint, QRect, Qt
-from PySide6.QtGui import QMouseEvent, QColor, QPainter, QPen, QCursor, QFont
+from PySide6.QtGui import QMouseEvent, QColor, QPainter, QPen, QCursor, QFont, QFontMetrics, QStaticText
 from PySide6.QtWidgets import QWidget, QMenu
+from instrumentation import span
 
 
 class GridCanvas(QWidget):
@@ -34,6 +35,19 @@ class GridCanvas(QWidget):
         self.resize_handle = None  # 'tl', 'tr', 'bl', 'br', 't', 'b', 'l', 'r'
         self.drag_start_pos = None
         self.original_rect = None
+
+        # Cache đối tượng vẽ: tạo một lần, dùng lại cho mọi lần paint
+        self.label_font = QFont("Arial", 10)
+        self.hover_font = QFont("Arial", 12)
+        self.label_metrics = QFontMetrics(self.label_font)
+        self.label_offset = QPoint(4, 14 - self.label_metrics.ascent())  # drawStaticText vẽ từ góc trên-trái
+        self.grid_pen = QPen(QColor(220, 220, 220), 1)
+        self.preview_pen = QPen(Qt.red, 1, Qt.DashLine)
+        self.handle_pen = QPen(Qt.white, 1)
+        self.handle_brush = QColor(0, 100, 255)
+        self.pen_cache = {}  # (rgba, width) -> QPen
+        self.display_names = {}  # field -> tên hiển thị (3==D → dấu cách)
+        self.label_cache = {}  # field -> (độ rộng rect, QStaticText đã elide)
         
         self.setMouseTracking(True)  # Để theo dõi con trỏ chuột
         self.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -42,6 +56,40 @@ class GridCanvas(QWidget):
     def set_active_field(self, field_name):
         self.active_field = field_name
 
+    def set_fields(self, fields):
+        """Đổi danh sách field và xoá cache nhãn đã dựng"""
+        self.fields = fields
+        self.display_names.clear()
+        self.label_cache.clear()
+
+    def display_name(self, field):
+        """Tên hiển thị của field (3==D → dấu cách), tính một lần"""
+        name = self.display_names.get(field)
+        if name is None:
+            name = field.replace("3==D", " ")
+            self.display_names[field] = name
+        return name
+
+    def get_pen(self, color, width):
+        key = (color.rgba(), width)
+        pen = self.pen_cache.get(key)
+        if pen is None:
+            pen = QPen(color, width)
+            self.pen_cache[key] = pen
+        return pen
+
+    def get_label(self, field, rect_width):
+        """QStaticText của nhãn đã elide theo độ rộng rect; chỉ dựng lại khi rect đổi độ rộng"""
+        cached = self.label_cache.get(field)
+        if cached is not None and cached[0] == rect_width:
+            return cached[1]
+        elided = self.label_metrics.elidedText(self.display_name(field), Qt.ElideRight, max(0, rect_width - 8))
+        static_text = QStaticText(elided)
+        static_text.setTextFormat(Qt.PlainText)
+        static_text.prepare(font=self.label_font)
+        self.label_cache[field] = (rect_width, static_text)
+        return static_text
+
     def clear_rect_by_field(self, field_name):
         new_rects = []
         new_occupied = set()
@@ -310,27 +358,26 @@ class GridCanvas(QWidget):
         if not painter.isActive():
             return
 
-        # Tô nền 3 hàng đầu
-        frozen_rect = QRect(0, 0, self.width(), self.grid_size * 3)
-        painter.fillRect(frozen_rect, QColor(200, 200, 200))  # Xám đậm hơn lưới
-        self.draw_grid(painter)
-        self.draw_rects(painter)
+        with span("render.canvas"):
+            # Tô nền 3 hàng đầu
+            frozen_rect = QRect(0, 0, self.width(), self.grid_size * 3)
+            painter.fillRect(frozen_rect, QColor(200, 200, 200))  # Xám đậm hơn lưới
+            self.draw_grid(painter)
+            self.draw_rects(painter)
 
         if self.active_field and self.start_point and self.end_point:
             temp_rect = QRect(self.start_point, self.end_point).normalized()
-            painter.setPen(QPen(Qt.red, 1, Qt.DashLine))
+            painter.setPen(self.preview_pen)
             painter.drawRect(temp_rect)
 
         if self.active_field and not self.start_point:
             cursor_pos = self.mapFromGlobal(QCursor.pos())
             painter.setPen(Qt.black)
-            painter.setFont(QFont("Arial", 12))
-            display_field = self.active_field.replace("3==D", " ")  # Replace 3==D thành dấu cách
-            painter.drawText(cursor_pos + QPoint(10, -10), display_field)
+            painter.setFont(self.hover_font)
+            painter.drawText(cursor_pos + QPoint(10, -10), self.display_name(self.active_field))
 
     def draw_grid(self, painter):
-        pen = QPen(QColor(220, 220, 220), 1)
-        painter.setPen(pen)
+        painter.setPen(self.grid_pen)
         width = self.width()
         height = self.height()
         step = self.grid_size
@@ -341,20 +388,18 @@ class GridCanvas(QWidget):
             painter.drawLine(0, y, width, y)
 
     def draw_rects(self, painter):
+        painter.setFont(self.label_font)
         for i, (rect, color, field) in enumerate(self.rects):
             if rect.width() <= 0 or rect.height() <= 0:
                 continue
             
             # Vẽ rect
             pen_width = 3 if i == self.selected_rect_index else 2
-            painter.setPen(QPen(color, pen_width))
+            painter.setPen(self.get_pen(color, pen_width))
             painter.drawRect(rect)
             
-            # Vẽ text
-            painter.setFont(QFont("Arial", 10))
-            display_field = field.replace("3==D", " ")  # Replace 3==D thành dấu cách
-            top_left = rect.topLeft() + QPoint(4, 14)
-            painter.drawText(top_left, display_field)
+            # Vẽ text (đã elide theo độ rộng rect)
+            painter.drawStaticText(rect.topLeft() + self.label_offset, self.get_label(field, rect.width()))
             
             # Vẽ resize handles nếu đang được chọn
             if i == self.selected_rect_index:
@@ -363,8 +408,8 @@ class GridCanvas(QWidget):
     def draw_resize_handles(self, painter, rect):
         """Vẽ các handle để resize"""
         handle_size = 8
-        painter.setBrush(QColor(0, 100, 255))
-        painter.setPen(QPen(Qt.white, 1))
+        painter.setBrush(self.handle_brush)
+        painter.setPen(self.handle_pen)
         
         # Vẽ 4 góc
         handles = [
@@ -0,0 +1,201 @@
+"""
+HTTP client dùng chung cho việc gọi server chuyển đổi Excel.
+
+- Một requests.Session duy nhất (connection pool, keep-alive) cho cả ứng dụng
+- Timeout kết nối / đọc, thử lại có giới hạn với backoff tăng dần
+- Upload multipart dạng stream (không đọc cả file vào RAM, có Content-Length)
+- Tải response dạng stream, báo tiến độ theo byte cho cả hai chiều
+requests chỉ được import khi gọi lần đầu để không làm chậm lúc khởi động.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+
+from converter import Cancelled
+from instrumentation import get_logger
+
+log = get_logger(__name__)
+
+CONNECT_TIMEOUT = 5      # Giây chờ mở kết nối
+READ_TIMEOUT = 120       # Giây tối đa giữa hai lần nhận dữ liệu (server parse file lớn)
+MAX_RETRIES = 3          # Số lần thử lại sau lần gọi đầu tiên
+BACKOFF_SECONDS = 0.5    # Thời gian chờ lần thử lại đầu, nhân đôi sau mỗi lần
+RETRY_STATUSES = (502, 503, 504)
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 4
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class HttpError(Exception):
+    """Lỗi khi gọi server (đã gộp thông báo lỗi server trả về nếu có)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def get_session():
+    """Session dùng chung, tạo khi gọi lần đầu"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # Thử lại do http_client tự xử lý (cần dựng lại body stream mỗi lần)
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+class ProgressReporter:
+    """Gọi callback(stage, đã xong, tổng) khi phần trăm thay đổi (tránh bắn quá nhiều signal Qt)"""
+
+    def __init__(self, callback, stage, total):
+        self.callback = callback
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self._last_percent = -1
+
+    def advance(self, nbytes):
+        self.done += nbytes
+        if self.callback is None:
+            return
+        percent = self.done * 100 // self.total if self.total else -1
+        if percent != self._last_percent or not self.total:
+            self._last_percent = percent
+            self.callback(self.stage, self.done, self.total)
+
+
+class MultipartFileStream:
+    """
+    Body multipart/form-data cho một file, đọc dần từ đĩa.
+    Có __len__ nên requests gửi Content-Length thay vì chunked encoding.
+    """
+
+    def __init__(self, file_path, field="file", progress=None, cancelled=None):
+        self.file_path = file_path
+        self.cancelled = cancelled
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        filename = os.path.basename(file_path).replace('"', "%22")
+        self._head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        self._tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+        self.file_size = os.path.getsize(file_path)
+        self.length = len(self._head) + self.file_size + len(self._tail)
+        self.progress = ProgressReporter(progress, "upload", self.length)
+        self._parts = None
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def sent_bytes(self):
+        """Số byte body đã giao cho kết nối (0 = chưa gửi gì, thử lại không gửi trùng)"""
+        return self.progress.done
+
+    def __iter__(self):
+        yield self._head
+        self.progress.advance(len(self._head))
+        with open(self.file_path, "rb") as f:
+            while True:
+                if self.cancelled is not None and self.cancelled():
+                    raise Cancelled()
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+                self.progress.advance(len(chunk))
+        yield self._tail
+        self.progress.advance(len(self._tail))
+
+    def read(self, size=-1):
+        """Giao diện file-like cho http.client (gửi theo từng khối)"""
+        if self._parts is None:
+            self._parts = iter(self)
+        return next(self._parts, b"")
+
+
+def _read_body(response, progress, cancelled=None):
+    total = int(response.headers.get("Content-Length") or 0)
+    reporter = ProgressReporter(progress, "download", total)
+    chunks = []
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if cancelled is not None and cancelled():
+            raise Cancelled()
+        chunks.append(chunk)
+        reporter.advance(len(chunk))
+    return b"".join(chunks)
+
+
+def _error_message(status, body):
+    try:
+        return json.loads(body).get("error") or f"HTTP {status}"
+    except (ValueError, AttributeError):
+        text = body.decode("utf-8", "replace").strip()
+        return f"HTTP {status}: {text[:200]}" if text else f"HTTP {status}"
+
+
+def upload_file(url, file_path, field="file", progress=None,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=MAX_RETRIES, cancelled=None):
+    """
+    POST file dạng multipart lên url, trả về JSON đã parse.
+    progress(stage, đã xong, tổng) với stage "upload" hoặc "download"; tổng = 0 nếu không biết.
+    Thử lại khi không kết nối được (lỗi/timeout trước khi gửi byte nào của body) hoặc server trả 502/503/504.
+    Hết thời gian chờ đọc (server đã nhận đủ file nhưng xử lý quá READ_TIMEOUT) hay mất kết nối giữa chừng
+    thì báo lỗi luôn: gửi lại chỉ tốn thêm một lần upload và parse trên server.
+    cancelled: hàm trả về True nếu cần dừng; kiểm tra giữa các khối gửi/nhận và trước mỗi lần thử lại
+    (raise Cancelled).
+    """
+    import requests
+
+    session = get_session()
+    read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+    attempt = 0
+    while True:
+        body = MultipartFileStream(file_path, field, progress, cancelled)
+        try:
+            with session.post(url, data=body, headers={"Content-Type": body.content_type},
+                              timeout=timeout, stream=True) as response:
+                content = _read_body(response, progress, cancelled)
+                status = response.status_code
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if isinstance(e.__context__, Cancelled) or (cancelled is not None and cancelled()):
+                raise Cancelled() from e
+            if isinstance(e, requests.ReadTimeout):
+                raise HttpError(f"Server không phản hồi sau {read_timeout} giây (file có thể quá lớn để chuyển đổi)") from e
+            if body.sent_bytes:
+                raise HttpError(f"Mất kết nối tới server khi đang gửi file: {e}") from e
+            if attempt >= retries:
+                raise HttpError(f"Không kết nối được server sau {attempt + 1} lần thử: {e}") from e
+            log.warning("Upload lỗi (%s), thử lại lần %d", type(e).__name__, attempt + 1)
+        else:
+            if status == 200:
+                return json.loads(content)
+            if status not in RETRY_STATUSES or attempt >= retries:
+                raise HttpError(_error_message(status, content), status)
+            log.warning("Server trả về %d, thử lại lần %d", status, attempt + 1)
+        time.sleep(BACKOFF_SECONDS * (2 ** attempt))
+        if cancelled is not None and cancelled():
+            raise Cancelled()
+        attempt += 1
@@ -0,0 +1,382 @@
+"""
+Log và đo thời gian (span) cho MagicTool. Mặc định tắt hoàn toàn, gần như không tốn chi phí.
+
+Bật bằng biến môi trường:
+    MAGICTOOL_LOG=debug|info|warning|error   mức log in ra stderr (mặc định: warning)
+    MAGICTOOL_TRACE=1                        ghi lại span load/save/render/import/export và in ra stderr
+hoặc bấm Ctrl+Shift+D trong ứng dụng để mở bảng debug (debug_panel.py).
+Độ trễ các thao tác review (lưu, chuyển câu...) luôn được ghi lại: bấm F9 để xem p50/p95/p99 và xuất JSON.
+
+Đo thời gian khởi động (thời gian import từng module + các mốc dựng cửa sổ):
+    MAGICTOOL_STARTUP_REPORT=1            in bảng ra stderr
+    MAGICTOOL_STARTUP_REPORT=startup.json ghi ra file JSON
+
+Cách dùng trong code:
+    from instrumentation import get_logger, span
+    log = get_logger(__name__)
+    log.debug("Loaded %d sentences", n)      # format lười, không tốn gì khi tắt
+    with span("load", path=file_path) as s:
+        ...
+        s.set(rows=n)
+"""
+import os
+import sys
+import json
+import time
+import logging
+import builtins
+import platform
+import threading
+import functools
+from collections import deque
+
+LOGGER_NAME = "magictool"
+LOG_ENV = "MAGICTOOL_LOG"
+TRACE_ENV = "MAGICTOOL_TRACE"
+MAX_SPANS = 2000  # Số span gần nhất giữ trong bộ nhớ
+MAX_LOG_RECORDS = 1000  # Số dòng log gần nhất giữ cho bảng debug
+LATENCY_WINDOW = 500  # Số lần đo gần nhất giữ cho mỗi thao tác (bảng độ trễ F9)
+STARTUP_ENV = "MAGICTOOL_STARTUP_REPORT"
+
+logger = logging.getLogger(LOGGER_NAME)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.WARNING)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile trên list đã sort"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def get_logger(name=None):
+    """Logger con của "magictool" (vd: magictool.sentence_manager)"""
+    if not name or name == "__main__":
+        return logger
+    return logger.getChild(name)
+
+
+class RingBufferHandler(logging.Handler):
+    """Giữ các dòng log gần nhất trong bộ nhớ để xem trong bảng debug"""
+
+    def __init__(self, capacity=MAX_LOG_RECORDS):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S"))
+
+    def emit(self, record):
+        try:
+            self.records.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def lines(self):
+        return list(self.records)
+
+
+log_buffer = RingBufferHandler()
+logger.addHandler(log_buffer)
+
+
+class _NullSpan:
+    """Span dùng chung khi tracing tắt: không đo, không cấp phát"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "start")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.name, duration, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Gắn thêm thông tin cho span (số dòng, số byte...)"""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Ghi span (tên, thời điểm, thời lượng, thuộc tính) vào ring buffer; an toàn khi gọi từ nhiều thread"""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.enabled = False
+        self.spans = deque(maxlen=max_spans)  # (tên, time.time() lúc kết thúc, giây, attrs, tên thread)
+        self._lock = threading.Lock()
+        self._log = logger.getChild("trace")
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, name, duration, attrs=None):
+        entry = (name, time.time(), duration, attrs or {}, threading.current_thread().name)
+        with self._lock:
+            self.spans.append(entry)
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info("%s %.2f ms %s", name, duration * 1000, attrs or "")
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.spans)
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def summary(self):
+        """{tên: {count, total_ms, p50_ms, p95_ms, max_ms, last_ms}} trên các span còn trong buffer"""
+        grouped = {}
+        for name, _, duration, _, _ in self.snapshot():
+            grouped.setdefault(name, []).append(duration)
+        result = {}
+        for name, durations in grouped.items():
+            ordered = sorted(durations)
+            result[name] = {
+                "count": len(ordered),
+                "total_ms": sum(ordered) * 1000,
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "last_ms": durations[-1] * 1000,
+            }
+        return result
+
+
+tracer = Tracer()
+
+
+def span(name, **attrs):
+    """Đo thời gian một khối code: `with span("save", path=p): ...` (không làm gì khi tracing tắt)"""
+    if not tracer.enabled:
+        return _NULL_SPAN
+    return Span(tracer, name, attrs)
+
+
+class _Measure:
+    __slots__ = ("recorder", "name", "start", "nbytes")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.nbytes = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(self.name, time.perf_counter() - self.start, self.nbytes)
+        return False
+
+    def add_bytes(self, nbytes):
+        """Cộng số byte đã ghi trong lần đo này"""
+        self.nbytes = (self.nbytes or 0) + nbytes
+
+
+class LatencyRecorder:
+    """
+    Độ trễ cuộn của các thao tác trong UI: giữ LATENCY_WINDOW lần đo gần nhất cho mỗi tên.
+    Luôn bật (mỗi lần đo chỉ tốn 2 lần perf_counter + append), xem bằng bảng F9 hoặc export_json().
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}  # tên -> deque(giây)
+        self._bytes = {}  # tên -> [byte lần cuối, tổng byte, số lần có ghi]
+        self._lock = threading.Lock()
+
+    def measure(self, name):
+        """`with latency.measure("save_to_txt") as m: ...; m.add_bytes(n)`"""
+        return _Measure(self, name)
+
+    def timed(self, name):
+        """Decorator đo mỗi lần gọi hàm"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Measure(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds, nbytes=None):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            if nbytes is not None:
+                written = self._bytes.setdefault(name, [0, 0, 0])
+                written[0] = nbytes
+                written[1] += nbytes
+                written[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._bytes.clear()
+
+    def stats(self):
+        """{tên: {count, p50_ms, p95_ms, p99_ms, max_ms, last_ms, last_bytes, avg_bytes, total_bytes}}"""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+            written = {name: list(values) for name, values in self._bytes.items()}
+        result = {}
+        for name, values in samples.items():
+            ordered = sorted(values)
+            stats = {
+                "count": len(ordered),
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "last_ms": values[-1] * 1000,
+            }
+            if name in written:
+                last, total, count = written[name]
+                stats.update(last_bytes=last, avg_bytes=total // count, total_bytes=total)
+            result[name] = stats
+        return result
+
+    def export_json(self, path):
+        """Ghi thống kê + mẫu thô ra file JSON để đính kèm ticket"""
+        with self._lock:
+            samples = {name: [round(value * 1000, 3) for value in values] for name, values in self._samples.items()}
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "window": self.window,
+            "stats": self.stats(),
+            "samples_ms": samples,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+latency = LatencyRecorder()
+
+
+class StartupProfiler:
+    """
+    Đo thời gian khởi động: bọc builtins.__import__ để ghi thời gian import (gồm cả module con) của
+    từng module lần đầu được import, cộng các mốc do mark() đánh dấu. Chỉ chạy khi có MAGICTOOL_STARTUP_REPORT.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.target = None
+        self.started = None
+        self.phases = []  # (tên mốc, giây kể từ start)
+        self.imports = []  # (module, độ sâu lồng nhau, giây)
+        self._original_import = None
+        self._depth = 0
+
+    def start(self, environ=None):
+        environ = os.environ if environ is None else environ
+        target = environ.get(STARTUP_ENV, "").strip()
+        if not target or self.enabled:
+            return
+        self.enabled = True
+        self.target = target
+        self.started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = self._depth
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.imports.append((name, depth, time.perf_counter() - start))
+
+    def mark(self, name):
+        """Đánh dấu một mốc khởi động (vd: "main_window", "shown")"""
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - self.started))
+
+    def report(self):
+        top_level = sorted((item for item in self.imports if item[1] == 0), key=lambda item: -item[2])
+        return {
+            "total_s": round(self.phases[-1][1], 4) if self.phases else None,
+            "phases": [{"name": name, "at_s": round(at, 4)} for name, at in self.phases],
+            "imports": [{"module": name, "s": round(seconds, 4)} for name, _, seconds in top_level],
+            "imports_all": [{"module": name, "depth": depth, "s": round(seconds, 5)}
+                            for name, depth, seconds in self.imports],
+        }
+
+    def finish(self, name="ready"):
+        """Gỡ hook import, ghi báo cáo ra stderr hoặc file JSON; trả về báo cáo (None nếu không bật)"""
+        if not self.enabled:
+            return None
+        self.mark(name)
+        builtins.__import__ = self._original_import
+        self.enabled = False
+        report = self.report()
+        if self.target.lower() in ("1", "true", "yes", "stderr"):
+            lines = ["Startup: " + ", ".join(f"{phase['name']} {phase['at_s'] * 1000:.0f} ms" for phase in report["phases"])]
+            lines += [f"  import {item['module']:<28} {item['s'] * 1000:8.1f} ms"
+                      for item in report["imports"] if item["s"] >= 0.001]
+            print("\n".join(lines), file=sys.stderr)
+        else:
+            with open(self.target, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+
+startup = StartupProfiler()
+
+
+def set_log_level(level):
+    """Đổi mức log của cả ứng dụng; level là tên ("debug") hoặc hằng số của logging"""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.WARNING
+    logger.setLevel(level)
+
+
+def configure_from_env(environ=None):
+    """Đọc MAGICTOOL_LOG / MAGICTOOL_TRACE, gắn handler in ra stderr nếu được bật"""
+    environ = os.environ if environ is None else environ
+    level = environ.get(LOG_ENV, "").strip()
+    trace = environ.get(TRACE_ENV, "").strip().lower() not in ("", "0", "false", "no")
+    if not level and not trace:
+        return
+    set_log_level(level or "info")
+    if not any(getattr(handler, "_magictool_stderr", False) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+        handler._magictool_stderr = True
+        logger.addHandler(handler)
+    tracer.enabled = trace
@@ -1,13 +1,46 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+from instrumentation import startup
+startup.start()  # Chỉ bật khi có MAGICTOOL_STARTUP_REPORT: đo thời gian import các module bên dưới
+
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout,
     QLabel, QLineEdit, QTextEdit, QFrame, QPushButton, QFileDialog,
-    QHBoxLayout, QMessageBox, QCheckBox, QComboBox, QGraphicsOpacityEffect
+    QHBoxLayout, QMessageBox, QCheckBox, QComboBox, QGraphicsOpacityEffect,
+    QDialog, QDialogButtonBox, QFormLayout, QSpinBox
 )
-from PySide6.QtCore import Qt, QTimer, QEvent, QPropertyAnimation, QEasingCurve
-from PySide6.QtGui import QColor, QKeySequence, QTextCursor
-from drawing_tab import DrawingTab
+from PySide6.QtCore import Qt, QTimer, QEvent, QPropertyAnimation, QEasingCurve, QPoint, QThread, Signal
+from PySide6.QtGui import QColor, QKeySequence, QTextCursor, QShortcut
 from back_end import eu
 from sentence_manager import SentenceManager
+from sentence_prefetch import SentencePrefetcher
+import exporters
+from exporters import ExportCancelled
+from instrumentation import configure_from_env, get_logger, latency, span
+from text_search import SentenceIndex, index_path_for
+from sentence_filter import (
+    CONTAINS, EDITED_TODAY, EMPTY, NOT_CONTAINS, NOT_EMPTY, STATUS, Condition, RowFilter, SentenceView,
+)
+
+log = get_logger(__name__)
+
+# MAGICTOOL_EAGER=1: dựng tab Vẽ vùng và layout đã lưu ngay trong __init__ (như trước đây)
+EAGER_STARTUP = os.environ.get("MAGICTOOL_EAGER", "").strip().lower() not in ("", "0", "false", "no")
+# MAGICTOOL_EXIT_AFTER_STARTUP=1: thoát ngay khi khởi động xong (main_build.py dùng để đo thời gian mở app)
+EXIT_AFTER_STARTUP = os.environ.get("MAGICTOOL_EXIT_AFTER_STARTUP", "").strip().lower() not in ("", "0", "false", "no")
+
+
+# Style dùng chung cho ô nhập và nhãn field ở Trang chính (chỉ parse khi tạo widget)
+FIELD_EDIT_STYLE = (
+    "QTextEdit { "
+    "padding: 4px; "
+    "border: 2px solid #0064ff; "  # Viền xanh dương rõ nét
+    "border-radius: 3px; "
+    "}"
+)
+FIELD_LABEL_STYLE = "QLabel { font-size: 10pt; color: #444444; }"
 
 
 class NotificationWidget(QLabel):
@@ -73,12 +106,234 @@ class CustomTextEdit(QTextEdit):
                     widget.setTextCursor(cursor)
 
 
+class ExportWorker(QThread):
+    """Worker thread xuất file dạng stream (xlsx/csv/tsv/jsonl/parquet), không block UI"""
+    progress = Signal(int, int)  # (số dòng đã ghi, tổng số dòng)
+    finished = Signal(str)       # Signal khi thành công, trả về đường dẫn file
+    error = Signal(str)          # Signal khi có lỗi, trả về error message
+    cancelled = Signal()
+
+    def __init__(self, sm, file_path, fmt, include_status, sentences=None, status=None, start=None, stop=None):
+        super().__init__()
+        self.sm = sm
+        self.file_path = file_path
+        self.fmt = fmt
+        self.include_status = include_status
+        # Giữ tham chiếu danh sách nguồn: filter/load sau đó gán list mới, không ảnh hưởng lần xuất này
+        self.sentences = sm.sentences if sentences is None else sentences
+        self.status = status
+        self.start_row = start
+        self.stop_row = stop
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        """Chạy trong thread riêng"""
+        try:
+            total = self.sm.count_sentences(self.status, self.start_row, self.stop_row, self.sentences)
+            self.sm.export_to(
+                self.file_path, self.fmt, include_status=self.include_status,
+                sentences=self.sentences, status=self.status, start=self.start_row, stop=self.stop_row,
+                progress=lambda done: self.progress.emit(done, total),
+                should_cancel=self._cancel_event.is_set,
+            )
+            self.finished.emit(self.file_path)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class SearchIndexWorker(QThread):
+    """Nạp index tìm kiếm đã lưu cạnh file TXT (nếu còn khớp) hoặc dựng lại trong thread riêng"""
+    finished = Signal(object)  # SentenceIndex đã sẵn sàng (chờ finish_build trên UI thread)
+
+    def __init__(self, index, index_path=None, signature=None):
+        super().__init__()
+        self.index = index
+        self.index_path = index_path
+        self.signature = signature  # (mtime_ns, size) của TXT khớp với dữ liệu lúc bắt đầu
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        try:
+            if self.index_path and self.signature and self.index.load(self.index_path, self.signature):
+                log.info("Search index loaded from %s", self.index_path)
+            else:
+                if not self.index.build(self._cancel_event.is_set):
+                    return
+                # Chỉ lưu khi không có thay đổi nào trong lúc dựng (index khớp đúng file TXT)
+                if self.index_path and self.signature and not self.index.has_pending():
+                    self.index.save(self.index_path, self.signature)
+            self.finished.emit(self.index)
+        except Exception as e:
+            log.warning("Search index failed: %s", e)
+
+
+class ExportOptionsDialog(QDialog):
+    """Hộp thoại chọn phạm vi xuất: danh sách đang hiển thị / toàn bộ / theo trạng thái, và khoảng dòng"""
+    # Tên hiển thị -> (dùng danh sách đang hiển thị?, trạng thái)
+    SCOPES = {
+        "Danh sách đang hiển thị": (True, None),
+        "Toàn bộ dữ liệu": (False, None),
+        "Chỉ câu Done": (False, "Done"),
+        "Chỉ câu Not Done": (False, "Not Done"),
+    }
+
+    def __init__(self, sm, parent=None):
+        super().__init__(parent)
+        self.sm = sm
+        self.setWindowTitle("Tùy chọn xuất")
+        layout = QFormLayout(self)
+
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItems(list(self.SCOPES))
+        self.scope_combo.currentTextChanged.connect(self.update_range_limits)
+        layout.addRow("Phạm vi:", self.scope_combo)
+
+        # Khoảng dòng đánh số từ 1 như ô STT, gồm cả hai đầu
+        self.from_spin = QSpinBox()
+        self.to_spin = QSpinBox()
+        layout.addRow("Từ dòng:", self.from_spin)
+        layout.addRow("Đến dòng:", self.to_spin)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+        self.update_range_limits()
+
+    def source(self):
+        use_view, _ = self.SCOPES[self.scope_combo.currentText()]
+        return self.sm.sentences if use_view else (self.sm.all_sentences or self.sm.sentences)
+
+    def update_range_limits(self):
+        total = max(1, len(self.source()))
+        for spin in (self.from_spin, self.to_spin):
+            spin.setRange(1, total)
+        self.from_spin.setValue(1)
+        self.to_spin.setValue(total)
+
+    def options(self):
+        """Trả về tham số cho SentenceManager.export_to: sentences, status, start, stop (0-based, [start, stop))"""
+        _, status = self.SCOPES[self.scope_combo.currentText()]
+        start = self.from_spin.value() - 1
+        stop = max(self.to_spin.value(), self.from_spin.value())
+        return {"sentences": self.source(), "status": status, "start": start, "stop": stop}
+
+
+class AdvancedFilterDialog(QDialog):
+    """Hộp thoại lọc nâng cao: trạng thái, sửa hôm nay và các điều kiện trên từng trường (thoả tất cả)"""
+    STATUSES = {"Tất cả": None, "Done": "Done", "Not Done": "Not Done"}
+    KINDS = {
+        "chứa": CONTAINS,
+        "không chứa": NOT_CONTAINS,
+        "trống": EMPTY,
+        "không trống": NOT_EMPTY,
+    }
+
+    def __init__(self, fields, row_filter=None, parent=None):
+        super().__init__(parent)
+        self.fields = list(fields)
+        self.setWindowTitle("Lọc nâng cao")
+        self.setMinimumWidth(480)
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        self.status_combo = QComboBox()
+        self.status_combo.addItems(list(self.STATUSES))
+        form.addRow("Trạng thái:", self.status_combo)
+        self.edited_today_check = QCheckBox("Chỉ câu đã sửa hôm nay (trong phiên này)")
+        form.addRow("", self.edited_today_check)
+        layout.addLayout(form)
+
+        self.rows_layout = QVBoxLayout()
+        self.condition_rows = []  # (widget, combo trường, combo điều kiện, ô từ khoá)
+        layout.addLayout(self.rows_layout)
+        add_button = QPushButton("+ Thêm điều kiện")
+        add_button.clicked.connect(lambda: self.add_condition_row())
+        layout.addWidget(add_button, alignment=Qt.AlignLeft)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        conditions = row_filter.conditions if row_filter is not None else ()
+        for condition in conditions:
+            if condition.kind == STATUS:
+                self.status_combo.setCurrentText(condition.value)
+            elif condition.kind == EDITED_TODAY:
+                self.edited_today_check.setChecked(True)
+            else:
+                self.add_condition_row(condition)
+        if not self.condition_rows:
+            self.add_condition_row()
+
+    def add_condition_row(self, condition=None):
+        row = QWidget()
+        row_layout = QHBoxLayout(row)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        field_combo = QComboBox()
+        field_combo.addItem("Mọi trường", None)
+        for field in self.fields:
+            field_combo.addItem(field.replace("3==D", " ").strip(), field)
+        kind_combo = QComboBox()
+        kind_combo.addItems(list(self.KINDS))
+        value_input = QLineEdit()
+        value_input.setPlaceholderText("Từ khoá")
+        remove_button = QPushButton("✕")
+        remove_button.setFixedWidth(28)
+        row_layout.addWidget(field_combo, 2)
+        row_layout.addWidget(kind_combo, 1)
+        row_layout.addWidget(value_input, 2)
+        row_layout.addWidget(remove_button)
+        entry = (row, field_combo, kind_combo, value_input)
+        kind_combo.currentTextChanged.connect(
+            lambda text: value_input.setEnabled(self.KINDS[text] in (CONTAINS, NOT_CONTAINS)))
+        remove_button.clicked.connect(lambda: self.remove_condition_row(entry))
+        if condition is not None:
+            field_combo.setCurrentIndex(max(0, field_combo.findData(condition.field)))
+            kind_combo.setCurrentText(next(text for text, kind in self.KINDS.items() if kind == condition.kind))
+            value_input.setText(condition.value or "")
+        self.condition_rows.append(entry)
+        self.rows_layout.addWidget(row)
+
+    def remove_condition_row(self, entry):
+        self.condition_rows.remove(entry)
+        entry[0].deleteLater()
+
+    def row_filter(self):
+        """RowFilter từ các lựa chọn; bỏ qua điều kiện chứa/không chứa chưa nhập từ khoá"""
+        conditions = []
+        status = self.STATUSES[self.status_combo.currentText()]
+        if status is not None:
+            conditions.append(Condition(STATUS, value=status))
+        if self.edited_today_check.isChecked():
+            conditions.append(Condition(EDITED_TODAY))
+        for _, field_combo, kind_combo, value_input in self.condition_rows:
+            kind = self.KINDS[kind_combo.currentText()]
+            if kind in (CONTAINS, NOT_CONTAINS):
+                value = value_input.text().strip()
+                if value:
+                    conditions.append(Condition(kind, field_combo.currentData(), value))
+            else:
+                conditions.append(Condition(kind, field_combo.currentData()))
+        return RowFilter(conditions)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Review Text Tool")
         self.sm = SentenceManager()  # Quản lý câu
         self.current_file_path = None  # Lưu đường dẫn file hiện tại
+        self.prefetcher = SentencePrefetcher()  # Chuẩn bị sẵn chuỗi hiển thị cho các câu lân cận
 
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
@@ -181,6 +436,14 @@ class MainWindow(QMainWindow):
         self.save_btn.clicked.connect(self.export_excel)
         buttons_row.addWidget(self.save_btn)
         
+        # Nút huỷ xuất - chỉ hiện khi đang xuất
+        self.cancel_export_btn = QPushButton("Huỷ xuất")
+        self.cancel_export_btn.setFixedSize(80, 32)
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+        self.cancel_export_btn.hide()
+        buttons_row.addWidget(self.cancel_export_btn)
+        self.export_worker = None  # Worker thread cho xuất file
+        
         buttons_row.addStretch()
         left_section.addLayout(buttons_row)
         
@@ -280,7 +543,59 @@ class MainWindow(QMainWindow):
         checkbox_container.addStretch()
         
         center_section.addLayout(checkbox_container)
+
+        # Tìm nội dung: ô tìm + chọn trường + câu khớp trước/sau
+        search_row = QHBoxLayout()
+        search_row.setSpacing(4)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Tìm nội dung...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setFixedHeight(28)
+        self.search_input.setStyleSheet(
+            "QLineEdit { padding: 2px 6px; border: 1px solid #2d8cff; border-radius: 4px; "
+            "font-size: 10pt; background-color: white; }"
+        )
+        self.search_input.textChanged.connect(self.schedule_search)
+        self.search_input.returnPressed.connect(self.next_search_hit)
+        search_row.addWidget(self.search_input, 1)
+
+        self.search_field_combo = QComboBox()
+        self.search_field_combo.setFixedHeight(28)
+        self.search_field_combo.setMaximumWidth(120)
+        self.search_field_combo.addItem("Mọi trường", None)
+        self.search_field_combo.currentIndexChanged.connect(self.run_search)
+        search_row.addWidget(self.search_field_combo)
+
+        self.search_prev_btn = QPushButton("▲")
+        self.search_prev_btn.setFixedSize(28, 28)
+        self.search_prev_btn.setToolTip("Câu khớp trước")
+        self.search_prev_btn.clicked.connect(self.prev_search_hit)
+        search_row.addWidget(self.search_prev_btn)
+        self.search_next_btn = QPushButton("▼")
+        self.search_next_btn.setFixedSize(28, 28)
+        self.search_next_btn.setToolTip("Câu khớp sau (Enter)")
+        self.search_next_btn.clicked.connect(self.next_search_hit)
+        search_row.addWidget(self.search_next_btn)
+
+        self.search_status_label = QLabel("")
+        self.search_status_label.setMinimumWidth(60)
+        self.search_status_label.setStyleSheet(
+            "QLabel { color: #1f3b75; font-size: 9pt; border: none; background: transparent; }"
+        )
+        search_row.addWidget(self.search_status_label)
+        center_section.addLayout(search_row)
         center_section.addStretch()
+
+        # Index tìm kiếm trên all_sentences hiện tại (dựng nền sau mỗi lần load dữ liệu)
+        self.search_index = None
+        self.search_worker = None
+        self.search_workers_cancelled = []  # Worker đã huỷ nhưng thread chưa kết thúc
+        self.search_hits = []
+        self.search_hits_version = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.run_search)
         
         # Phần 3: Filter
         right_frame = QFrame()
@@ -359,6 +674,14 @@ class MainWindow(QMainWindow):
             "}"
         )
         filter_row.addWidget(self.filter_btn)
+
+        # Nút lọc nâng cao (điều kiện theo trường / sửa hôm nay)
+        self.advanced_filter_btn = QPushButton("...")
+        self.advanced_filter_btn.setFixedSize(30, 30)
+        self.advanced_filter_btn.setToolTip("Lọc nâng cao")
+        self.advanced_filter_btn.clicked.connect(self.open_advanced_filter)
+        self.advanced_filter_btn.setStyleSheet(self.filter_btn.styleSheet())
+        filter_row.addWidget(self.advanced_filter_btn)
         
         right_section.addLayout(filter_row)
         right_section.addStretch()
@@ -396,20 +719,30 @@ class MainWindow(QMainWindow):
         # Tab 2: Vẽ vùng
         saved_rects, saved_fields = eu.load_config()
         fields = saved_fields or []
+        self.saved_rects = saved_rects
+        self.saved_fields = fields
 
         # ✅ Khởi tạo SentenceManager rỗng để vẽ layout nếu chưa import
         self.sm = SentenceManager()
         self.sm.fields = fields
         self.sm.sentences = []  # Chưa có câu nào
 
-        self.tab2 = DrawingTab(fields, self)
-
-        if saved_rects:
-            self.tab2.load_saved_rects(saved_rects)
-            self.on_done([(rect, QColor(0, 100, 255), field) for rect, field in saved_rects])
+        # DrawingTab (và requests của nó) chỉ được import/dựng khi mở tab lần đầu, xem ensure_drawing_tab
+        self.tab2 = None
+        self.drawing_page = QWidget()
+        drawing_page_layout = QVBoxLayout(self.drawing_page)
+        drawing_page_layout.setContentsMargins(0, 0, 0, 0)
 
         self.tabs.addTab(self.tab1, "Trang chính")
-        self.tabs.addTab(self.tab2, "Vẽ vùng")
+        self.tabs.addTab(self.drawing_page, "Vẽ vùng")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        if EAGER_STARTUP:
+            self.ensure_drawing_tab()
+            self.restore_saved_layout()
+        else:
+            # Dựng Trang chính theo layout đã lưu sau khi cửa sổ đã hiện
+            QTimer.singleShot(0, self.restore_saved_layout)
         
         # Tạo notification widget (đặt trên tab1)
         self.notification = NotificationWidget(self.tab1)
@@ -428,6 +761,52 @@ class MainWindow(QMainWindow):
         )
         for btn in [self.prev_btn, self.next_btn, self.save_btn]:
             btn.setStyleSheet(rounded_button_style)
+        for btn in [self.search_prev_btn, self.search_next_btn]:
+            btn.setStyleSheet(rounded_button_style.replace("border-radius: 12px; padding: 6px 12px;", "border-radius: 6px; padding: 0px;"))
+        self.cancel_export_btn.setStyleSheet(
+            "QPushButton {"
+            " background-color: #ff4444; color: white; border: none;"
+            " border-radius: 12px; padding: 6px 12px;"
+            "}"
+            "QPushButton:hover { background-color: #dd2222; }"
+            "QPushButton:pressed { background-color: #bb1111; }"
+        )
+
+        # Bảng debug ẩn: span thời gian + log (xem instrumentation.py)
+        self.debug_panel = None
+        self.debug_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.debug_shortcut.activated.connect(self.toggle_debug_panel)
+        # Bảng độ trễ các thao tác review (F9)
+        self.latency_panel = None
+        self.latency_shortcut = QShortcut(QKeySequence(Qt.Key_F9), self)
+        self.latency_shortcut.activated.connect(self.toggle_latency_panel)
+
+    def ensure_drawing_tab(self):
+        """Dựng tab Vẽ vùng ở lần dùng đầu tiên"""
+        if self.tab2 is None:
+            with span("startup.drawing_tab"):
+                from drawing_tab import DrawingTab
+                self.tab2 = DrawingTab(self.saved_fields, self)
+                if self.saved_rects:
+                    self.tab2.load_saved_rects(self.saved_rects)
+                self.drawing_page.layout().addWidget(self.tab2)
+        return self.tab2
+
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.drawing_page:
+            self.ensure_drawing_tab()
+
+    def restore_saved_layout(self):
+        """Dựng các ô nhập ở Trang chính theo layout trong config.json"""
+        with span("startup.restore_layout"):
+            if self.saved_rects:
+                self.on_done([(rect, QColor(0, 100, 255), field) for rect, field in self.saved_rects])
+
+    def finish_startup(self):
+        """Mốc "ready": gọi qua QTimer sau window.show(), sau restore_saved_layout ở cả hai chế độ"""
+        startup.finish()
+        if EXIT_AFTER_STARTUP:
+            QTimer.singleShot(0, self.close)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -449,74 +828,93 @@ class MainWindow(QMainWindow):
                     pass
 
     def on_done(self, rects, stay_on_current_tab=False):
-        # Nếu chưa có dữ liệu sentences nhưng đã có đường dẫn file, load lại
-        if (not hasattr(self, 'sm')):
-            self.sm = SentenceManager()
+        with span("render.on_done", rects=len(rects)):
+            # Nếu chưa có dữ liệu sentences nhưng đã có đường dẫn file, load lại
+            if (not hasattr(self, 'sm')):
+                self.sm = SentenceManager()
         
-        # Luôn load lại từ file nếu có current_file_path để đảm bảo dữ liệu mới nhất
-        if getattr(self, 'current_file_path', None):
-            try:
-                self.sm.load_from_txt(self.current_file_path)
-                print(f"DEBUG: Loaded {len(self.sm.sentences)} sentences from {self.current_file_path}")
-            except Exception as e:
-                print(f"DEBUG: Failed to load TXT in on_done: {e}")
+            # Load từ file nếu có current_file_path; bỏ qua nếu file không đổi kể từ lần load/save cuối
+            if getattr(self, 'current_file_path', None):
+                try:
+                    self.sm.load_from_txt(self.current_file_path)
+                except Exception as e:
+                    log.warning("Failed to load TXT in on_done: %s", e)
         
-        # Xóa widgets cũ (trừ stt_error_label và notification)
-        for child in self.tab1.findChildren(QTextEdit) + self.tab1.findChildren(QLabel):
-            if child.parent() == self.tab1 and child != self.stt_error_label and child != getattr(self, 'notification', None):
-                child.deleteLater()
+            grid_size = self.logicalDpiX() // 2.54
+            reserved_height = grid_size * 3
+            self.header.setGeometry(0, 0, self.tab1.width(), reserved_height)
 
-        self.field_widgets = {}
+            # Pool widget theo tên field: chỉ thêm/bớt/di chuyển những gì thay đổi
+            old_widgets = getattr(self, 'field_widgets', {})
+            if not hasattr(self, 'field_labels'):
+                self.field_labels = {}
+            layout = {}
+            for rect, color, name in rects:
+                layout[name] = rect  # Trùng tên field: dùng rect cuối cùng
 
-        grid_size = self.logicalDpiX() // 2.54
-        reserved_height = grid_size * 3
-        self.header.setGeometry(0, 0, self.tab1.width(), reserved_height)
+            # Xóa widget của các field không còn trong layout
+            for name in [name for name in old_widgets if name not in layout]:
+                old_widgets[name].deleteLater()
+                label = self.field_labels.pop(name, None)
+                if label is not None:
+                    label.deleteLater()
 
-        current_sentence = None
-        if hasattr(self, 'sm') and self.sm.sentences:
-            current_sentence = self.sm.current()
+            self.field_widgets = {}
+            for name, rect in layout.items():
+                input_box = old_widgets.get(name)
+                if input_box is None:
+                    input_box = self.create_field_widget(name)
+                label = self.field_labels[name]
 
-        for rect, color, name in rects:
-            value = ""
-            if current_sentence:
-                value = current_sentence.get(name).replace("3==D", "\n")
-            print(f"DEBUG: Field '{name}' = '{value}'")
-            print(f"DEBUG: Available fields: {list(current_sentence.fields.keys()) if current_sentence else 'No sentence'}")
-
-            input_box = CustomTextEdit(self.tab1, main_window=self)
-            input_box.setGeometry(rect)
-            input_box.setPlainText(value)
-            input_box.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-            input_box.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-            input_box.setLineWrapMode(QTextEdit.WidgetWidth)
-            # Thêm viền rõ nét cho các khung
-            input_box.setStyleSheet(
-                "QTextEdit { "
-                "padding: 4px; "
-                "border: 2px solid #0064ff; "  # Viền xanh dương rõ nét
-                "border-radius: 3px; "
-                "}"
-            )
-            # Đặt font Times New Roman và cỡ chữ hiện tại
-            font = input_box.font()
-            font.setFamily("Times New Roman")
-            font.setPointSize(self.text_font_point_size)
-            input_box.setFont(font)
-            input_box.show()
+                if input_box.geometry() != rect:
+                    input_box.setGeometry(rect)
+                label_pos = QPoint(rect.x() + 4, rect.y() - 18)
+                if label.pos() != label_pos:
+                    label.move(label_pos)
+
+                self.field_widgets[name] = input_box
+
+            current_sentence = None
+            if hasattr(self, 'sm') and self.sm.sentences:
+                current_sentence = self.sm.current()
 
-            label = QLabel(name.replace("3==D", " "), self.tab1)
-            label.move(rect.x() + 4, rect.y() - 18)
-            label.setStyleSheet("QLabel { font-size: 10pt; color: #444444; }")
-            label.adjustSize()
-            label.show()
+            display = self.prefetcher.display_values(current_sentence, self.field_widgets) if current_sentence else {}
+            for name, input_box in self.field_widgets.items():
+                value = display.get(name, "")
+                if input_box.toPlainText() != value:
+                    input_box.setPlainText(value)
 
-            self.field_widgets[name] = input_box
+            if current_sentence:
+                self.prefetcher.schedule(self.sm.sentences, self.sm.current_index, list(self.field_widgets))
 
-        if not stay_on_current_tab:
-            self.tabs.setCurrentWidget(self.tab1)
+            if not stay_on_current_tab:
+                self.tabs.setCurrentWidget(self.tab1)
         
-        # Cập nhật STT sau khi load xong
-        self.update_stt_display()
+            # Cập nhật STT sau khi load xong
+            self.update_stt_display()
+            self.schedule_search_index()
+
+    def create_field_widget(self, name):
+        """Tạo ô nhập + nhãn cho một field (chỉ gọi khi field chưa có trong pool)"""
+        input_box = CustomTextEdit(self.tab1, main_window=self)
+        input_box.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        input_box.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        input_box.setLineWrapMode(QTextEdit.WidgetWidth)
+        # Thêm viền rõ nét cho các khung
+        input_box.setStyleSheet(FIELD_EDIT_STYLE)
+        # Đặt font Times New Roman và cỡ chữ hiện tại
+        font = input_box.font()
+        font.setFamily("Times New Roman")
+        font.setPointSize(self.text_font_point_size)
+        input_box.setFont(font)
+        input_box.show()
+
+        label = QLabel(name.replace("3==D", " "), self.tab1)
+        label.setStyleSheet(FIELD_LABEL_STYLE)
+        label.adjustSize()
+        label.show()
+        self.field_labels[name] = label
+        return input_box
 
     def import_data(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Chọn file TXT", "", "Text Files (*.txt)")
@@ -524,6 +922,7 @@ class MainWindow(QMainWindow):
             self.current_file_path = file_path  # Lưu đường dẫn file
             self.sm.load_from_txt(file_path)
             self.show_sentence()
+            self.schedule_search_index()
 
     def show_sentence(self):
         if not hasattr(self, 'field_widgets'):
@@ -531,9 +930,11 @@ class MainWindow(QMainWindow):
         sentence = self.sm.current()
         if sentence is None:
             return
+        # Chuỗi hiển thị (3==D → xuống dòng) lấy từ prefetch nếu đã chuẩn bị sẵn
+        display = self.prefetcher.display_values(sentence, self.field_widgets)
         for field, widget in self.field_widgets.items():
-            value = sentence.get(field).replace("3==D", "\n")  # Convert 3==D thành xuống dòng khi hiển thị
-            widget.setPlainText(value)
+            widget.setPlainText(display[field])
+        self.prefetcher.schedule(self.sm.sentences, self.sm.current_index, list(self.field_widgets))
         
         # Cập nhật STT (index + 1 vì bắt đầu từ 1)
         self.update_stt_display()
@@ -580,7 +981,7 @@ class MainWindow(QMainWindow):
             # Lưu câu hiện tại trước khi chuyển
             self.save_current_sentence()
             if self.current_file_path:
-                self.sm.save_to_txt(self.current_file_path)
+                self.save_to_file()
             
             # Chuyển đến câu mới (stt - 1 vì index bắt đầu từ 0)
             self.sm.current_index = stt - 1
@@ -599,16 +1000,22 @@ class MainWindow(QMainWindow):
         # Lưu câu hiện tại trước khi filter
         self.save_current_sentence()
         if self.current_file_path:
-            self.sm.save_to_txt(self.current_file_path)
+            self.save_to_file()
         
-        filter_type = self.filter_combo.currentText()
-        
-        # Áp dụng filter
-        self.sm.apply_filter(filter_type)
+        self.set_filter(self.filter_combo.currentText())
+
+    def set_filter(self, filter_type):
+        """Áp dụng filter ("All"/"Done"/"Not Done" hoặc RowFilter) và cập nhật giao diện"""
+        try:
+            with latency.measure("apply_filter"):
+                self.sm.apply_filter(filter_type)
+        except ValueError as e:
+            QMessageBox.warning(self, "Cảnh báo", str(e))
+            return
         
         # Kiểm tra nếu không có câu nào sau khi filter
         if not self.sm.sentences:
-            self.show_notification(f"Không có câu nào có trạng thái '{filter_type}'!")
+            self.show_notification(f"Không có câu nào khớp '{filter_type}'!")
             # Quay về filter All
             self.filter_combo.setCurrentText("All")
             self.sm.apply_filter("All")
@@ -618,8 +1025,167 @@ class MainWindow(QMainWindow):
         
         # Hiển thị thông báo
         total = len(self.sm.sentences)
-        self.show_notification(f"Đã lọc: {filter_type} - Số câu: {total}")
+        self.show_notification(f"Đã lọc: {self.sm.current_filter} - Số câu: {total}")
+
+    def open_advanced_filter(self):
+        """Lọc theo điều kiện trên từng trường / sửa hôm nay (AdvancedFilterDialog)"""
+        if not self.sm.all_sentences:
+            QMessageBox.warning(self, "Cảnh báo", "Chưa có dữ liệu để lọc!")
+            return
+        current = self.sm.current_filter
+        dialog = AdvancedFilterDialog(self.sm.fields, current if isinstance(current, RowFilter) else None, self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        self.save_current_sentence()
+        if self.current_file_path:
+            self.save_to_file()
+        row_filter = dialog.row_filter()
+        self.set_filter(row_filter if row_filter.conditions else "All")
+
+    def schedule_search_index(self):
+        """Dựng (hoặc nạp từ file) index tìm kiếm nếu dữ liệu đã đổi sang danh sách câu khác"""
+        sentences = self.sm.all_sentences
+        if self.search_index is not None and self.search_index.sentences is sentences:
+            return
+        if self.search_worker is not None and self.search_worker.isRunning():
+            worker = self.search_worker
+            worker.cancel()
+            worker.finished.disconnect()
+            self.search_workers_cancelled.append(worker)
+            QTimer.singleShot(0, self.release_search_workers)
+        if self.search_index is not None:
+            self.search_index.detach()
+        self.search_index = None
+        self.search_worker = None
+        self.search_hits = []
+        self.search_hits_version = None
+        self.update_search_fields()
+        if not sentences:
+            self.search_status_label.setText("")
+            return
+
+        self.search_index = SentenceIndex(sentences, self.sm.fields)
+        index_path = signature = None
+        if self.current_file_path and self.sm.is_loaded(self.current_file_path):
+            index_path = index_path_for(self.current_file_path)
+            signature = self.sm.file_signature(self.current_file_path)[1:]
+        self.search_worker = SearchIndexWorker(self.search_index, index_path, signature)
+        self.search_worker.finished.connect(self.on_search_index_ready)
+        self.search_worker.start()
+        if self.search_input.text().strip():
+            self.search_status_label.setText("Đang lập chỉ mục...")
+
+    def release_search_workers(self):
+        """Bỏ tham chiếu các worker index đã huỷ khi thread của chúng đã dừng"""
+        self.search_workers_cancelled = [w for w in self.search_workers_cancelled if w.isRunning()]
+        if self.search_workers_cancelled:
+            QTimer.singleShot(200, self.release_search_workers)
+
+    def on_search_index_ready(self, index):
+        if index is not self.search_index:
+            return
+        index.finish_build()
+        self.search_worker = None
+        if self.search_input.text().strip():
+            self.run_search()
+
+    def update_search_fields(self):
+        """Danh sách trường trong combo tìm kiếm theo dữ liệu hiện tại"""
+        current = self.search_field_combo.currentData()
+        self.search_field_combo.blockSignals(True)
+        self.search_field_combo.clear()
+        self.search_field_combo.addItem("Mọi trường", None)
+        for field in self.sm.fields:
+            self.search_field_combo.addItem(field.replace("3==D", " ").strip(), field)
+        position = self.search_field_combo.findData(current) if current is not None else 0
+        self.search_field_combo.setCurrentIndex(max(0, position))
+        self.search_field_combo.blockSignals(False)
+
+    def schedule_search(self):
+        self.search_timer.start()
+
+    def run_search(self):
+        """Tìm các câu khớp từ khoá (không đổi câu đang hiển thị)"""
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        self.search_hits = []
+        self.search_hits_version = None
+        if not query:
+            self.search_status_label.setText("")
+            return
+        index = self.search_index
+        if index is None:
+            self.search_status_label.setText("Chưa có dữ liệu")
+            return
+        if not index.ready:
+            self.search_status_label.setText("Đang lập chỉ mục...")
+            return
+        with latency.measure("search"):
+            self.search_hits = index.search(query, self.search_field_combo.currentData())
+        self.search_hits_version = index.version
+        self.search_status_label.setText(f"{len(self.search_hits)} câu")
+
+    def next_search_hit(self):
+        self.goto_search_hit(1)
+
+    def prev_search_hit(self):
+        self.goto_search_hit(-1)
+
+    def goto_search_hit(self, step):
+        """Chuyển tới câu khớp kế tiếp (step=1) hoặc trước đó (step=-1) trong danh sách đang hiển thị"""
+        index = self.search_index
+        if index is None or not index.ready or not self.sm.sentences or not hasattr(self, 'field_widgets'):
+            return
+        if self.search_hits_version != index.version or self.search_timer.isActive():
+            self.run_search()  # Kết quả cũ: nội dung đã sửa hoặc từ khoá đang gõ dở
+        hits = self.search_hits
+        if not hits:
+            return
 
+        # Vị trí trong danh sách đang hiển thị (filter có thể ẩn một số câu khớp)
+        view = self.sm.sentences
+        if not isinstance(view, SentenceView) or view.source is not index.sentences:
+            return
+        current_row = view.row_at(self.sm.current_index) if self.sm.current() is not None else -1
+        if step > 0:
+            start = bisect_right(hits, current_row)
+            order = list(range(start, len(hits))) + list(range(0, start))
+        else:
+            start = bisect_left(hits, current_row) - 1
+            order = list(range(start, -1, -1)) + list(range(len(hits) - 1, start, -1))
+
+        for k in order:
+            row = hits[k]
+            position = view.position_of(row)
+            if position is None:
+                continue
+            self.save_current_sentence()
+            if self.current_file_path:
+                self.save_to_file()
+            self.sm.current_index = position
+            self.update_text_boxes()
+            self.search_status_label.setText(f"{k + 1}/{len(hits)}")
+            return
+        self.show_notification("Các câu khớp đều bị ẩn bởi filter hiện tại")
+
+    def save_search_index(self):
+        """Ghi index (đã sửa trong phiên) cạnh file TXT nếu dữ liệu trong bộ nhớ khớp file trên đĩa"""
+        index = self.search_index
+        path = self.current_file_path
+        if index is None or not index.ready or not index.dirty or not path or not self.sm.is_loaded(path):
+            return
+        try:
+            index.save(index_path_for(path), self.sm.file_signature(path)[1:])
+        except OSError as e:
+            log.warning("Failed to save search index: %s", e)
+
+    def save_to_file(self):
+        """Ghi toàn bộ câu ra file TXT hiện tại, đo độ trễ và số byte đã ghi"""
+        with latency.measure("save_to_txt") as measure:
+            self.sm.save_to_txt(self.current_file_path)
+            measure.add_bytes(self.sm.last_saved_bytes)
+
+    @latency.timed("save_current_sentence")
     def save_current_sentence(self):
         if not hasattr(self, 'field_widgets'):
             return
@@ -630,6 +1196,7 @@ class MainWindow(QMainWindow):
             text = widget.toPlainText().strip().replace("\n", "3==D")  # ✅ Chuyển ngược lại
             sentence.set(field, text)
 
+    @latency.timed("next_sentence")
     def next_sentence(self):
         # Kiểm tra nếu đang ở câu cuối cùng
         if self.sm.current_index == len(self.sm.sentences) - 1:
@@ -639,7 +1206,7 @@ class MainWindow(QMainWindow):
             if current_sentence:
                 current_sentence.mark_as_done()
             if self.current_file_path:
-                self.sm.save_to_txt(self.current_file_path)
+                self.save_to_file()
             
             # Hiển thị thông báo
             reply = QMessageBox.question(
@@ -660,7 +1227,7 @@ class MainWindow(QMainWindow):
             current_sentence.mark_as_done()
         self.sm.next()
         if self.current_file_path:
-            self.sm.save_to_txt(self.current_file_path)
+            self.save_to_file()
         self.update_text_boxes()
 
     def prev_sentence(self):
@@ -671,7 +1238,7 @@ class MainWindow(QMainWindow):
             current_sentence.mark_as_done()
         self.sm.previous()
         if self.current_file_path:
-            self.sm.save_to_txt(self.current_file_path)
+            self.save_to_file()
         self.update_text_boxes()
 
     def save_sentence(self):
@@ -681,16 +1248,21 @@ class MainWindow(QMainWindow):
                 text = widget.toPlainText().strip().replace("\n", "3==D")  # Chuyển \n thành 3==D khi lưu
                 sentence.set(field, text)
 
+    @latency.timed("update_text_boxes")
     def update_text_boxes(self):
-        sentence = self.sm.current()
-        if sentence is None:
-            return
-        for field, widget in self.field_widgets.items():
-            value = sentence.get(field).replace("3==D", "\n")  # Convert 3==D thành xuống dòng khi hiển thị
-            widget.setPlainText(value)
+        with span("render.sentence"):
+            sentence = self.sm.current()
+            if sentence is None:
+                return
+            # Chuỗi hiển thị (3==D → xuống dòng) lấy từ prefetch nếu đã chuẩn bị sẵn
+            display = self.prefetcher.display_values(sentence, self.field_widgets)
+            for field, widget in self.field_widgets.items():
+                widget.setPlainText(display[field])
+            # Chuẩn bị trước các câu lân cận cho lần chuyển câu tiếp theo
+            self.prefetcher.schedule(self.sm.sentences, self.sm.current_index, list(self.field_widgets))
         
-        # Cập nhật STT
-        self.update_stt_display()
+            # Cập nhật STT
+            self.update_stt_display()
 
     def update_header_width(self):
         if hasattr(self, 'header'):
@@ -724,7 +1296,7 @@ class MainWindow(QMainWindow):
                 focus_widget = QApplication.focusWidget()
                 
                 # Nếu đang focus ở ô STT -> Để returnPressed xử lý (jump_to_sentence)
-                if focus_widget == self.stt_input:
+                if focus_widget in (self.stt_input, self.search_input):
                     return False  # Để Qt xử lý signal returnPressed
                 
                 # Nếu checkbox được bật và đang ở tab Trang chính -> Next
@@ -750,7 +1322,7 @@ class MainWindow(QMainWindow):
                     self.apply_text_font()
                     return True
         except Exception as e:
-            print(f"DEBUG: eventFilter error: {e}")
+            log.debug("eventFilter error: %s", e)
         return super().eventFilter(obj, event)
 
     def show_notification(self, message):
@@ -758,8 +1330,30 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'notification'):
             self.notification.show_message(message)
 
+    def toggle_debug_panel(self):
+        if self.debug_panel is None:
+            from debug_panel import DebugPanel
+            self.debug_panel = DebugPanel(self)
+        self.debug_panel.setVisible(not self.debug_panel.isVisible())
+
+    def toggle_latency_panel(self):
+        if self.latency_panel is None:
+            from debug_panel import LatencyPanel
+            self.latency_panel = LatencyPanel(self)
+        self.latency_panel.setVisible(not self.latency_panel.isVisible())
+
     def closeEvent(self, event):
         try:
+            self.prefetcher.shutdown()
+            if self.search_worker is not None and self.search_worker.isRunning():
+                self.search_worker.cancel()
+                self.search_worker.wait()
+            self.save_search_index()
+            eu.flush()  # Ghi config.json đang chờ (request_save)
+            # Huỷ xuất file đang chạy (nếu có) và chờ thread dừng
+            if self.export_worker is not None and self.export_worker.isRunning():
+                self.export_worker.cancel()
+                self.export_worker.wait()
             # Đảm bảo đóng mọi popup/top-level widget còn mở
             try:
                 if hasattr(self, 'tab2') and hasattr(self.tab2, 'popup') and self.tab2.popup is not None:
@@ -782,48 +1376,90 @@ class MainWindow(QMainWindow):
         try:
             self.save_current_sentence()
         except Exception as e:
-            print(f"DEBUG: save_current_sentence error before export: {e}")
+            log.warning("save_current_sentence error before export: %s", e)
+
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.show_notification("Đang xuất file, vui lòng đợi...")
+            return
 
         if not getattr(self.sm, 'fields', []) or not getattr(self.sm, 'sentences', []):
             QMessageBox.warning(self, "Xuất Excel", "Không có dữ liệu để xuất.")
             return
 
-        file_path, _ = QFileDialog.getSaveFileName(self, "Chọn nơi lưu Excel", "", "Excel Files (*.xlsx)")
+        options_dialog = ExportOptionsDialog(self.sm, self)
+        if options_dialog.exec() != QDialog.Accepted:
+            return
+        export_options = options_dialog.options()
+
+        formats = exporters.available_formats()
+        filters = [exporters.file_filter(fmt) for fmt in formats]
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Chọn nơi lưu file", "", ";;".join(filters))
         if not file_path:
             return
 
-        # Đảm bảo đuôi .xlsx
-        if not file_path.lower().endswith('.xlsx'):
-            file_path += '.xlsx'
-
-        # Chuẩn bị dữ liệu theo đúng thứ tự cột như file đầu vào
-        columns = [col.replace("3==D", "\n") for col in self.sm.fields]
-        rows = []
-        for sentence in self.sm.sentences:
-            row = []
-            for field in self.sm.fields:
-                value = sentence.get(field)
-                row.append(value.replace("3==D", "\n") if isinstance(value, str) else value)
-            rows.append(row)
-
-        # Ghi Excel bằng pandas; nếu thiếu thư viện thì báo lỗi rõ ràng
+        # Định dạng theo đuôi file; nếu không có đuôi hợp lệ thì theo bộ lọc đã chọn
+        fmt = exporters.format_from_path(file_path)
+        if fmt is None:
+            fmt = formats[filters.index(selected_filter)] if selected_filter in filters else "xlsx"
+            file_path += "." + fmt
+
+        # Import thư viện ở UI thread (import module nặng trong QThread không an toàn với PySide6)
         try:
-            import pandas as pd
-            import numpy as np  # An toàn cho dữ liệu trống
-            df = pd.DataFrame(rows, columns=columns)
-            # Tránh NaN hiển thị lạ trong Excel
-            df = df.replace({np.nan: ""})
-            df.to_excel(file_path, index=False)
-            self.show_notification("Xuất Excel thành công!")
-        except ImportError:
-            QMessageBox.critical(self, "Thiếu thư viện", "Thiếu pandas để xuất Excel. Vui lòng cài đặt:\n\npy -m pip install pandas openpyxl")
-        except Exception as e:
-            QMessageBox.critical(self, "Lỗi", f"Không thể xuất Excel:\n{e}")
+            exporters.ensure_format(fmt)
+        except (ImportError, ValueError) as e:
+            QMessageBox.critical(self, "Thiếu thư viện", str(e))
+            return
+
+        # Xuất trong thread riêng: stream từng dòng từ SentenceManager ra file
+        # Excel giữ nguyên cột như file đầu vào; các định dạng phân tích có thêm cột Status
+        self.save_btn.setEnabled(False)
+        self.save_btn.setText("Đang xuất...")
+        self.cancel_export_btn.show()
+        self.export_worker = ExportWorker(self.sm, file_path, fmt, include_status=fmt != "xlsx", **export_options)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.finished.connect(self.on_export_success)
+        self.export_worker.error.connect(self.on_export_error)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+        self.export_worker.start()
+
+    def cancel_export(self):
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.export_worker.cancel()
+            self.cancel_export_btn.setEnabled(False)
+
+    def on_export_progress(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        self.save_btn.setText(f"Đang xuất {percent}%")
+
+    def on_export_success(self, file_path):
+        self.restore_export_button()
+        self.show_notification(f"Xuất file thành công! {os.path.basename(file_path)}")
+
+    def on_export_error(self, error_message):
+        self.restore_export_button()
+        QMessageBox.critical(self, "Lỗi", f"Không thể xuất file:\n{error_message}")
+
+    def on_export_cancelled(self):
+        self.restore_export_button()
+        self.show_notification("Đã huỷ xuất file")
+
+    def restore_export_button(self):
+        """Khôi phục trạng thái nút Xuất Excel"""
+        self.save_btn.setEnabled(True)
+        self.save_btn.setText("Xuất Excel")
+        self.cancel_export_btn.setEnabled(True)
+        self.cancel_export_btn.hide()
 
 if __name__ == "__main__":
     import sys
+    configure_from_env()
     app = QApplication(sys.argv)
+    startup.mark("qapplication")
     window = MainWindow()
+    startup.mark("main_window")
     window.resize(1000, 700)
     window.show()
+    startup.mark("shown")
+    # Timer đặt sau restore_saved_layout (chế độ lazy) nên chạy sau nó; chế độ eager đã dựng xong trong __init__
+    QTimer.singleShot(0, window.finish_startup)
     sys.exit(app.exec())
\ No newline at end of file
@@ -50,45 +50,207 @@ def clean_build_folders():
         except Exception as e:
             print(f"  ⚠ Không thể xóa {spec_file}: {e}")
 
-def build_exe():
-    """Build file exe bằng PyInstaller"""
-    print("\n🔨 Đang build file EXE...")
-    print("=" * 60)
-    
-    # Các tham số cho PyInstaller
+# Các module PySide6 app không dùng: loại khỏi bản build "fast" để giảm dung lượng và số DLL phải nạp
+UNUSED_PYSIDE6_MODULES = [
+    'Qt3DAnimation', 'Qt3DCore', 'Qt3DExtras', 'Qt3DInput', 'Qt3DLogic', 'Qt3DRender',
+    'QtBluetooth', 'QtCharts', 'QtConcurrent', 'QtDataVisualization', 'QtDesigner', 'QtGraphs',
+    'QtHelp', 'QtHttpServer', 'QtLocation', 'QtMultimedia', 'QtMultimediaWidgets', 'QtNetworkAuth',
+    'QtNfc', 'QtOpenGL', 'QtOpenGLWidgets', 'QtPdf', 'QtPdfWidgets', 'QtPositioning', 'QtQml',
+    'QtQuick', 'QtQuick3D', 'QtQuickControls2', 'QtQuickWidgets', 'QtRemoteObjects', 'QtScxml',
+    'QtSensors', 'QtSerialBus', 'QtSerialPort', 'QtSpatialAudio', 'QtSql', 'QtStateMachine',
+    'QtSvgWidgets', 'QtTest', 'QtTextToSpeech', 'QtUiTools', 'QtWebChannel', 'QtWebEngineCore',
+    'QtWebEngineQuick', 'QtWebEngineWidgets', 'QtWebSockets', 'QtWebView', 'QtXml',
+]
+# Thư mục plugin Qt được giữ lại (platforms: windows/xcb/wayland + offscreen/minimal để đo không cần màn hình)
+KEEP_QT_PLUGINS = {'platforms', 'platformthemes', 'platforminputcontexts', 'styles', 'imageformats', 'iconengines',
+                   'wayland-decoration-client', 'wayland-graphics-integration-client', 'wayland-shell-integration',
+                   'xcbglintegrations'}
+KEEP_IMAGE_FORMATS = ('qico', 'qsvg')  # Chỉ icon cửa sổ
+
+PROFILES = {
+    'default': "onefile + UPX (1 file exe duy nhất, mở chậm hơn)",
+    'fast': "onedir, bytecode tối ưu (-OO), không UPX, bỏ module/plugin Qt không dùng (mở nhanh)",
+}
+
+
+def pyinstaller_version():
+    try:
+        import PyInstaller
+        return tuple(int(part) for part in PyInstaller.__version__.split('.')[:2] if part.isdigit())
+    except (ImportError, ValueError):
+        return (0, 0)
+
+
+def build_args(profile):
+    """Tham số dòng lệnh PyInstaller cho từng profile"""
     # Sử dụng sys.executable để đảm bảo dùng đúng Python
-    pyinstaller_args = [
-        sys.executable,                # Python executable
+    python = [sys.executable]
+    args = [
         '-m', 'PyInstaller',           # Chạy PyInstaller như một module
         '--name=MagicTool',            # Tên file exe
-        '--onefile',                   # Build thành 1 file duy nhất
         '--windowed',                  # Không hiện console (GUI app)
         '--clean',                     # Làm sạch cache trước khi build
         '--noconfirm',                 # Không hỏi xác nhận ghi đè
-        # Thêm file dữ liệu nếu có
-        '--add-data=Book1.txt;.',      # Thêm Book1.txt vào exe
-        # Đảm bảo các module được import
-        '--hidden-import=PySide6.QtCore',
-        '--hidden-import=PySide6.QtWidgets',
-        '--hidden-import=PySide6.QtGui',
-        '--hidden-import=openpyxl',
-        '--hidden-import=pandas',
-        '--hidden-import=numpy',
-        '--hidden-import=back_end',
-        '--hidden-import=drawing_tab',
-        '--hidden-import=grid_canvas',
-        '--hidden-import=sentence_manager',
-        # Loại bỏ các module không cần thiết để giảm dung lượng
-        '--exclude-module=matplotlib',
-        '--exclude-module=scipy',
-        '--exclude-module=PIL',
-        '--exclude-module=tkinter',
-        'main.py'                      # File chính
     ]
+    # Thêm file dữ liệu nếu có
+    if os.path.exists('Book1.txt'):
+        args.append(f'--add-data={os.path.abspath("Book1.txt")}{os.pathsep}.')
+    # Đảm bảo các module được import (drawing_tab được import muộn khi mở tab Vẽ vùng)
+    for module in ['PySide6.QtCore', 'PySide6.QtWidgets', 'PySide6.QtGui', 'openpyxl', 'pandas', 'numpy',
+                   'back_end', 'drawing_tab', 'grid_canvas', 'sentence_manager', 'debug_panel', 'http_client', 'field_list_model', 'text_search',
+                   'sentence_filter', 'atomic_io', 'requests']:
+        args.append(f'--hidden-import={module}')
+    # Loại bỏ các module không cần thiết để giảm dung lượng
+    for module in ['matplotlib', 'scipy', 'PIL', 'tkinter']:
+        args.append(f'--exclude-module={module}')
+
+    if profile == 'fast':
+        args += [
+            '--onedir',                        # Không phải giải nén toàn bộ bundle ra thư mục tạm mỗi lần mở
+            '--noupx',                         # Không tốn thời gian giải nén UPX khi nạp DLL
+            '--specpath=build/spec-fast',      # Không ghi đè MagicTool.spec của bản mặc định
+        ]
+        if pyinstaller_version() >= (6, 6):
+            args.append('--optimize=2')        # Bytecode biên dịch sẵn với -OO
+        else:
+            python.append('-OO')               # PyInstaller cũ: tối ưu theo interpreter chạy build
+        for module in UNUSED_PYSIDE6_MODULES:
+            args.append(f'--exclude-module=PySide6.{module}')
+        for module in ['IPython', 'pytest', 'notebook', 'jupyter']:
+            args.append(f'--exclude-module={module}')
+    else:
+        args.append('--onefile')               # Build thành 1 file duy nhất
+
+    args.append(os.path.abspath('main.py'))   # File chính
+    return python + args
+
+
+def executable_path(profile):
+    name = 'MagicTool.exe' if os.name == 'nt' else 'MagicTool'
+    if profile == 'fast':
+        return os.path.abspath(os.path.join('dist', 'MagicTool', name))
+    return os.path.abspath(os.path.join('dist', name))
+
+
+def trim_qt_plugins(dist_dir):
+    """Xoá plugin/bản dịch Qt không dùng trong bản onedir, trả về số MB đã giải phóng"""
+    freed = 0
+    for root, dirs, _ in os.walk(dist_dir):
+        if os.path.basename(root) != 'PySide6':
+            continue
+        targets = []
+        plugins_dir = os.path.join(root, 'plugins')
+        if os.path.isdir(plugins_dir):
+            for name in os.listdir(plugins_dir):
+                path = os.path.join(plugins_dir, name)
+                if name not in KEEP_QT_PLUGINS:
+                    targets.append(path)
+                elif name == 'imageformats':
+                    targets += [os.path.join(path, f) for f in os.listdir(path)
+                                if not os.path.splitext(f)[0].lstrip('lib').startswith(KEEP_IMAGE_FORMATS)]
+        # App không cài QTranslator nên không cần bản dịch của Qt
+        if os.path.isdir(os.path.join(root, 'translations')):
+            targets.append(os.path.join(root, 'translations'))
+        for path in targets:
+            freed += folder_size(path)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        dirs[:] = []
+    return freed / (1024 * 1024)
+
+
+def folder_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+def measure_launch(command, runs=3, timeout=120):
+    """
+    Mở app với MAGICTOOL_EXIT_AFTER_STARTUP=1 (app tự thoát khi khởi động xong) và đo thời gian.
+    Trả về list {'wall_ms', 'ready_ms'}: wall_ms tính từ lúc chạy process đến khi thoát,
+    ready_ms là mốc "ready" do app tự báo (MAGICTOOL_STARTUP_REPORT).
+    """
+    import json
+    import tempfile
+    import time
+
+    results = []
+    for _ in range(runs):
+        fd, report_path = tempfile.mkstemp(suffix='.json', prefix='magictool-startup-')
+        os.close(fd)
+        env = dict(os.environ, MAGICTOOL_EXIT_AFTER_STARTUP='1', MAGICTOOL_STARTUP_REPORT=report_path)
+        try:
+            start = time.perf_counter()
+            subprocess.run(command, env=env, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            wall_ms = (time.perf_counter() - start) * 1000
+            ready_ms = None
+            try:
+                with open(report_path, 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+                ready_ms = report['total_s'] * 1000 if report.get('total_s') is not None else None
+            except (OSError, ValueError):
+                pass
+            results.append({'wall_ms': round(wall_ms, 1), 'ready_ms': round(ready_ms, 1) if ready_ms else None})
+        except subprocess.TimeoutExpired:
+            print(f"  ⚠ App không tự thoát sau {timeout}s")
+            results.append({'wall_ms': None, 'ready_ms': None})
+        finally:
+            try:
+                os.remove(report_path)
+            except OSError:
+                pass
+    return results
+
+
+def report_launch(command, runs, max_ms=None, output=None):
+    """In thời gian mở app (lần đầu + median các lần sau); trả về False nếu vượt max_ms"""
+    import json
+    import statistics
+
+    print(f"\n⏱  Đo thời gian mở app ({runs} lần): {' '.join(command)}")
+    results = measure_launch(command, runs)
+    for i, result in enumerate(results, 1):
+        print(f"  Lần {i}: {result['wall_ms']} ms (app sẵn sàng sau {result['ready_ms']} ms)")
+    walls = [r['wall_ms'] for r in results if r['wall_ms'] is not None]
+    if not walls:
+        print("  ⚠ Không đo được thời gian mở app")
+        return False
+    warm = walls[1:] or walls
+    median_ms = statistics.median(warm)
+    print(f"  → Lần đầu: {walls[0]:.0f} ms, median các lần sau: {median_ms:.0f} ms")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'command': command, 'runs': results, 'first_ms': walls[0], 'median_ms': median_ms}, f, indent=2)
+    if max_ms is not None and median_ms > max_ms:
+        print(f"  ❌ Thời gian mở app {median_ms:.0f} ms vượt ngưỡng {max_ms:.0f} ms")
+        return False
+    return True
+
+
+def build_exe(profile='default'):
+    """Build file exe bằng PyInstaller"""
+    print(f"\n🔨 Đang build file EXE (profile: {profile} - {PROFILES[profile]})...")
+    print("=" * 60)
+    
+    pyinstaller_args = build_args(profile)
     
     try:
         # Hiển thị lệnh đang chạy
-        print(f"Lệnh: python -m PyInstaller --name=MagicTool --onefile --windowed ...\n")
+        mode = '--onedir' if profile == 'fast' else '--onefile'
+        print(f"Lệnh: python -m PyInstaller --name=MagicTool {mode} --windowed ...\n")
         
         # Chạy PyInstaller
         result = subprocess.run(
@@ -111,9 +273,16 @@ def build_exe():
             print("\n✅ BUILD THÀNH CÔNG!")
             
             # Kiểm tra file exe có tồn tại không
-            exe_path = os.path.abspath('dist/MagicTool.exe')
+            exe_path = executable_path(profile)
             if os.path.exists(exe_path):
-                file_size = os.path.getsize(exe_path) / (1024 * 1024)  # MB
+                if profile == 'fast':
+                    dist_dir = os.path.dirname(exe_path)
+                    freed = trim_qt_plugins(dist_dir)
+                    print(f"\n✂ Đã bỏ plugin/bản dịch Qt không dùng: {freed:.1f} MB")
+                    file_size = folder_size(dist_dir) / (1024 * 1024)  # MB
+                    print(f"\n📁 Thư mục app: {dist_dir}")
+                else:
+                    file_size = os.path.getsize(exe_path) / (1024 * 1024)  # MB
                 print(f"\n📁 File exe: {exe_path}")
                 print(f"📊 Dung lượng: {file_size:.2f} MB")
                 print("\n🎉 Bạn có thể chạy file exe từ thư mục 'dist'")
@@ -136,8 +305,38 @@ def build_exe():
         traceback.print_exc()
         return False
 
-def main():
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Build MagicTool bằng PyInstaller")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=None,
+                        help="default: onefile + UPX; fast: onedir tối ưu, mở nhanh")
+    parser.add_argument('-y', '--yes', action='store_true', help="Không hỏi (cài PyInstaller, giữ file build cũ)")
+    parser.add_argument('--clean', action='store_true', help="Xóa build/dist cũ trước khi build")
+    parser.add_argument('--measure', type=int, default=3, metavar='N', help="Số lần mở app để đo sau khi build")
+    parser.add_argument('--no-measure', action='store_true', help="Bỏ qua bước đo thời gian mở app")
+    parser.add_argument('--measure-only', action='store_true',
+                        help="Chỉ đo thời gian mở bản đã build (hoặc python main.py nếu chưa build)")
+    parser.add_argument('--max-launch-ms', type=float, default=None,
+                        help="Báo lỗi (exit code 1) nếu median thời gian mở app vượt ngưỡng này")
+    return parser.parse_args(argv)
+
+
+def launch_command(profile):
+    exe_path = executable_path(profile)
+    if os.path.exists(exe_path):
+        return [exe_path]
+    return [sys.executable, os.path.abspath('main.py')]
+
+
+def main(argv=None):
     """Hàm chính"""
+    args = parse_args(argv)
+    interactive = not args.yes and sys.stdin.isatty()
+
+    def pause():
+        if interactive:
+            input("\nNhấn Enter để thoát...")
+
     print("=" * 60)
     print("🚀 MAGIC TOOL - AUTO BUILD EXE")
     print("=" * 60)
@@ -146,30 +345,55 @@ def main():
     if not os.path.exists('main.py'):
         print("\n❌ Không tìm thấy file main.py!")
         print("Vui lòng chạy script này trong thư mục chứa main.py")
-        input("\nNhấn Enter để thoát...")
-        return
+        pause()
+        return 1
+
+    profile = args.profile
+    if profile is None:
+        profile = 'default'
+        if interactive:
+            print("\nChọn kiểu build:")
+            for i, (name, description) in enumerate(PROFILES.items(), 1):
+                print(f"  {i}. {name}: {description}")
+            response = input("Nhập 1 hoặc 2 (mặc định 1): ").strip()
+            if response in ('2', 'fast'):
+                profile = 'fast'
+
+    if args.measure_only:
+        ok = report_launch(launch_command(profile), max(1, args.measure), args.max_launch_ms,
+                           os.path.join('dist', 'launch_times.json') if os.path.isdir('dist') else None)
+        return 0 if ok else 1
     
     # Kiểm tra và cài đặt PyInstaller nếu cần
     if not check_pyinstaller():
-        response = input("\nBạn có muốn cài đặt PyInstaller không? (y/n): ")
+        response = input("\nBạn có muốn cài đặt PyInstaller không? (y/n): ") if interactive else 'y'
         if response.lower() in ['y', 'yes', 'có', '']:
             if not install_pyinstaller():
                 print("\n❌ Không thể tiếp tục build mà không có PyInstaller")
-                input("\nNhấn Enter để thoát...")
-                return
+                pause()
+                return 1
         else:
             print("\n❌ Cần PyInstaller để build exe")
-            input("\nNhấn Enter để thoát...")
-            return
+            pause()
+            return 1
     
     # Hỏi có muốn dọn dẹp không
-    response = input("\nBạn có muốn xóa các file build cũ không? (y/n): ")
-    if response.lower() in ['y', 'yes', 'có', '']:
+    if args.clean:
         clean_build_folders()
+    elif interactive:
+        response = input("\nBạn có muốn xóa các file build cũ không? (y/n): ")
+        if response.lower() in ['y', 'yes', 'có', '']:
+            clean_build_folders()
     
     # Build exe
     print("\n⏳ Quá trình build có thể mất vài phút, vui lòng đợi...")
-    success = build_exe()
+    success = build_exe(profile)
+
+    if success and not args.no_measure and args.measure > 0:
+        exe_path = executable_path(profile)
+        if os.path.exists(exe_path):
+            success = report_launch([exe_path], args.measure, args.max_launch_ms,
+                                    os.path.join('dist', 'launch_times.json'))
     
     if success:
         print("\n" + "=" * 60)
@@ -180,7 +404,8 @@ def main():
         print("⚠ Build không thành công. Vui lòng kiểm tra lỗi ở trên.")
         print("=" * 60)
     
-    input("\nNhấn Enter để thoát...")
+    pause()
+    return 0 if success else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
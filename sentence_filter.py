@@ -0,0 +1,221 @@
+"""
+Bộ lọc câu theo điều kiện tuỳ ý (trạng thái, trường trống / chứa từ khoá, sửa trong hôm nay).
+
+RowFilter là danh sách Condition (hashable, dùng làm khoá cache). compile_filter() dựng sẵn một
+predicate cho cả bộ lọc; filter_rows() duyệt dữ liệu gốc đúng một lần và trả về mảng chỉ số dòng
+(array 'I') thay vì copy danh sách Sentence. SentenceView bọc (dữ liệu gốc, mảng dòng) thành một
+sequence chỉ đọc để dùng thay cho list SentenceManager.sentences.
+"""
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from collections.abc import Sequence
+from itertools import compress
+
+from instrumentation import get_logger, span
+from text_search import NEWLINE_MARK, fold
+
+log = get_logger(__name__)
+
+STATUS = "status"              # value: "Done" / "Not Done"
+EMPTY = "empty"                # field trống (chỉ có khoảng trắng / 3==D cũng tính là trống)
+NOT_EMPTY = "not_empty"
+CONTAINS = "contains"          # value: từ khoá, không phân biệt hoa/thường và dấu; field=None: mọi trường
+NOT_CONTAINS = "not_contains"
+EDITED_TODAY = "edited_today"  # Sentence.edited_at từ 0h hôm nay (chỉ trong phiên làm việc)
+
+# Điều kiện rẻ được kiểm tra trước, so khớp chuỗi sau cùng
+_COST = {STATUS: 0, EDITED_TODAY: 0, EMPTY: 1, NOT_EMPTY: 1, CONTAINS: 2, NOT_CONTAINS: 2}
+
+FILTER_CACHE_SIZE = 8
+
+
+class Condition(namedtuple("Condition", "kind field value")):
+    __slots__ = ()
+
+    def __new__(cls, kind, field=None, value=None):
+        if kind not in _COST:
+            raise ValueError(f"Điều kiện lọc không hợp lệ: {kind}")
+        return super().__new__(cls, kind, field, value)
+
+    def describe(self):
+        name = (self.field or "mọi trường").replace(NEWLINE_MARK, " ").strip()
+        if self.kind == STATUS:
+            return self.value
+        if self.kind == EDITED_TODAY:
+            return "sửa hôm nay"
+        if self.kind == EMPTY:
+            return f"{name} trống"
+        if self.kind == NOT_EMPTY:
+            return f"{name} không trống"
+        if self.kind == CONTAINS:
+            return f"{name} chứa '{self.value}'"
+        return f"{name} không chứa '{self.value}'"
+
+
+class RowFilter(namedtuple("RowFilter", "conditions")):
+    """Câu khớp khi thoả mọi điều kiện"""
+    __slots__ = ()
+
+    def __new__(cls, conditions=()):
+        return super().__new__(cls, tuple(conditions))
+
+    def uses_date(self):
+        return any(condition.kind == EDITED_TODAY for condition in self.conditions)
+
+    def describe(self):
+        return " và ".join(condition.describe() for condition in self.conditions) or "All"
+
+    def __str__(self):
+        return self.describe()
+
+
+# Ba filter có sẵn trên giao diện; "All" = không lọc
+STATUS_FILTERS = {
+    "All": None,
+    "Done": RowFilter([Condition(STATUS, value="Done")]),
+    "Not Done": RowFilter([Condition(STATUS, value="Not Done")]),
+}
+
+
+def as_row_filter(filter_type):
+    """"All"/"Done"/"Not Done" hoặc RowFilter → RowFilter (None = không lọc)"""
+    if filter_type is None or isinstance(filter_type, RowFilter):
+        return filter_type or None
+    try:
+        return STATUS_FILTERS[filter_type]
+    except KeyError:
+        raise ValueError(f"Filter không hợp lệ: {filter_type}") from None
+
+
+def start_of_today():
+    now = time.localtime()
+    return time.mktime((now.tm_year, now.tm_mon, now.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+def _is_empty(value):
+    return not value or not value.replace(NEWLINE_MARK, "").strip()
+
+
+def _compile_condition(condition, fields):
+    kind, field, value = condition
+    if field is not None and fields and field not in fields:
+        raise ValueError(f"Không có trường: {field}")
+    if kind == STATUS:
+        return lambda sentence: sentence.status == value
+    if kind == EDITED_TODAY:
+        since = start_of_today()
+        return lambda sentence: sentence.edited_at is not None and sentence.edited_at >= since
+
+    if kind in (EMPTY, NOT_EMPTY):
+        if field is None:
+            raise ValueError("Điều kiện trống/không trống cần chọn trường")
+        if kind == EMPTY:
+            return lambda sentence: _is_empty(sentence.fields.get(field))
+        return lambda sentence: not _is_empty(sentence.fields.get(field))
+
+    needle = fold(value or "").strip()
+    if not needle:
+        raise ValueError("Điều kiện chứa/không chứa cần từ khoá")
+    if field is None:
+        def contains(sentence):
+            return any(needle in fold(text) for text in sentence.fields.values() if text)
+    else:
+        def contains(sentence):
+            text = sentence.fields.get(field)
+            return bool(text) and needle in fold(text)
+    if kind == CONTAINS:
+        return contains
+    return lambda sentence: not contains(sentence)
+
+
+def compile_filter(row_filter, fields=()):
+    """Predicate(sentence) -> bool cho cả bộ lọc; None nếu không có điều kiện nào"""
+    row_filter = as_row_filter(row_filter)
+    if row_filter is None or not row_filter.conditions:
+        return None
+    conditions = sorted(row_filter.conditions, key=lambda condition: _COST[condition.kind])
+    predicates = [_compile_condition(condition, fields) for condition in conditions]
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda sentence: all(predicate(sentence) for predicate in predicates)
+
+
+def filter_rows(sentences, row_filter, fields=()):
+    """Chỉ số (tăng dần) các câu khớp bộ lọc, duyệt sentences một lần"""
+    predicate = compile_filter(row_filter, fields)
+    if predicate is None:
+        return array("I", range(len(sentences)))
+    with span("filter", rows=len(sentences)) as filter_span:
+        rows = array("I", compress(range(len(sentences)), map(predicate, sentences)))
+        filter_span.set(matched=len(rows))
+    return rows
+
+
+class FilterCache:
+    """LRU: (bộ lọc, phiên bản dữ liệu) → mảng dòng; đổi dữ liệu thì khoá cũ tự hết hiệu lực"""
+
+    def __init__(self, max_entries=FILTER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        rows = self._entries.get(key)
+        if rows is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return rows
+
+    def put(self, key, rows):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = rows
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SentenceView(Sequence):
+    """
+    Danh sách câu đang hiển thị: tham chiếu tới dữ liệu gốc + mảng chỉ số dòng (None = tất cả).
+    Không copy Sentence; vị trí trong view ↔ dòng trong dữ liệu gốc tra bằng row_at / position_of.
+    """
+
+    def __init__(self, source, rows=None):
+        self.source = source
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.source) if self.rows is None else len(self.rows)
+
+    def __getitem__(self, position):
+        if self.rows is None:
+            return self.source[position]
+        if isinstance(position, slice):
+            source = self.source
+            return [source[row] for row in self.rows[position]]
+        return self.source[self.rows[position]]
+
+    def __iter__(self):
+        if self.rows is None:
+            return iter(self.source)
+        return map(self.source.__getitem__, self.rows)
+
+    def row_at(self, position):
+        """Dòng trong dữ liệu gốc của câu ở vị trí position"""
+        return position if self.rows is None else self.rows[position]
+
+    def position_of(self, row):
+        """Vị trí trong view của dòng gốc row, None nếu dòng đó bị lọc ra"""
+        if self.rows is None:
+            return row if 0 <= row < len(self.source) else None
+        i = bisect_left(self.rows, row)
+        return i if i < len(self.rows) and self.rows[i] == row else None
@@ -1,5 +1,21 @@
+import os
+import time
+from datetime import date
+
+from atomic_io import atomic_write
+from instrumentation import get_logger, span
+from sentence_filter import FilterCache, RowFilter, SentenceView, as_row_filter, compile_filter, filter_rows
+
+log = get_logger(__name__)
+
+TXT_BACKUPS = 1  # Số bản TXT cũ giữ lại khi lưu (<file>.bak1, ...)
+
 
 class Sentence:
+    listener = None  # Hàm (sentence, field, giá trị cũ, giá trị mới) gọi khi nội dung đổi (index tìm kiếm)
+    edited_at = None  # time.time() lần sửa nội dung/trạng thái gần nhất trong phiên (không lưu vào TXT)
+    revision = 0      # Đếm chung mọi lần sửa của mọi câu (khoá cache filter)
+
     def __init__(self, field_names: list[str], values: list[str], status: str = "Not Done"):
         self.fields = dict(zip(field_names, values))
         self.status = status  # "Not Done" hoặc "Done"
@@ -8,14 +24,27 @@ class Sentence:
         return self.fields.get(field, "")
 
     def set(self, field: str, value: str):
+        old = self.fields.get(field)
         self.fields[field] = value
+        if old != value:
+            self._touch()
+            if self.listener is not None:
+                self.listener(self, field, old, value)
+
+    def _touch(self):
+        self.edited_at = time.time()
+        Sentence.revision += 1
     
     def mark_as_done(self):
         """Đánh dấu câu này là Done"""
+        if self.status != "Done":
+            self._touch()
         self.status = "Done"
     
     def mark_as_not_done(self):
         """Đánh dấu câu này là Not Done"""
+        if self.status != "Not Done":
+            self._touch()
         self.status = "Not Done"
 
     def to_list(self) -> list[str]:
@@ -26,18 +55,40 @@ class SentenceManager:
         self.fields: list[str] = []
         self.current_index: int = 0
         self.all_sentences: list[Sentence] = []  # Lưu tất cả câu ban đầu
-        self.current_filter: str = "All"  # Filter hiện tại: "All", "Done", "Not Done"
+        self.current_filter = "All"  # Filter hiện tại: "All", "Done", "Not Done" hoặc RowFilter
+        self.data_version = 0  # Tăng mỗi lần load dữ liệu mới (khoá cache filter)
+        self.filter_cache = FilterCache()
+        self._loaded_signature = None  # (path, mtime, size) của file khớp với dữ liệu trong bộ nhớ
+        self.last_saved_bytes = 0  # Số byte của lần save_to_txt gần nhất
+
+    @staticmethod
+    def file_signature(file_path: str):
+        """Trả về (đường dẫn tuyệt đối, mtime_ns, size) của file, None nếu không đọc được"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
 
-    def load_from_txt(self, file_path: str):
+    def is_loaded(self, file_path: str) -> bool:
+        """True nếu dữ liệu trong bộ nhớ đang khớp với file trên đĩa"""
+        signature = self.file_signature(file_path)
+        return signature is not None and signature == self._loaded_signature
+
+    def load_from_txt(self, file_path: str, force: bool = False):
         self._last_loaded_path = file_path  # Lưu đường dẫn để sử dụng khi save
-        print(f"DEBUG: Loading from {file_path}")
-        with open(file_path, "r", encoding="utf-8") as f:
+        signature = self.file_signature(file_path)
+        if not force and signature is not None and signature == self._loaded_signature:
+            # File không đổi kể từ lần load/save cuối → không cần parse lại
+            log.debug("%s unchanged, skip reload", file_path)
+            return
+        log.debug("Loading from %s", file_path)
+        with span("load", path=file_path) as load_span, open(file_path, "r", encoding="utf-8") as f:
             # Không dùng strip() để không mất tab ở cuối (bảo toàn số cột)
             raw_lines = f.readlines()
             lines = [line.rstrip("\n\r") for line in raw_lines]
-            print(f"DEBUG: Total lines read: {len(lines)}")
             if len(lines) < 2:
-                print("DEBUG: Not enough lines, clearing data")
+                log.debug("Not enough lines in %s, clearing data", file_path)
                 self.fields = []
                 self.sentences = []
                 self.current_index = 0
@@ -66,12 +117,44 @@ class SentenceManager:
                 self.sentences.append(Sentence(self.fields, values, status))
 
             self.current_index = int(lines[0]) if lines[0].isdigit() else 0  # ✅ đọc index từ dòng 1
-            print(f"DEBUG: Loaded {len(self.sentences)} sentences, fields={len(self.fields)}, current_index={self.current_index}")
-            print(f"DEBUG: Fields: {self.fields}")
-            
-            # Lưu bản sao tất cả câu để dùng cho filter
-            self.all_sentences = self.sentences.copy()
+            load_span.set(rows=len(self.sentences), fields=len(self.fields))
+            log.debug("Loaded %d sentences, fields=%d, current_index=%d",
+                      len(self.sentences), len(self.fields), self.current_index)
+
+            # all_sentences là dữ liệu gốc; sentences là view (đã filter) trên đó
+            self.all_sentences = self.sentences
+            self.sentences = SentenceView(self.all_sentences)
+            self.current_filter = "All"
+            self.data_version += 1
+        self._loaded_signature = signature
+
+    def load_from_rows(self, fields: list[str], rows: list[list[str]], file_path: str = None,
+                       statuses: list[str] = None, current_index: int = 0):
+        """
+        Dựng dữ liệu trực tiếp từ các dòng đã có trong bộ nhớ (vd. vừa ghi ra TXT khi import),
+        không đọc lại file. file_path: file tương ứng, để save_to_txt()/is_loaded() dùng như sau load_from_txt.
+        """
+        with span("load", source="rows") as load_span:
+            self.fields = list(fields)
+            field_count = len(self.fields)
+            self.sentences = []
+            for i, values in enumerate(rows):
+                if len(values) != field_count:
+                    values = (list(values) + [""] * field_count)[:field_count]
+                status = statuses[i] if statuses is not None else "Not Done"
+                self.sentences.append(Sentence(self.fields, values, status))
+            self.current_index = current_index if 0 <= current_index < max(1, len(self.sentences)) else 0
+            self.all_sentences = self.sentences
+            self.sentences = SentenceView(self.all_sentences)
             self.current_filter = "All"
+            self.data_version += 1
+            load_span.set(rows=len(self.sentences), fields=field_count)
+        if file_path is not None:
+            self._last_loaded_path = file_path
+            self._loaded_signature = self.file_signature(file_path)
+        else:
+            self._loaded_signature = None
+        log.debug("Built %d sentences from rows, fields=%d", len(self.sentences), len(self.fields))
 
     def save_to_txt(self, file_path: str = None):
         if file_path is None:
@@ -80,72 +163,143 @@ class SentenceManager:
                 raise ValueError("Không có đường dẫn file để lưu. Vui lòng cung cấp file_path hoặc load file trước.")
             file_path = self._last_loaded_path
             
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(f"{self.current_index}\n")  # Dòng đầu là index
-            f.write("\t".join(self.fields) + "\n")  # Dòng 2 là fields
-            
-            # Lưu tất cả câu từ all_sentences (không chỉ sentences đã filter)
-            sentences_to_save = self.all_sentences if self.all_sentences else self.sentences
-            
-            for sentence in sentences_to_save:
-                row = []
-                for field in self.fields:
-                    # Không strip để giữ nguyên khoảng trắng người dùng nhập
-                    # Khi ghi TXT: thay \n -> 3==D, và thay tab -> dấu cách để không vỡ cột TSV
-                    value = sentence.get(field)
-                    if isinstance(value, str):
-                        value = value.replace("\n", "3==D").replace("\t", " ")
-                    row.append(value)
-                # Thêm status vào cột cuối cùng
-                row.append(sentence.status)
-                f.write("\t".join(row) + "\n")
+        # Ghi file tạm rồi đổi tên: crash giữa chừng không làm cụt file đang có
+        with span("save", path=file_path) as save_span, \
+                atomic_write(file_path, backups=TXT_BACKUPS) as f:
+            f.writelines(self.iter_txt_lines())
+            save_span.set(rows=len(self.all_sentences or self.sentences))
+        # Dữ liệu trong bộ nhớ giờ khớp với file vừa ghi
+        self._loaded_signature = self.file_signature(file_path)
+        self.last_saved_bytes = self._loaded_signature[2] if self._loaded_signature else 0
+
+    def iter_txt_lines(self):
+        """Các dòng của file TXT (có \\n): index, fields, rồi từng câu + status"""
+        yield f"{self.current_index}\n"  # Dòng đầu là index
+        yield "\t".join(self.fields) + "\n"  # Dòng 2 là fields
+
+        # Lưu tất cả câu từ all_sentences (không chỉ sentences đã filter)
+        sentences_to_save = self.all_sentences if self.all_sentences else self.sentences
+
+        for sentence in sentences_to_save:
+            row = []
+            for field in self.fields:
+                # Không strip để giữ nguyên khoảng trắng người dùng nhập
+                # Khi ghi TXT: thay \n -> 3==D, và thay tab -> dấu cách để không vỡ cột TSV
+                value = sentence.get(field)
+                if isinstance(value, str):
+                    value = value.replace("\n", "3==D").replace("\t", " ")
+                row.append(value)
+            # Thêm status vào cột cuối cùng
+            row.append(sentence.status)
+            yield "\t".join(row) + "\n"
+
+    def iter_sentences(self, status=None, start: int = None, stop: int = None, source=None):
+        """
+        Duyệt câu trực tiếp trên dữ liệu gốc, không tạo danh sách trung gian
+        status: None (tất cả), "Done"/"Not Done", tập các trạng thái, RowFilter hoặc hàm predicate(sentence) -> bool
+        start/stop: khoảng dòng [start, stop) tính từ 0 theo thứ tự trong source
+        source: mặc định all_sentences (toàn bộ dữ liệu, không phụ thuộc filter đang áp dụng)
+        """
+        if source is None:
+            source = self.all_sentences or self.sentences
+        if status is None or callable(status):
+            predicate = status
+        elif isinstance(status, RowFilter):
+            predicate = compile_filter(status, self.fields)
+        elif isinstance(status, str):
+            predicate = lambda sentence: sentence.status == status
+        else:
+            statuses = frozenset(status)
+            predicate = lambda sentence: sentence.status in statuses
+        # Duyệt theo index thay vì slice để không copy list
+        for i in range(*slice(start, stop).indices(len(source))):
+            sentence = source[i]
+            if predicate is None or predicate(sentence):
+                yield sentence
+
+    def count_sentences(self, status=None, start: int = None, stop: int = None, source=None) -> int:
+        """Số câu khớp điều kiện của iter_sentences (đếm stream, không tạo list)"""
+        return sum(1 for _ in self.iter_sentences(status, start, stop, source))
+
+    def export_to(self, file_path: str, fmt: str = None, include_status: bool = True,
+                  sentences=None, status=None, start: int = None, stop: int = None,
+                  progress=None, should_cancel=None):
+        """
+        Xuất dữ liệu dạng stream ra file (xlsx, csv, tsv, jsonl, parquet - xem exporters.py)
+        fmt: mặc định suy ra từ đuôi file
+        sentences: nguồn dữ liệu, mặc định danh sách đang hiển thị (đã filter); truyền all_sentences để xuất toàn bộ
+        status/start/stop: lọc theo trạng thái và khoảng dòng, xem iter_sentences
+        progress(done): gọi định kỳ; should_cancel(): trả về True để huỷ (raise ExportCancelled)
+        """
+        import exporters
+        fmt = fmt or exporters.format_from_path(file_path)
+        if fmt is None:
+            raise ValueError(f"Không suy ra được định dạng xuất từ: {file_path}")
+        source = self.sentences if sentences is None else sentences
+        fields = list(self.fields)
+        columns = [exporters.to_export_value(field) for field in fields]
+        if include_status:
+            columns.append(exporters.STATUS_COLUMN)
+
+        def rows():
+            for sentence in self.iter_sentences(status, start, stop, source):
+                values = [exporters.to_export_value(sentence.get(field)) for field in fields]
+                if include_status:
+                    values.append(sentence.status)
+                yield values
+
+        with span("export", path=file_path, fmt=fmt):
+            exporters.write_export(file_path, fmt, columns, rows(), progress, should_cancel)
 
     def current(self) -> Sentence:
-        print(f"DEBUG: current_index={self.current_index}, len(sentences)={len(self.sentences)}")
         if not self.sentences:
-            print("DEBUG: No sentences available!")
             return None
         if self.current_index >= len(self.sentences):
-            print(f"DEBUG: current_index {self.current_index} >= len(sentences) {len(self.sentences)}")
+            log.debug("current_index %d >= len(sentences) %d, clamping", self.current_index, len(self.sentences))
             self.current_index = len(self.sentences) - 1
         if self.current_index < 0:
-            print(f"DEBUG: current_index {self.current_index} < 0")
+            log.debug("current_index %d < 0, clamping", self.current_index)
             self.current_index = 0
         return self.sentences[self.current_index]
 
     def next(self):
-        print(f"DEBUG: next() - current_index={self.current_index}, len(sentences)={len(self.sentences)}")
         if self.current_index < len(self.sentences) - 1:
             self.current_index += 1
-            print(f"DEBUG: next() - new current_index={self.current_index}")
         else:
-            print(f"DEBUG: next() - already at last sentence")
+            log.debug("next(): already at last sentence")
 
     def previous(self):
-        print(f"DEBUG: previous() - current_index={self.current_index}, len(sentences)={len(self.sentences)}")
         if self.current_index > 0:
             self.current_index -= 1
-            print(f"DEBUG: previous() - new current_index={self.current_index}")
         else:
-            print(f"DEBUG: previous() - already at first sentence")
+            log.debug("previous(): already at first sentence")
     
-    def apply_filter(self, filter_type: str):
+    def filter_rows(self, filter_type):
         """
-        Áp dụng filter để hiển thị các câu theo trạng thái
-        filter_type: "All", "Done", "Not Done"
+        Chỉ số các câu trong all_sentences khớp filter (array 'I', tăng dần).
+        Kết quả được cache theo (filter, lần load, số lần sửa); filter "sửa hôm nay" còn theo ngày.
         """
-        self.current_filter = filter_type
-        
-        if filter_type == "All":
+        row_filter = as_row_filter(filter_type)
+        key = (row_filter, self.data_version, Sentence.revision,
+               date.today() if row_filter is not None and row_filter.uses_date() else None)
+        rows = self.filter_cache.get(key)
+        if rows is None:
+            rows = filter_rows(self.all_sentences, row_filter, self.fields)
+            self.filter_cache.put(key, rows)
+        return rows
+
+    def apply_filter(self, filter_type):
+        """
+        Áp dụng filter để hiển thị các câu thoả điều kiện
+        filter_type: "All", "Done", "Not Done" hoặc RowFilter (xem sentence_filter.py)
+        """
+        if as_row_filter(filter_type) is None:
             # Hiển thị tất cả câu
-            self.sentences = self.all_sentences.copy()
-        elif filter_type == "Done":
-            # Chỉ hiển thị các câu đã Done
-            self.sentences = [s for s in self.all_sentences if s.status == "Done"]
-        elif filter_type == "Not Done":
-            # Chỉ hiển thị các câu chưa Done
-            self.sentences = [s for s in self.all_sentences if s.status == "Not Done"]
+            self.sentences = SentenceView(self.all_sentences)
+        else:
+            self.sentences = SentenceView(self.all_sentences, self.filter_rows(filter_type))
+        self.current_filter = filter_type
         
         # Reset index về 0 khi filter
         self.current_index = 0
-        print(f"DEBUG: Filter applied - {filter_type}, {len(self.sentences)} sentences")
\ No newline at end of file
+        log.debug("Filter applied - %s, %d sentences", filter_type, len(self.sentences))
\ No newline at end of file
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def to_display(value: str) -> str:
+    """Chuỗi hiển thị trong ô nhập: 3==D → xuống dòng"""
+    return value.replace("3==D", "\n") if isinstance(value, str) else ""
+
+
+class SentencePrefetcher:
+    """Chuẩn bị sẵn chuỗi hiển thị cho các câu lân cận câu hiện tại trong thread nền"""
+
+    def __init__(self, radius: int = 2, max_entries: int = 64):
+        self.radius = radius  # Số câu trước/sau câu hiện tại cần chuẩn bị
+        self.max_entries = max_entries
+        # id(sentence) -> (sentence, {field: (giá trị gốc, chuỗi hiển thị)})
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+    def display_values(self, sentence, fields) -> dict:
+        """Trả về {field: chuỗi hiển thị}; dùng cache nếu giá trị gốc chưa bị sửa"""
+        with self._lock:
+            entry = self._cache.get(id(sentence))
+        prepared = entry[1] if entry is not None and entry[0] is sentence else {}
+        values = {}
+        for field in fields:
+            raw = sentence.get(field)
+            cached = prepared.get(field)
+            # So sánh identity: Sentence.set luôn gán object chuỗi mới
+            values[field] = cached[1] if cached is not None and cached[0] is raw else to_display(raw)
+        return values
+
+    def schedule(self, sentences, index: int, fields):
+        """Chuẩn bị trong nền các câu index-radius..index+radius của danh sách đang hiển thị"""
+        if not sentences or not fields:
+            return
+        start = max(0, index - self.radius)
+        stop = min(len(sentences), index + self.radius + 1)
+        # Ưu tiên câu kế tiếp (Enter để Next), sau đó câu trước
+        order = sorted(range(start, stop), key=lambda i: (abs(i - index - 0.5), i))
+        neighbours = [sentences[i] for i in order if i != index]
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self._executor.submit(self._prepare, neighbours, tuple(fields), generation)
+
+    def _prepare(self, sentences, fields, generation):
+        for sentence in sentences:
+            if generation != self._generation:
+                return  # Đã có yêu cầu mới hơn (người dùng chuyển câu tiếp)
+            with self._lock:
+                entry = self._cache.get(id(sentence))
+            if entry is not None and entry[0] is sentence and all(
+                field in entry[1] and entry[1][field][0] is sentence.get(field) for field in fields
+            ):
+                continue
+            prepared = {}
+            for field in fields:
+                raw = sentence.get(field)
+                prepared[field] = (raw, to_display(raw))
+            with self._lock:
+                self._cache[id(sentence)] = (sentence, prepared)
+                self._cache.move_to_end(id(sentence))
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,58 +1,209 @@
 
-from flask import Flask, request, jsonify
-import pandas as pd
+from flask import Flask, Response, request, jsonify
 import os
+import json
+import time
+import hashlib
 import tempfile
+import threading
+from collections import OrderedDict
+from converter import convert_excel
+from server_metrics import (
+    Registry, Counter, Gauge, Histogram, Timer, SIZE_BUCKETS, memory_rss_bytes, memory_peak_bytes
+)
 
 app = Flask(__name__)
 
+# Cache kết quả chuyển đổi theo hash nội dung file (upload lại cùng file không phải parse lại).
+# Mặc định tắt (0 MB): bật bằng MAGICTOOL_CACHE_MB khi đã tính phần RAM này vào cấu hình máy chủ.
+CACHE_MAX_ENTRIES = int(os.environ.get("MAGICTOOL_CACHE_ENTRIES", "16"))
+CACHE_MAX_BYTES = int(os.environ.get("MAGICTOOL_CACHE_MB", "0")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+STARTED_AT = time.time()
+
+
+class ConversionCache:
+    """LRU: sha256 nội dung file -> JSON response đã serialize, giới hạn theo số mục và tổng byte"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": self.enabled, "entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+
+cache = ConversionCache()
+
+metrics = Registry()
+REQUESTS = metrics.register(Counter(
+    "magictool_requests_total", "Số request theo endpoint và mã HTTP", ("endpoint", "status")))
+STAGE_SECONDS = metrics.register(Histogram(
+    "magictool_stage_seconds", "Thời gian từng bước xử lý upload_excel", labelnames=("stage",)))
+REQUEST_SECONDS = metrics.register(Histogram(
+    "magictool_request_seconds", "Tổng thời gian xử lý upload_excel", labelnames=("cache",)))
+UPLOAD_BYTES = metrics.register(Histogram(
+    "magictool_upload_bytes", "Kích thước file Excel nhận được", SIZE_BUCKETS))
+RESPONSE_BYTES = metrics.register(Histogram(
+    "magictool_response_bytes", "Kích thước JSON trả về", SIZE_BUCKETS))
+ROWS = metrics.register(Counter("magictool_rows_converted_total", "Tổng số dòng đã chuyển đổi"))
+IN_FLIGHT = metrics.register(Gauge("magictool_inflight_jobs", "Số upload đang xử lý"))
+metrics.register(Counter("magictool_cache_hits_total", "Số lần trúng cache", callback=lambda: cache.hits))
+metrics.register(Counter("magictool_cache_misses_total", "Số lần trượt cache", callback=lambda: cache.misses))
+metrics.register(Counter("magictool_cache_evictions_total", "Số mục bị đẩy khỏi cache", callback=lambda: cache.evictions))
+metrics.register(Gauge("magictool_cache_entries", "Số mục trong cache", callback=lambda: cache.stats()["entries"]))
+metrics.register(Gauge("magictool_cache_bytes", "Tổng byte trong cache", callback=lambda: cache.stats()["bytes"]))
+metrics.register(Gauge("magictool_cache_max_bytes", "Giới hạn byte của cache (0 = tắt)", callback=lambda: cache.max_bytes))
+metrics.register(Gauge("process_resident_memory_bytes", "RSS hiện tại", callback=memory_rss_bytes))
+metrics.register(Gauge("process_max_resident_memory_bytes", "RSS đỉnh từ lúc chạy", callback=memory_peak_bytes))
+metrics.register(Gauge("process_start_time_seconds", "Thời điểm server khởi động", callback=lambda: STARTED_AT))
+
+# Có sample ngay từ lần scrape đầu tiên
+ROWS.inc(0)
+IN_FLIGHT.set(0)
+
+
+def json_response(body, status=200):
+    return Response(body, status=status, mimetype="application/json")
+
+
+def save_upload(file, temp_path, digest=None):
+    """Ghi file upload xuống file tạm theo từng khối (không giữ cả file trong RAM), cập nhật hash; trả về số byte"""
+    size = 0
+    with open(temp_path, "wb") as out:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            size += len(chunk)
+    return size
+
+
+def error_response(message, status):
+    REQUESTS.inc(endpoint="upload_excel", status=status)
+    return jsonify({'error': message}), status
+
+
 @app.route('/upload_excel', methods=['POST'])
 def upload_excel():
     if 'file' not in request.files:
-        return jsonify({'error': 'No file part in the request'}), 400
+        return error_response('No file part in the request', 400)
 
     file = request.files['file']
 
     if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+        return error_response('No selected file', 400)
 
     if not file.filename.lower().endswith(('.xlsx', '.xls')):
-        return jsonify({'error': 'Only Excel files are allowed'}), 400
+        return error_response('Only Excel files are allowed', 400)
 
+    IN_FLIGHT.inc()
+    temp_path = None
     try:
-        # Lưu file tạm thời vào thư mục hệ thống
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as temp:
-            file.save(temp.name)
-            temp_path = temp.name
-
-        # Đọc dữ liệu bằng pandas
-        df = pd.read_excel(temp_path).fillna("")
-
-        # Lưu nguyên tên cột (không strip) để mapping
-        fields_raw = [str(col) for col in df.columns]
-
-        # Tạo header hiển thị/ghi TXT: thay thế ký tự đặc biệt, KHÔNG strip
-        def sanitize_field(col):
-            col = str(col)
-            return col.replace('\t', '3==D').replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D')
-        fields_header = [sanitize_field(col) for col in df.columns]
-
-        # Xử lý dữ liệu trong các ô - thay thế ký tự đặc biệt, KHÔNG đổi key
-        def process_data_cell(value):
-            if isinstance(value, str):
-                return value.strip().replace('\t', '3==D').replace('\r\n', '3==D').replace('\n', '3==D').replace('\r', '3==D')
-            return str(value)
-        df_processed = df.applymap(process_data_cell)
-
-        result = df_processed.to_dict(orient='records')
-
-        # Xóa file tạm
-        os.remove(temp_path)
-
-        return jsonify({'fields_raw': fields_raw, 'fields': fields_header, 'data': result})
+        with Timer() as total:
+            # Lưu file vào file tạm theo từng khối, tính hash luôn trong lúc ghi (chỉ khi bật cache)
+            with Timer() as receive:
+                fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1].lower())
+                os.close(fd)
+                digest = hashlib.sha256() if cache.enabled else None
+                size = save_upload(file, temp_path, digest)
+            STAGE_SECONDS.observe(receive.elapsed, stage="receive")
+            UPLOAD_BYTES.observe(size)
+
+            key = digest.hexdigest() if digest is not None else None
+            body = cache.get(key) if key is not None else None
+            cache_state = "off" if key is None else ("hit" if body is not None else "miss")
+            if body is None:
+                # Đọc và xử lý dữ liệu (dùng chung với batch_convert.py)
+                timings = {}
+                result = convert_excel(temp_path, timings)
+                with Timer() as encode:
+                    body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                STAGE_SECONDS.observe(timings['parse'], stage="parse")
+                STAGE_SECONDS.observe(timings['sanitize'], stage="sanitize")
+                STAGE_SECONDS.observe(timings['serialize'] + encode.elapsed, stage="serialize")
+                ROWS.inc(len(result['data']))
+                if key is not None:
+                    cache.put(key, body)
+        REQUEST_SECONDS.observe(total.elapsed, cache=cache_state)
+        RESPONSE_BYTES.observe(len(body))
+        REQUESTS.inc(endpoint="upload_excel", status=200)
+        return json_response(body)
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(str(e), 500)
+    finally:
+        IN_FLIGHT.dec()
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    REQUESTS.inc(endpoint="metrics", status=200)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    REQUESTS.inc(endpoint="health", status=200)
+    return jsonify({
+        'status': 'ok',
+        'uptime_seconds': round(time.time() - STARTED_AT, 3),
+        'inflight_jobs': IN_FLIGHT.value(),
+        'memory_rss_bytes': memory_rss_bytes(),
+        'memory_peak_bytes': memory_peak_bytes(),
+        'cache': cache.stats(),
+    })
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
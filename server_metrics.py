@@ -0,0 +1,195 @@
+"""
+Metrics tối giản theo định dạng text của Prometheus cho server.py (không cần prometheus_client).
+Counter/Gauge/Histogram có label, an toàn khi Flask chạy nhiều thread.
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# Bucket thời gian (giây) cho từng bước xử lý và kích thước (byte) cho payload
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1 << 10, 10 << 10, 100 << 10, 1 << 20, 5 << 20, 10 << 20, 50 << 20, 100 << 20)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback  # Hàm trả về giá trị tại thời điểm scrape (chỉ cho metric không label)
+        self._values = OrderedDict()  # tuple giá trị label -> giá trị
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: cần đúng các label {self.labelnames}, nhận {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """[(giá trị các label, giá trị)]"""
+        if self.callback is not None:
+            value = self.callback()
+            return [] if value is None else [((), value)]
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        if self.callback is not None:
+            return self.callback()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        if self.callback is not None:
+            return self.callback()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=TIME_BUCKETS, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]  # đếm theo bucket, count, sum
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def snapshot(self, **labels):
+        """(count, sum) của một bộ label"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[1], state[2]) if state else (0, 0.0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            states = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, bucket_counts, count, total in states:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def memory_rss_bytes():
+    """RSS hiện tại của process (psutil hoặc /proc), None nếu không đọc được"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def memory_peak_bytes():
+    """RSS đỉnh từ lúc chạy (resource, không có trên Windows), None nếu không đọc được"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux trả về KB
+
+
+class Timer:
+    """`with Timer() as t: ...` → t.elapsed (giây)"""
+    __slots__ = ("start", "elapsed")
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        return False
@@ -0,0 +1,79 @@
+import os
+import stat
+
+import pytest
+
+from atomic_io import atomic_write, backup_path
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_write_creates_file_without_leftovers(tmp_path):
+    target = tmp_path / "data.txt"
+    with atomic_write(str(target)) as f:
+        f.write("xin chào")
+    assert read(target) == "xin chào"
+    assert os.listdir(tmp_path) == ["data.txt"]
+
+
+def test_error_inside_block_keeps_target(tmp_path):
+    target = str(tmp_path / "data.txt")
+    with atomic_write(target) as f:
+        f.write("bản cũ")
+    with pytest.raises(RuntimeError):
+        with atomic_write(target, backups=2) as f:
+            f.write("bản mới ghi dở")
+            raise RuntimeError("crash")
+    assert read(target) == "bản cũ"
+    # Không để lại file tạm, không xoay backup khi ghi thất bại
+    assert os.listdir(tmp_path) == ["data.txt"]
+
+
+def test_backup_rotation_keeps_newest_generations(tmp_path):
+    target = str(tmp_path / "data.txt")
+    for i in range(5):
+        with atomic_write(target, backups=3) as f:
+            f.write(f"v{i}")
+    assert read(target) == "v4"
+    assert [read(backup_path(target, g)) for g in (1, 2, 3)] == ["v3", "v2", "v1"]
+    assert not os.path.exists(backup_path(target, 4))
+
+
+def test_backup_is_independent_of_new_content(tmp_path):
+    target = str(tmp_path / "data.txt")
+    with atomic_write(target) as f:
+        f.write("một")
+    with atomic_write(target, backups=1) as f:
+        f.write("hai")
+    # .bak1 là hard link tới file cũ: ghi file mới không được làm đổi nội dung backup
+    assert read(backup_path(target, 1)) == "một"
+    assert read(target) == "hai"
+
+
+def test_no_backup_for_new_file(tmp_path):
+    target = str(tmp_path / "data.txt")
+    with atomic_write(target, backups=2) as f:
+        f.write("đầu tiên")
+    assert not os.path.exists(backup_path(target, 1))
+
+
+def test_binary_mode_and_no_fsync(tmp_path):
+    target = str(tmp_path / "data.bin")
+    with atomic_write(target, mode="wb", fsync=False) as f:
+        f.write(b"\x00\x01")
+    with open(target, "rb") as f:
+        assert f.read() == b"\x00\x01"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="quyền file kiểu POSIX")
+def test_keeps_mode_of_existing_file(tmp_path):
+    target = str(tmp_path / "data.txt")
+    with atomic_write(target) as f:
+        f.write("a")
+    os.chmod(target, 0o640)
+    with atomic_write(target) as f:
+        f.write("b")
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o640
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from converter import Cancelled, txt_rows, txt_value, write_txt
+from sentence_manager import SentenceManager
+
+FIELDS = ["A", "B", "C"]
+PIECES = ["", " ", "x", "Tiếng Việt", "\t", "\n", "\r", "\r\n", "\n\r", "a\tb", "  lề  ", "3==D"]
+
+
+def expected(row, fields=FIELDS):
+    return [txt_value(row.get(field, "")) for field in fields]
+
+
+CASES = [
+    {"A": "a", "B": "b", "C": "c"},
+    {"A": "có\ttab", "B": "b", "C": "c"},
+    {"A": "\tđầu", "B": "cuối\t", "C": "\t"},
+    {"A": "dòng 1\r\ndòng 2", "B": "mac\rcũ", "C": "unix\nmới"},
+    {"A": "trộn\t\r\n\t", "B": "a\r\n\nb", "C": "\n\r"},
+    {"A": "  lề  ", "B": "\n  giữa  \n", "C": ""},
+    {"A": float("nan"), "B": 1.5, "C": 3},
+    {"A": None, "B": "b\nc", "C": float("nan")},
+    {"A": "chỉ A"},
+    {"C": "chỉ C\tcó tab"},
+    {},
+]
+
+
+@pytest.mark.parametrize("row", CASES)
+def test_txt_rows_matches_txt_value(row):
+    [(values, line)] = list(txt_rows([row], FIELDS))
+    assert values == expected(row)
+    assert line == "\t".join(values)
+    assert line.count("\t") == len(FIELDS) - 1
+    assert "\n" not in line and "\r" not in line
+
+
+def test_txt_rows_random():
+    rng = random.Random(5)
+    data = [{field: "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 5)))
+             for field in FIELDS if rng.random() > 0.1}
+            for _ in range(2000)]
+    for row, (values, line) in zip(data, txt_rows(data, FIELDS), strict=True):
+        assert values == expected(row), row
+        assert line == "\t".join(values)
+
+
+@pytest.mark.parametrize("fields", [[], ["A"]])
+def test_txt_rows_few_columns(fields):
+    data = [{"A": "x\ty\n"}, {"B": "b"}]
+    assert [values for values, _ in txt_rows(data, fields)] == [expected(row, fields) for row in data]
+
+
+def test_write_txt_round_trip(tmp_path):
+    path = str(tmp_path / "out.txt")
+    rows = write_txt(path, FIELDS, FIELDS, CASES)
+    assert rows == [expected(row) for row in CASES]
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    assert lines[:2] == ["0", "\t".join(FIELDS)]
+    assert all(line.endswith("\tNot Done") for line in lines[2:-1])
+
+    sm = SentenceManager()
+    sm.load_from_txt(path)
+    assert len(sm.all_sentences) == len(CASES)
+    for sentence, values in zip(sm.all_sentences, rows):
+        assert [sentence.get(field) for field in FIELDS] == values
+        assert sentence.status == "Not Done"
+
+
+def test_write_txt_cancelled_keeps_target(tmp_path):
+    path = tmp_path / "out.txt"
+    path.write_text("cũ", encoding="utf-8")
+    with pytest.raises(Cancelled):
+        write_txt(str(path), FIELDS, FIELDS, CASES, cancelled=lambda: True)
+    assert path.read_text(encoding="utf-8") == "cũ"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.txt"]
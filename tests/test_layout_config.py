@@ -0,0 +1,109 @@
+import json
+
+from PySide6.QtCore import QRect
+
+from back_end import CONFIG_VERSION, EngineerUnderground, decode_layout, encode_layout
+
+
+def rect_tuples(rects):
+    return [(rect.getRect(), field) for rect, field in rects]
+
+
+def drawn(rects):
+    """Dạng canvas.rects: (QRect, màu, field)"""
+    return [(QRect(*geometry), None, field) for geometry, field in rects]
+
+
+def roundtrip(rects, fields):
+    data = json.loads(json.dumps(encode_layout(drawn(rects), fields)))
+    return decode_layout(data)
+
+
+def test_v2_roundtrip():
+    rects = [((0, 0, 100, 40), "Câu 1"), ((10, 50, 80, 20), "Dịch3==DTiếng Việt")]
+    fields = ["Câu 1", "Dịch3==DTiếng Việt", "Chưa vẽ"]
+    decoded_rects, decoded_fields = roundtrip(rects, fields)
+    assert rect_tuples(decoded_rects) == rects
+    assert decoded_fields == fields
+
+
+def test_field_names_stored_once():
+    name = "Tên trường rất dài " * 20
+    data = encode_layout(drawn([((0, 0, 1, 1), name), ((5, 5, 1, 1), name)]), [name])
+    assert data["version"] == CONFIG_VERSION
+    assert data["fields"] == [name]
+    assert [row[0] for row in data["rects"]] == [0, 0]
+    assert "extra_fields" not in data
+
+
+def test_fields_none_and_rect_fields_outside_field_list():
+    rects = [((0, 0, 10, 10), "a"), ((0, 20, 10, 10), None), ((0, 40, 10, 10), "a")]
+    data = encode_layout(drawn(rects), None)
+    assert data["fields"] == []
+    assert data["extra_fields"] == ["a", None]
+    decoded_rects, decoded_fields = decode_layout(json.loads(json.dumps(data)))
+    assert rect_tuples(decoded_rects) == rects
+    assert decoded_fields == []
+
+
+def test_duplicate_fields_are_preserved():
+    fields = ["a", "b", "a"]
+    rects = [((0, 0, 10, 10), "a"), ((0, 20, 10, 10), "b"), ((0, 40, 10, 10), "a")]
+    decoded_rects, decoded_fields = roundtrip(rects, fields)
+    assert decoded_fields == fields
+    assert rect_tuples(decoded_rects) == rects
+
+
+def test_empty_layout():
+    assert roundtrip([], []) == ([], [])
+
+
+def test_v1_config_is_read():
+    data = {
+        "rects": [
+            {"field": "Câu", "x": 1, "y": 2, "width": 3, "height": 4},
+            {"field": "Khác", "x": 5, "y": 6, "width": 7, "height": 8},
+        ],
+        "fields": ["Câu"],
+    }
+    rects, fields = decode_layout(data)
+    assert rect_tuples(rects) == [((1, 2, 3, 4), "Câu"), ((5, 6, 7, 8), "Khác")]
+    assert fields == ["Câu"]
+
+
+def test_v1_file_is_rewritten_as_v2(tmp_path):
+    store = EngineerUnderground()
+    store.config_path = str(tmp_path / "config.json")
+    v1 = {"rects": [{"field": "Câu", "x": 1, "y": 2, "width": 3, "height": 4}], "fields": ["Câu", "Dịch"]}
+    with open(store.config_path, "w", encoding="utf-8") as f:
+        json.dump(v1, f, indent=2, ensure_ascii=False)
+
+    rects, fields = store.load_config()
+    store.save_config([(rect, None, field) for rect, field in rects], fields)
+
+    with open(store.config_path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    assert "\n" not in raw and json.loads(raw)["version"] == CONFIG_VERSION
+    assert rect_tuples(store.load_config()[0]) == [((1, 2, 3, 4), "Câu")]
+    assert store.load_config()[1] == ["Câu", "Dịch"]
+
+
+def test_snapshots_skip_duplicates_and_empty_layouts(tmp_path):
+    store = EngineerUnderground()
+    store.config_path = str(tmp_path / "config.json")
+    layout = drawn([((0, 0, 10, 10), "a")])
+    store.save_config(layout, ["a"])
+    store.save_config(layout, ["a"])
+    store.save_config([], [])
+    snapshots = store.list_snapshots()
+    assert len(snapshots) == 1
+    assert rect_tuples(store.load_snapshot(snapshots[0])[0]) == [((0, 0, 10, 10), "a")]
+
+
+def test_missing_or_broken_config(tmp_path):
+    store = EngineerUnderground()
+    store.config_path = str(tmp_path / "config.json")
+    assert store.load_config() == ([], [])
+    with open(store.config_path, "w", encoding="utf-8") as f:
+        f.write("{hỏng")
+    assert store.load_config() == ([], [])
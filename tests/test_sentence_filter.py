@@ -0,0 +1,143 @@
+import random
+
+import pytest
+
+from sentence_filter import (
+    CONTAINS, EDITED_TODAY, EMPTY, NOT_CONTAINS, NOT_EMPTY, STATUS,
+    Condition, FilterCache, RowFilter, SentenceView, filter_rows,
+)
+from sentence_manager import Sentence, SentenceManager
+from text_search import fold
+
+FIELDS = ["Câu", "Dịch", "Ghi chú"]
+WORDS = ["Trường", "học", "ĐẤT", "nước", "3==D", "  ", "", "xin chào", "Tiếng Việt", "abc"]
+
+
+def make_sentences(n=400, seed=7):
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(n):
+        values = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 3))) for _ in FIELDS]
+        sentences.append(Sentence(FIELDS, values, rng.choice(["Done", "Not Done"])))
+    return sentences
+
+
+def make_manager(sentences):
+    sm = SentenceManager()
+    sm.load_from_rows(FIELDS, [[s.get(f) for f in FIELDS] for s in sentences],
+                      statuses=[s.status for s in sentences])
+    return sm
+
+
+def is_empty(text):
+    return not text.replace("3==D", "").strip()
+
+
+def naive(sentences, predicate):
+    return [i for i, sentence in enumerate(sentences) if predicate(sentence)]
+
+
+CASES = [
+    (RowFilter([Condition(STATUS, value="Done")]), lambda s: s.status == "Done"),
+    (RowFilter([Condition(EMPTY, "Dịch")]), lambda s: is_empty(s.get("Dịch"))),
+    (RowFilter([Condition(NOT_EMPTY, "Câu")]), lambda s: not is_empty(s.get("Câu"))),
+    (RowFilter([Condition(CONTAINS, "Câu", "truong")]), lambda s: "truong" in fold(s.get("Câu"))),
+    (RowFilter([Condition(CONTAINS, None, "DAT")]),
+     lambda s: any("dat" in fold(s.get(f)) for f in FIELDS)),
+    (RowFilter([Condition(NOT_CONTAINS, "Ghi chú", "tiếng việt")]),
+     lambda s: "tieng viet" not in fold(s.get("Ghi chú"))),
+    (RowFilter([Condition(STATUS, value="Not Done"), Condition(CONTAINS, "Dịch", "Học"),
+                Condition(NOT_EMPTY, "Ghi chú")]),
+     lambda s: s.status == "Not Done" and "hoc" in fold(s.get("Dịch")) and not is_empty(s.get("Ghi chú"))),
+]
+
+
+@pytest.mark.parametrize("row_filter, predicate", CASES, ids=[str(f) for f, _ in CASES])
+def test_filter_rows_matches_naive_scan(row_filter, predicate):
+    sentences = make_sentences()
+    rows = filter_rows(sentences, row_filter, FIELDS)
+    expected = naive(sentences, predicate)
+    assert 0 < len(expected) < len(sentences)  # Dữ liệu mẫu phải có cả câu khớp và không khớp
+    assert rows.typecode == "I"
+    assert list(rows) == expected
+
+
+def test_no_filter_returns_all_rows():
+    sentences = make_sentences(10)
+    assert list(filter_rows(sentences, "All")) == list(range(10))
+
+
+def test_invalid_conditions():
+    with pytest.raises(ValueError):
+        Condition("unknown")
+    with pytest.raises(ValueError):
+        filter_rows(make_sentences(3), RowFilter([Condition(EMPTY)]), FIELDS)
+    with pytest.raises(ValueError):
+        filter_rows(make_sentences(3), RowFilter([Condition(CONTAINS, "Không có", "a")]), FIELDS)
+
+
+def test_edited_today_follows_sentence_set():
+    sentences = make_sentences(20)
+    today = RowFilter([Condition(EDITED_TODAY)])
+    assert list(filter_rows(sentences, today)) == []
+    sentences[3].set("Câu", "mới")
+    if sentences[5].status == "Done":
+        sentences[5].mark_as_not_done()
+    else:
+        sentences[5].mark_as_done()
+    sentences[7].set("Câu", sentences[7].get("Câu"))  # Không đổi giá trị: không tính là sửa
+    assert list(filter_rows(sentences, today)) == [3, 5]
+
+
+def test_manager_cache_invalidated_by_set():
+    sm = make_manager(make_sentences())
+    row_filter = RowFilter([Condition(CONTAINS, "Câu", "zzz")])
+    assert list(sm.filter_rows(row_filter)) == []
+    assert sm.filter_rows(row_filter) is sm.filter_rows(row_filter)  # Lần hai trúng cache
+
+    sm.all_sentences[10].set("Câu", "ZZZ mới")
+    assert list(sm.filter_rows(row_filter)) == [10]
+
+    sm.all_sentences[10].mark_as_done()
+    sm.apply_filter("Done")
+    assert list(sm.sentences) == [s for s in sm.all_sentences if s.status == "Done"]
+
+
+def test_manager_cache_invalidated_by_reload():
+    sm = make_manager(make_sentences(50, seed=1))
+    first = list(sm.filter_rows("Done"))
+    other = make_sentences(50, seed=2)
+    sm.load_from_rows(FIELDS, [[s.get(f) for f in FIELDS] for s in other], statuses=[s.status for s in other])
+    assert list(sm.filter_rows("Done")) == naive(other, lambda s: s.status == "Done")
+    assert first != list(sm.filter_rows("Done"))
+
+
+def test_filter_cache_lru():
+    cache = FilterCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" ít dùng gần đây nhất bị đẩy ra
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_sentence_view_mapping():
+    sentences = make_sentences(30)
+    rows = filter_rows(sentences, "Done")
+    view = SentenceView(sentences, rows)
+    expected = [s for s in sentences if s.status == "Done"]
+    assert len(view) == len(expected)
+    assert list(view) == expected
+    assert view[1:3] == expected[1:3]
+    assert view[-1] is expected[-1]
+    for position, row in enumerate(rows):
+        assert view.row_at(position) == row
+        assert view.position_of(row) == position
+    hidden = next(i for i, s in enumerate(sentences) if s.status != "Done")
+    assert view.position_of(hidden) is None
+
+    full = SentenceView(sentences)
+    assert len(full) == 30 and full[5] is sentences[5]
+    assert full.position_of(5) == 5 and full.position_of(30) is None
@@ -0,0 +1,142 @@
+import os
+import random
+
+import pytest
+
+from sentence_manager import Sentence, SentenceManager
+from text_search import SentenceIndex, index_path_for, normalize, token_set, tokenize
+
+FIELDS = ["Câu", "Dịch"]
+WORDS = ["Trường", "trưởng", "học", "Đất", "đất3==Dnước", "nước", "Tiếng", "Việt", "abc", "ab", "x1", "ĐƯỜNG"]
+QUERIES = ["truong", "TRƯỜNG", "tr", "dat nuoc", "hoc viet", "ab", "abc", "x", "zzz", "duong", "đường học", "   "]
+
+
+def make_sentences(n=300, seed=3):
+    rng = random.Random(seed)
+    return [Sentence(FIELDS, [" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4))) for _ in FIELDS])
+            for _ in range(n)]
+
+
+def linear_search(sentences, query, field=None):
+    terms = tokenize(query)
+    if not terms:
+        return []
+    columns = [field] if field is not None else FIELDS
+    rows = []
+    for row, sentence in enumerate(sentences):
+        tokens = set()
+        for column in columns:
+            tokens |= token_set(sentence.get(column))
+        if all(any(token.startswith(term) for token in tokens) for term in terms):
+            rows.append(row)
+    return rows
+
+
+def built_index(sentences):
+    index = SentenceIndex(sentences, FIELDS)
+    assert index.build()
+    index.finish_build()
+    return index
+
+
+def test_normalize():
+    assert normalize("  Môi Trường3==DĐẤT  ") == "moi truong dat"
+
+
+@pytest.mark.parametrize("field", [None, "Câu", "Dịch"])
+def test_search_matches_linear_scan(field):
+    sentences = make_sentences()
+    index = built_index(sentences)
+    for query in QUERIES:
+        assert index.search(query, field) == linear_search(sentences, query, field), query
+    assert any(index.search(query, field) for query in QUERIES)
+
+
+def test_unknown_field_and_not_ready():
+    sentences = make_sentences(5)
+    index = SentenceIndex(sentences, FIELDS)
+    assert index.search("truong") == []  # Chưa dựng xong
+    index.build()
+    index.finish_build()
+    assert index.search("truong", "Không có") == []
+
+
+def test_index_follows_sentence_set():
+    sentences = make_sentences()
+    index = built_index(sentences)
+    version = index.version
+    sentences[4].set("Câu", "Hoàn toàn mới")
+    sentences[9].set("Dịch", "")
+    assert index.version > version and index.dirty
+    for query in QUERIES + ["hoan toan", "moi"]:
+        assert index.search(query) == linear_search(sentences, query), query
+
+
+def test_edits_during_build_are_applied():
+    sentences = make_sentences()
+    index = SentenceIndex(sentences, FIELDS)
+    index.build()
+    # Sửa sau khi build() xong nhưng trước finish_build (như khi người dùng gõ lúc thread nền đang dựng)
+    sentences[0].set("Câu", "quasar")
+    sentences[1].set("Câu", "quasar")
+    sentences[1].set("Câu", "nebula")
+    assert index.has_pending()
+    index.finish_build()
+    assert not index.has_pending()
+    assert index.search("quasar") == [0]
+    assert index.search("nebula") == [1]
+    for query in QUERIES:
+        assert index.search(query) == linear_search(sentences, query), query
+    index.detach()
+    sentences[2].set("Câu", "quasar")
+    assert index.search("quasar") == [0]
+
+
+def write_txt(path, sentences):
+    sm = SentenceManager()
+    sm.load_from_rows(FIELDS, [[s.get(f) for f in FIELDS] for s in sentences])
+    sm.save_to_txt(path)
+
+
+def test_persisted_index_reload(tmp_path):
+    txt_path = str(tmp_path / "data.txt")
+    write_txt(txt_path, make_sentences())
+
+    sm = SentenceManager()
+    sm.load_from_txt(txt_path)
+    index = built_index(sm.all_sentences)
+    signature = sm.file_signature(txt_path)[1:]
+    index.save(index_path_for(txt_path), signature)
+    assert not index.dirty
+
+    # File TXT không đổi: nạp được index đã lưu, kết quả giống dựng lại
+    again = SentenceManager()
+    again.load_from_txt(txt_path)
+    loaded = SentenceIndex(again.all_sentences, FIELDS)
+    assert loaded.load(index_path_for(txt_path), again.file_signature(txt_path)[1:])
+    loaded.finish_build()
+    for query in QUERIES:
+        assert loaded.search(query) == index.search(query), query
+
+    # TXT đã đổi (ghi lại với nội dung khác): chữ ký khác, index cũ bị bỏ qua và phải dựng lại
+    changed = make_sentences(seed=99)
+    changed[0].set("Câu", "quasar")
+    write_txt(txt_path, changed)
+    reloaded = SentenceManager()
+    reloaded.load_from_txt(txt_path)
+    stale = SentenceIndex(reloaded.all_sentences, FIELDS)
+    assert not stale.load(index_path_for(txt_path), reloaded.file_signature(txt_path)[1:])
+    rebuilt = built_index(reloaded.all_sentences)
+    assert rebuilt.search("quasar") == [0]
+    assert rebuilt.search("truong") == linear_search(reloaded.all_sentences, "truong")
+
+
+def test_load_rejects_mismatched_data(tmp_path):
+    path = str(tmp_path / "data.txt.search.json")
+    sentences = make_sentences(20)
+    built_index(sentences).save(path, (1, 2))
+    assert not SentenceIndex(sentences, FIELDS).load(path, (1, 3))         # Chữ ký khác
+    assert not SentenceIndex(sentences[:10], FIELDS).load(path, (1, 2))    # Số dòng khác
+    assert not SentenceIndex(sentences, ["Câu"]).load(path, (1, 2))        # Trường khác
+    assert not SentenceIndex(sentences, FIELDS).load(path + ".missing", (1, 2))
+    assert os.path.exists(path)
@@ -0,0 +1,316 @@
+"""
+Tìm kiếm văn bản không phân biệt hoa/thường và dấu tiếng Việt.
+
+normalize() đưa chuỗi về dạng so khớp: bỏ 3==D, casefold, bỏ dấu (kể cả đ → d), gộp khoảng trắng.
+FieldSearch giữ sẵn tên trường đã normalize để lọc popup DrawingTab theo từng ký tự gõ.
+SentenceIndex là inverted index trên nội dung các câu của SentenceManager (tìm theo từ, mọi trường
+hoặc một trường), cập nhật theo Sentence.set và lưu được cạnh file TXT.
+"""
+import re
+import sys
+import json
+import base64
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from atomic_io import atomic_write
+from instrumentation import get_logger, span
+
+log = get_logger(__name__)
+
+NEWLINE_MARK = "3==D"
+_SPACES = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+class _FoldTable(dict):
+    """Bảng str.translate: ký tự → ký tự bỏ dấu (đ → d), tính một lần cho mỗi ký tự gặp phải"""
+
+    def __missing__(self, code):
+        ch = chr(code)
+        if ch in "đĐ":
+            folded = "d"
+        else:
+            folded = "".join(c for c in unicodedata.normalize("NFD", ch) if not unicodedata.combining(c))
+        self[code] = folded
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+class _FoldedWords(dict):
+    """Từ (đã casefold) → từ bỏ dấu, tính một lần cho mỗi từ; số từ khác nhau nhỏ hơn nhiều so với dữ liệu"""
+
+    def __missing__(self, word):
+        plain = word if word.isascii() else word.translate(_FOLD_TABLE)
+        if len(self) < MAX_FOLDED_WORDS:
+            self[word] = plain
+        return plain
+
+
+MAX_FOLDED_WORDS = 500000
+_FOLDED_WORDS = _FoldedWords()
+
+
+def _casefold(text):
+    text = text.replace(NEWLINE_MARK, " ").casefold()
+    if not text.isascii() and not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)  # Dấu rời (NFD) không phải \w, sẽ cắt đôi từ
+    return text
+
+
+def fold(text):
+    """Bỏ 3==D, casefold, bỏ dấu; giữ nguyên khoảng trắng"""
+    text = _casefold(text)
+    return text if text.isascii() else text.translate(_FOLD_TABLE)
+
+
+def normalize(text):
+    """'Môi trường3==DĐất' → 'moi truong dat'"""
+    return _SPACES.sub(" ", fold(text)).strip()
+
+
+def normalize_query(query):
+    """Các từ khoá đã normalize (dòng khớp khi chứa đủ tất cả)"""
+    return normalize(query).split()
+
+
+def tokenize(text):
+    """Các từ đã normalize trong chuỗi (tách theo ký tự không phải chữ/số)"""
+    return list(map(_FOLDED_WORDS.__getitem__, _WORD.findall(_casefold(text))))
+
+
+def token_set(text):
+    """Tập từ khác nhau trong chuỗi (như tokenize, bỏ trùng trước khi bỏ dấu)"""
+    return set(map(_FOLDED_WORDS.__getitem__, set(_WORD.findall(_casefold(text)))))
+
+
+class FieldSearch:
+    """
+    Lọc danh sách trường theo từ khoá, trả về chỉ số các trường khớp.
+    Khi gõ thêm ký tự (truy vấn mới chứa truy vấn cũ), chỉ lọc lại trong kết quả lần trước.
+    """
+
+    def __init__(self, fields=()):
+        self.set_fields(fields)
+
+    def set_fields(self, fields):
+        self.names = [normalize(field) for field in fields]
+        self._last_terms = None
+        self._last_hits = None
+
+    def search(self, query):
+        """list chỉ số trường khớp; None nếu truy vấn rỗng (hiện tất cả)"""
+        terms = normalize_query(query)
+        if not terms:
+            self._last_terms = self._last_hits = None
+            return None
+        candidates = range(len(self.names))
+        if self._last_terms is not None and self._refines(terms):
+            candidates = self._last_hits
+        names = self.names
+        hits = candidates
+        # Lọc lần lượt từng từ (từ dài trước, thường loại được nhiều nhất)
+        for term in sorted(terms, key=len, reverse=True):
+            hits = [i for i in hits if term in names[i]]
+        self._last_terms = terms
+        self._last_hits = hits
+        return hits
+
+    def _refines(self, terms):
+        """True nếu mọi dòng khớp terms chắc chắn đã khớp truy vấn trước (mỗi từ cũ nằm trong một từ mới)"""
+        return all(any(old in new for new in terms) for old in self._last_terms)
+
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".search.json"
+
+
+def index_path_for(txt_path):
+    """File index lưu cạnh file TXT"""
+    return txt_path + INDEX_SUFFIX
+
+
+class SentenceIndex:
+    """
+    Inverted index: từ → các ô chứa từ đó, mã ô = dòng * số trường + cột (tăng dần, array 'I').
+    Dòng là vị trí trong SentenceManager.all_sentences. Một truy vấn khớp dòng có đủ mọi từ khoá,
+    mỗi từ khoá khớp theo tiền tố (gõ "truo" khớp "truong").
+
+    Dựng bằng build() (chạy được trong thread nền); các Sentence.set xảy ra trong lúc dựng được
+    ghi lại và áp dụng ở finish_build(). Sau đó mỗi lần set chỉ cập nhật đúng ô thay đổi.
+    """
+
+    def __init__(self, sentences, fields):
+        self.sentences = sentences  # list all_sentences: đổi list nghĩa là dữ liệu đã được load lại
+        self.fields = list(fields)
+        self.field_pos = {field: col for col, field in enumerate(self.fields)}
+        self.width = max(1, len(self.fields))
+        self.row_of = {id(sentence): row for row, sentence in enumerate(sentences)}
+        self.postings = {}
+        self.ready = False
+        self.dirty = False      # Có thay đổi chưa ghi ra file
+        self.version = 0        # Tăng sau mỗi thay đổi (kết quả tìm kiếm cũ không còn đúng)
+        self._pending = {}      # ô → các giá trị cũ, thay đổi trong lúc đang dựng
+        self._vocab = None      # Danh sách từ đã sắp xếp (tra tiền tố), dựng lại khi thêm/bớt từ
+        for sentence in sentences:
+            sentence.listener = self.on_sentence_changed
+
+    def detach(self):
+        for sentence in self.sentences:
+            if sentence.listener == self.on_sentence_changed:
+                sentence.listener = None
+
+    def build(self, cancelled=None):
+        """Dựng toàn bộ index (không đụng vào state đang dùng cho tới khi xong)"""
+        postings = defaultdict(lambda: array("I"))
+        width = self.width
+        columns = list(enumerate(self.fields))
+        with span("search.build", rows=len(self.sentences)):
+            for row, sentence in enumerate(self.sentences):
+                if cancelled is not None and row % 1000 == 0 and cancelled():
+                    return False
+                values = sentence.fields
+                base = row * width
+                for col, field in columns:
+                    value = values.get(field)
+                    if value:
+                        cell = base + col
+                        for token in token_set(value):
+                            postings[token].append(cell)
+        self.postings = dict(postings)
+        self._vocab = None
+        return True
+
+    def finish_build(self):
+        """Gọi trên UI thread sau build(): áp dụng các thay đổi xảy ra trong lúc dựng"""
+        pending, self._pending = self._pending, {}
+        for cell, old_values in pending.items():
+            for old in old_values:
+                self._remove(cell, old)
+            row, col = divmod(cell, self.width)
+            self._add(cell, self.sentences[row].fields.get(self.fields[col], ""))
+        self.ready = True
+        self.dirty = self.dirty or bool(pending)
+        self.version += 1
+
+    def has_pending(self):
+        """True nếu có Sentence.set trong lúc dựng (index chưa khớp nội dung file TXT)"""
+        return bool(self._pending)
+
+    def on_sentence_changed(self, sentence, field, old, new):
+        row = self.row_of.get(id(sentence))
+        col = self.field_pos.get(field)
+        if row is None or col is None:
+            return
+        cell = row * self.width + col
+        if not self.ready:
+            self._pending.setdefault(cell, set()).add(old or "")
+            return
+        self._remove(cell, old)
+        self._add(cell, new)
+        self.dirty = True
+        self.version += 1
+
+    def _remove(self, cell, text):
+        if not text:
+            return
+        for token in token_set(text):
+            cells = self.postings.get(token)
+            if cells is None:
+                continue
+            i = bisect_left(cells, cell)
+            if i < len(cells) and cells[i] == cell:
+                del cells[i]
+                if not cells:
+                    del self.postings[token]
+                    self._vocab = None
+
+    def _add(self, cell, text):
+        if not text:
+            return
+        for token in token_set(text):
+            cells = self.postings.get(token)
+            if cells is None:
+                self.postings[token] = array("I", [cell])
+                self._vocab = None
+                continue
+            i = bisect_left(cells, cell)
+            if i == len(cells) or cells[i] != cell:
+                cells.insert(i, cell)
+
+    def _cells_with_prefix(self, term):
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        vocab = self._vocab
+        i = bisect_left(vocab, term)
+        cells = set()
+        while i < len(vocab) and vocab[i].startswith(term):
+            cells.update(self.postings[vocab[i]])
+            i += 1
+        return cells
+
+    def search(self, query, field=None):
+        """Các dòng (vị trí trong all_sentences, tăng dần) chứa mọi từ khoá; field=None: mọi trường"""
+        terms = tokenize(query)
+        if not terms or not self.ready:
+            return []
+        width = self.width
+        col = self.field_pos.get(field) if field is not None else None
+        if field is not None and col is None:
+            return []
+        rows = None
+        with span("search.query", terms=len(terms)):
+            # Từ dài trước: thường ít kết quả nhất, giao sớm rỗng thì dừng
+            for term in sorted(set(terms), key=len, reverse=True):
+                cells = self._cells_with_prefix(term)
+                if col is None:
+                    term_rows = {cell // width for cell in cells}
+                else:
+                    term_rows = {cell // width for cell in cells if cell % width == col}
+                rows = term_rows if rows is None else rows & term_rows
+                if not rows:
+                    return []
+        return sorted(rows)
+
+    # ----- Lưu / nạp cạnh file TXT -----
+
+    def save(self, path, signature):
+        """Ghi index kèm chữ ký (mtime_ns, size) của file TXT mà index đang khớp"""
+        data = {
+            "version": INDEX_VERSION,
+            "signature": list(signature),
+            "byteorder": sys.byteorder,
+            "rows": len(self.sentences),
+            "fields": self.fields,
+            "postings": {token: base64.b64encode(cells.tobytes()).decode("ascii")
+                         for token, cells in self.postings.items()},
+        }
+        # Index dựng lại được từ TXT: chỉ cần không bị cắt cụt, không cần fsync
+        with span("search.save", tokens=len(self.postings)):
+            with atomic_write(path, fsync=False) as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        self.dirty = False
+
+    def load(self, path, signature):
+        """Nạp index đã lưu nếu khớp chữ ký file TXT và dữ liệu hiện tại; trả về True nếu dùng được"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (data.get("version") != INDEX_VERSION or data.get("signature") != list(signature)
+                or data.get("byteorder") != sys.byteorder or data.get("rows") != len(self.sentences)
+                or data.get("fields") != self.fields):
+            return False
+        postings = {}
+        for token, encoded in data["postings"].items():
+            cells = array("I")
+            cells.frombytes(base64.b64decode(encoded))
+            postings[token] = cells
+        self.postings = postings
+        self._vocab = None
+        return True